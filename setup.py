@@ -33,6 +33,7 @@ setup(name = "thefriendlystars",
     package_data = {'thefriendlystars':[]},
     include_package_data=False,
     scripts = [],
+    entry_points = {'console_scripts':['tfs=thefriendlystars.cli:main']},
     classifiers=[
       'Intended Audience :: Science/Research',
       'Programming Language :: Python',
@@ -47,6 +48,7 @@ setup(name = "thefriendlystars",
                       'illumination>=0.0.12',
                       'pytest',
                       'PyYAML'],
+    extras_require={'fast':['numexpr']},
     zip_safe=False,
     license='MIT',
 )
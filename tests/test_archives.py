@@ -0,0 +1,102 @@
+'''
+Test the archive backends (without needing the internet).
+'''
+from thefriendlystars.imports import *
+from thefriendlystars.constellations import *
+from thefriendlystars import archives
+import threading, time, tempfile
+
+def test_retries():
+    '''
+    Are transient failures retried, and others not?
+    '''
+    a = archives.Archive(retries=2, backoff=0.0)
+
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError('try again!')
+        return 'ok'
+    assert(a.call('gaia', flaky) == 'ok')
+    assert(len(attempts) == 3)
+
+    def broken():
+        attempts.append(1)
+        raise ValueError('nope')
+    attempts.clear()
+    try:
+        a.call('gaia', broken)
+        raise AssertionError('this should have failed')
+    except ValueError:
+        pass
+    assert(len(attempts) == 1)
+
+def test_limits(N=8):
+    '''
+    Are simultaneous queries to one archive limited?
+    '''
+    a = archives.Archive(limits=dict(vizier=2))
+    running, most = [0], [0]
+    lock = threading.Lock()
+    def slow():
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+    threads = [threading.Thread(target=a.call, args=('vizier', slow)) for i in range(N)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert(most[0] <= 2)
+
+def test_sessions():
+    '''
+    Does each thread get its own session (sharing one pool of connections),
+    without touching astroquery's own services?
+    '''
+    import astroquery.skyview
+    a = archives.Archive()
+    original = astroquery.skyview.SkyView._session
+    service = a.share_session(astroquery.skyview.SkyViewClass())
+    assert(service._session is a.session)
+    assert(astroquery.skyview.SkyView._session is original)
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(a.session))
+    thread.start()
+    thread.join()
+    assert(sessions[0] is not a.session)
+    assert(sessions[0].get_adapter('https://') is a.session.get_adapter('https://') is a.adapter)
+
+def test_local(N=100):
+    '''
+    Does the local archive replay responses, and refuse unknown ones?
+    '''
+    directory = tempfile.mkdtemp()
+    local = archives.LocalArchive(directory, N=N)
+    center = SkyCoord(10*u.deg, 20*u.deg)
+    with archives.using(local):
+        first = LSPM.from_cone(center, radius=1*u.deg)
+        second = LSPM.from_cone(center, radius=1*u.deg)
+    assert(len(first.standardized) == N)
+    assert((first.ra == second.ra).all())
+    assert(archives.backend is not local)
+
+    strict = archives.LocalArchive(directory, synthesize=False)
+    try:
+        strict.query_gaia('SELECT * FROM nowhere')
+        raise AssertionError('this should have failed')
+    except LookupError:
+        pass
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
@@ -0,0 +1,42 @@
+'''
+Test that the offline benchmarks can run (quickly).
+'''
+from thefriendlystars.imports import *
+from thefriendlystars.benchmarks import *
+
+directory = 'examples'
+mkdir(directory)
+
+def test_synthetic(N=100):
+    '''
+    Can we standardize a synthetic Gaia table?
+    '''
+    raw = synthetic.gaia_table(N, seed=0)
+    standardized = Gaia.standardize_table(raw)
+    assert(len(standardized) == N)
+
+def test_offline(N=100):
+    '''
+    Can we make a Gaia cone, entirely offline?
+    '''
+    with offline(N):
+        g = Gaia(center)
+        assert(len(g.standardized) == N)
+
+def test_benchmarks(N=100):
+    '''
+    Can we run and compare the benchmarks?
+    '''
+    output = os.path.join(directory, 'benchmarks')
+    results = run(sizes=[N], repeat=1, directory=output)
+    assert(len(results['timings']) == len(benchmarks))
+    comparison = compare(results, results)
+    assert((comparison['ratio'] == 1).all())
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
@@ -0,0 +1,76 @@
+'''
+Test the management of the cache (without needing the internet).
+'''
+from thefriendlystars.constellations import *
+from thefriendlystars.images import *
+from thefriendlystars.benchmarks import offline, center
+from thefriendlystars import io, cache
+import time
+
+def test_cache():
+    with offline(100) as archive:
+        downloads = []
+        original = archive.query_gaia
+        def counted_query(query):
+            downloads.append(query)
+            return original(query)
+        archive.query_gaia = counted_query
+
+        # downloads are registered in the index, loads are counted
+        g = Gaia(center)
+        Gaia(center, radius=2*u.arcmin)
+        Gaia(center)
+        DSS2r(center)
+        c = cache.manager()
+        t = c.list()
+        print(t)
+        assert(len(t) == 3)
+        assert(t['hits'][t['name'] == os.path.basename(g.filename)][0] == 1)
+        assert(set(t['survey']) == {'Gaia', 'DSS2r'})
+
+        # stale files get downloaded again
+        try:
+            io.cache_ttl = dict(Gaia=1*u.s)
+            os.utime(g.filename, (time.time() - 10,)*2)
+            assert(c.list()['expired'].sum() == 1)
+            Gaia(center)
+            assert(len(downloads) == 3)
+        finally:
+            io.cache_ttl = {}
+
+        # eviction keeps the cache within its budget
+        assert(c.prune(budget=0, dry_run=True) != [])
+        assert(len(c.list()) == 3)
+        removed = c.prune(budget=sum(c.list()['size']) - 1, policy='lfu')
+        assert(len(removed) == 1)
+        assert(len(c.list()) == 2)
+
+        # registering a download doesn't list the whole directory, until the index is stale
+        try:
+            io.cache_budget = 1e12
+            stray = os.path.join(c.directory, 'Gaia-stray.pickled')
+            open(stray, 'w').close()
+            extra = [Gaia(center, radius=5*u.arcmin).filename]
+            assert('Gaia-stray.pickled' not in c._read())
+            c.rescan_every = 0
+            extra.append(Gaia(center, radius=6*u.arcmin).filename)
+            assert('Gaia-stray.pickled' in c._read())
+        finally:
+            io.cache_budget = None
+            del c.rescan_every
+        for f in [stray] + extra:
+            c.remove(f)
+        assert(len(c.list()) == 2)
+
+        # leftover lock files and partial writes aren't listed, but are cleared
+        leftovers = [os.path.join(c.directory, x) for x in ['Gaia-left.pickled.lock', '.Gaia-left.pickled.x.partial']]
+        for f in leftovers:
+            open(f, 'w').close()
+        os.utime(leftovers[1], (time.time() - 2*c.abandoned,)*2)
+        assert(len(c.list()) == 2)
+        c.clear()
+        assert(len(c.list()) == 0)
+        assert(not any(os.path.exists(f) for f in leftovers))
+
+if __name__ == '__main__':
+    test_cache()
@@ -0,0 +1,87 @@
+'''
+Test the `tfs` command-line tool (without needing the internet).
+'''
+from thefriendlystars.imports import *
+from thefriendlystars.benchmarks import offline, center, cluster
+from thefriendlystars import cli, cache, io
+import tempfile
+
+directory = 'examples'
+mkdir(directory)
+
+def test_jobs():
+    '''
+    Can jobs be read from CSV and YAML files?
+    '''
+    filename = os.path.join(directory, 'example-jobs.csv')
+    with open(filename, 'w') as f:
+        f.write('name,ra,dec,radius\nA,11.2,-15.3,2\nB,11.3,-15.2,\n')
+    jobs = cli.read_jobs(filename, images='DSS2r')
+    assert([j['name'] for j in jobs] == ['A', 'B'])
+    assert(jobs[0]['radius'] == '2' and jobs[1]['radius'] == cli.defaults['radius'])
+    assert(jobs[1]['images'] == 'DSS2r')
+
+    filename = os.path.join(directory, 'example-jobs.yaml')
+    with open(filename, 'w') as f:
+        f.write('defaults:\n  format: pdf\njobs:\n  - GJ1132\n  - target: LHS1140\n    radius: 3\n')
+    jobs = cli.read_jobs(filename)
+    assert([j['target'] for j in jobs] == ['GJ1132', 'LHS1140'])
+    assert(jobs[0]['format'] == 'pdf' and jobs[1]['radius'] == 3)
+
+def test_finders():
+    '''
+    Can we make finders in parallel, and skip them when they're up to date?
+    '''
+    output = tempfile.mkdtemp()
+    targets = cluster(3)
+    jobs = [dict(cli.defaults, name=f'star{i}', ra=c.ra.deg, dec=c.dec.deg,
+                 images='DSS2r', radius=2.0) for i, c in enumerate(targets)]
+    with offline(100):
+        report = cli.finders(jobs, directory=output, workers=2, progress=False)
+        assert(np.all(report['status'] == 'made'))
+        for f in report['filename']:
+            assert(os.path.exists(f) and os.path.exists(f + '.json'))
+
+        # changing one job remakes only that one
+        jobs[0]['dpi'] = 50
+        report = cli.finders(jobs, directory=output, workers=1, progress=False)
+        assert(list(report['status']) == ['made', 'skipped', 'skipped'])
+        assert(list(report['name']) == [j['name'] for j in jobs])
+
+def test_spawned():
+    '''
+    Do worker processes use the same backend, even when they're spawned (not forked)?
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    output = tempfile.mkdtemp()
+    job = dict(cli.defaults, name='spawned', ra=center.ra.deg, dec=center.dec.deg,
+               images='DSS2r', radius=2.0)
+    with offline(100) as archive:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=cli.warm,
+                                 initargs=(io.cache_directory, archive)) as pool:
+            pool.submit(cli.make, job, output).result()
+        assert(os.path.exists(cli.output_for(job, output)))
+        assert(len(cache.manager().list()) == 2)
+
+def test_cache():
+    '''
+    Can the cache be prewarmed (and listed) from the command line?
+    '''
+    filename = os.path.join(tempfile.mkdtemp(), 'targets.csv')
+    with open(filename, 'w') as f:
+        f.write(f'name,ra,dec\nA,{center.ra.deg},{center.dec.deg}\n')
+    with offline(100):
+        assert(cli.main(['cache', 'prewarm', filename]) == 0)
+        t = cache.manager().list()
+        assert({'Gaia', 'DSS2r', 'TwoMassJ'} <= set(t['survey']))
+        assert(cli.main(['cache', 'list']) == 0)
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
@@ -4,6 +4,7 @@ Test basic constellation abilities.
 
 from thefriendlystars.imports import *
 from thefriendlystars.constellations import *
+from thefriendlystars.benchmarks import offline, cluster, forget
 
 
 label = 'gaia'
@@ -33,6 +34,49 @@ def test_motion():
     sky = Gaia(None, distancelimit=15)
     sky.animate(os.path.join(directory, f'example-{label}-animation.mp4'), epochs=[0,10000], dt=500)
 
+def test_batch(N=1000):
+    '''
+    Can we download many cones with one query to Gaia?
+    '''
+    with offline(N) as archive:
+        queries = []
+        original = archive.query_gaia
+        def counted(query, **kwargs):
+            queries.append(query)
+            return original(query, **kwargs)
+        archive.query_gaia = counted
+
+        # one query (with the targets uploaded) covers all the targets
+        targets = cluster(10)
+        cones = Gaia.batch(targets, radius=1*u.arcmin)
+        assert(len(queries) == 1)
+        assert(len(cones) == 10)
+        for target, cone in zip(targets, cones):
+            stars = SkyCoord(cone.ra, cone.dec)
+            assert(0 < len(stars))
+            assert(np.all(stars.separation(target) <= 1*u.arcmin))
+
+        # and they're cached, as if they'd been downloaded one by one
+        Gaia(targets[0], radius=1*u.arcmin)
+        Gaia.batch(targets, radius=1*u.arcmin)
+        assert(len(queries) == 1)
+
+        # (which is what they'd have been, if they had been)
+        forget('Gaia')
+        alone = Gaia(targets[0], radius=1*u.arcmin)
+        assert(len(queries) == 2)
+        assert(np.all(alone.standardized['GaiaDR2-id'] == cones[0].standardized['GaiaDR2-id']))
+
+        # big lists of targets are split into a few queries
+        forget('Gaia')
+        original_size = Gaia.batch_size
+        Gaia.batch_size = 4
+        try:
+            Gaia.batch(targets, radius=1*u.arcmin)
+        finally:
+            Gaia.batch_size = original_size
+        assert(len(queries) == 5)
+
 if __name__ == '__main__':
     # pull out anything that starts with `test_`
     d = locals()
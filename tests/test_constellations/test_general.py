@@ -21,7 +21,185 @@ def test_custom(N=1000):
     sky = Constellation.from_coordinates(ra=ra, dec=dec, mag=mag)
     sky.finder()
     plt.savefig(os.path.join(directory, 'example-custom.pdf'))
-    
+
+def test_adapter(N=100):
+    '''
+    Can an Adapter standardize a catalog's table?
+    '''
+    from astropy.table import MaskedColumn
+    raw = Table([MaskedColumn(np.arange(N), name='ID'),
+                 MaskedColumn(np.linspace(0, 10, N), name='ra'),
+                 MaskedColumn(np.linspace(-5, 5, N), name='dec'),
+                 MaskedColumn(np.ones(N), name='pmRA', mask=np.arange(N) < 10),
+                 MaskedColumn(np.full(N, 2451545.0 + 365.25), name='date'),
+                 MaskedColumn(np.linspace(5, 15, N), name='Tmag')], masked=True)
+    adapter = adapters.Adapter(identifiers=dict(TIC='ID'),
+                               ra=('ra', 'deg'), dec=('dec', 'deg'),
+                               pm_ra_cosdec=('pmRA', 'mas/yr'),
+                               epoch=('date', 'jd'),
+                               filters=dict(T='Tmag'))
+    assert(adapter.columns == ['ID', 'ra', 'dec', 'pmRA', 'date', 'Tmag'])
+
+    standardized = adapter.standardize(raw, catalog='TIC')
+    assert(set(Constellation.coordinate_keys) < set(standardized.colnames))
+    assert(np.all(standardized['pm_ra_cosdec'][:10] == 0))
+    assert(np.all(standardized['pm_dec'] == 0))
+    assert(np.all(np.isnan(standardized['distance'])))
+    assert(np.allclose(standardized['obstime'], 2001.0))
+
+    # the subclasses of astroqueryConstellation take their keys from the adapter
+    assert(TIC.identifier_keys == ['TIC'])
+    assert(TwoMass.filters == ['J', 'H', 'Ks'])
+
+def test_epochs(N=100):
+    '''
+    Are propagations to (nearly) the same epoch reused?
+    '''
+    from thefriendlystars.benchmarks import synthetic_constellation
+    sky = synthetic_constellation(N, seed=0)
+
+    from thefriendlystars import instrumentation
+    def reused():
+        return instrumentation.instrument.records['Constellation.at_epoch']['counts']['reused']
+
+    instrumentation.reset()
+    then = sky.at_epoch(1998.0)
+    again = sky.at_epoch(Time(1998.0, format='decimalyear'))
+    assert(reused() == 1)
+    assert(again is not then)
+    assert(np.all(again.ra == then.ra))
+
+    # (by default, only exactly the same epoch is reused)
+    sky.at_epoch(1998.01)
+    assert(reused() == 1)
+    sky.epoch_tolerance = 0.1
+    sky.at_epoch(1998.05)
+    assert(reused() == 2)
+    assert(len(sky._propagated) == 2)
+
+    # each caller gets its own copy, so changing one doesn't change the others
+    then.standardized['ra'][:] = 0*u.deg
+    assert(np.all(sky.at_epoch(1998.0).ra == again.ra))
+
+    # copies (including propagations) don't carry the remembered epochs
+    assert(copy.deepcopy(sky)._propagated == {})
+    assert(then._propagated == {})
+
+    # arrays of epochs are never reused
+    dates = np.full(N, 1998.0)
+    assert(np.allclose(sky.at_epoch(dates).ra, again.ra))
+    assert(len(sky._propagated) == 2)
+
+    sky.forget_epochs()
+    assert(sky._propagated == {})
+
+    # only the most recently used propagations are kept
+    sky.epoch_tolerance = 0.0
+    for year in np.arange(2 * sky.epochs_remembered):
+        sky.at_epoch(1900.0 + year)
+    assert(len(sky._propagated) == sky.epochs_remembered)
+    assert(1900.0 not in sky._propagated)
+    assert(1900.0 + 2*sky.epochs_remembered - 1 in sky._propagated)
+
+def test_region(N=10000):
+    '''
+    Can we quickly pick out the stars that might be in a small region?
+    '''
+    from thefriendlystars.benchmarks import synthetic_constellation
+    sky = synthetic_constellation(N, seed=0)
+    center, radius = SkyCoord(30*u.deg, 20*u.deg), 5*u.deg
+
+    region = sky.region(center, radius, epochs=[1950.0, 2050.0])
+    assert(0 < len(region.standardized) < N)
+    assert(sky.region(center, radius, epochs=2000.0) is region)
+
+    # every star that's inside at those epochs is in the region
+    for epoch in [1950.0, 2050.0]:
+        inside = sky.at_epoch(epoch).skycoord().separation(center) < radius
+        found = set(region.standardized['object-id'])
+        assert(set(sky.standardized['object-id'][inside]) <= found)
+
+    # a span of epochs that's not covered makes a new region
+    assert(sky.region(center, radius, epochs=1900.0) is not region)
+
+    # only the most recently used regions are kept
+    for i in range(sky.regions_remembered + 1):
+        sky.region(SkyCoord((40 + i)*u.deg, 20*u.deg), radius)
+    assert(len(sky._regions) == sky.regions_remembered)
+    assert(sky.region(center, radius, epochs=2000.0) is not region)
+    return region
+
+def test_paths(N=20000):
+    '''
+    Can we find the stars in a cone, at any epoch, without propagating them all?
+    '''
+    r = np.random.RandomState(0)
+    ra, dec = r.uniform(20, 40, N), r.uniform(10, 30, N)
+    pm = r.normal(0, 20, (2, N))
+    pm[:, :20] = r.normal(0, 5000, (2, 20))
+    sky = Constellation.from_coordinates(ra=ra*u.deg, dec=dec*u.deg,
+                                         pm_ra_cosdec=pm[0]*u.mas/u.year,
+                                         pm_dec=pm[1]*u.mas/u.year,
+                                         obstime=2015.5*np.ones(N)*u.year)
+
+    # the fast stars are kept apart from the slow ones
+    assert(len(sky.paths.tiers) > 1)
+    assert(len(sky.paths.candidates(SkyCoord(30*u.deg, 20*u.deg), 1*u.arcmin)) < N/100)
+
+    for epoch in [1900.0, 1953.2, 2100.0, 2500.0]:
+        for center in [SkyCoord(30*u.deg, 20*u.deg), SkyCoord(ra[0]*u.deg, dec[0]*u.deg)]:
+            radius = 0.5*u.deg
+            inside = sky.at_epoch(epoch).skycoord().separation(center) < radius
+            cone = sky.cone(center, radius, epoch)
+            assert(set(cone.standardized['object-id']) == set(sky.standardized['object-id'][inside]))
+    return sky
+
+def test_uncertainties(N=1000):
+    '''
+    Can we propagate the uncertainties of positions to other epochs?
+    '''
+    from thefriendlystars.benchmarks import offline, center
+    from thefriendlystars import kernels
+    with offline(N):
+        g = Gaia(center)
+
+    # at its own epoch, the uncertainties are those of the positions
+    sigma_ra, sigma_dec = g.uncertainties_at(g.epoch)
+    assert(np.allclose(sigma_ra, g.standardized['ra-error']))
+
+    # they grow with the uncertainties of the proper motions
+    dt = 1950.0 - g.epoch
+    expected = np.hypot(g.error('dec', u.mas), g.error('pm_dec', u.mas/u.year)*dt)
+    sigma_ra, sigma_dec = g.uncertainties_at(1950.0)
+    assert(np.allclose(sigma_dec.to_value(u.mas), expected, equal_nan=True))
+    then = g.at_epoch(1950.0)
+    assert(np.allclose(then.standardized['dec-error'], sigma_dec, equal_nan=True))
+
+    # Monte Carlo samples scatter by about the same amount
+    original = kernels.workers, kernels.chunk_size
+    kernels.chunk_size = 10000
+    try:
+        ra, dec = g.sample_at(1950.0, samples=1000, seed=42)
+        assert(ra.shape == (N, 1000))
+        measured = np.std(dec.to_value(u.mas), axis=1)
+        ok = np.isfinite(expected)
+        assert(np.allclose(np.median(measured[ok]/expected[ok]), 1, atol=0.02))
+
+        # (and are the same, however many threads drew them)
+        kernels.workers = 3
+        again, _ = g.sample_at(1950.0, samples=1000, seed=42)
+        assert(np.all((again == ra) | np.isnan(ra)))
+    finally:
+        kernels.workers, kernels.chunk_size = original
+
+    # the ellipses are drawn as one collection
+    plt.figure()
+    then.plot(ellipses=3)
+    assert(len(plt.gca().collections) == 2)
+    assert(len(plt.gca().collections[1].get_offsets()) == N)
+    plt.savefig(os.path.join(directory, 'example-ellipses.png'))
+    return then
+
 if __name__ == '__main__':
     # pull out anything that starts with `test_`
     d = locals()
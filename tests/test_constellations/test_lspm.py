@@ -4,6 +4,7 @@ Test basic constellation abilities.
 
 from thefriendlystars.imports import *
 from thefriendlystars.constellations import *
+from thefriendlystars.benchmarks import offline
 
 label = 'lspm'
 directory = 'examples'
@@ -23,6 +24,60 @@ def test_motion(magnitudelimit=10):
     sky = LSPM.from_sky(magnitudelimit=magnitudelimit)
     sky.animate(os.path.join(directory, f'example-{label}-animation.mp4'), epochs=[0,10000], dt=500)
 
+def test_ingest():
+    store = os.path.join(directory, f'example-{label}-store')
+    with offline(1000) as archive:
+        sky = LSPM.from_sky()
+
+        # interrupt the ingest partway through
+        original = archive.query_vizier
+        calls = []
+        def flaky(*args, **kwargs):
+            calls.append(args)
+            if len(calls) % 3 == 0:
+                raise RuntimeError('the connection dropped')
+            return original(*args, **kwargs)
+        archive.query_vizier = flaky
+        try:
+            LSPM.ingest(directory=store, N=12, workers=2, progress=False, overwrite=True)
+            assert(False)
+        except IOError:
+            pass
+        done = dict(stream.Store(store).progress['done'])
+        assert(0 < len(done) < 12)
+
+        # resuming only downloads the missing slices
+        archive.query_vizier = original
+        LSPM.ingest(directory=store, N=12, progress=False)
+        assert(len(calls) == 12)
+
+        # every star lands in the store exactly once
+        stored = LSPM.from_store(store)
+        assert(len(stored.standardized) == len(sky.standardized))
+        assert(set(stored.standardized['LSPM-id']) == set(sky.standardized['LSPM-id']))
+        bright = LSPM.from_store(store, magnitudelimit=10)
+        assert(len(bright.standardized) == np.sum(sky.magnitude < 10))
+
+        # (the whole store stays memory-mapped, rather than being copied)
+        def mapped(x):
+            while x is not None:
+                if isinstance(x, np.memmap):
+                    return True
+                x = getattr(x, 'base', None)
+            return False
+        assert(mapped(stored.standardized['ra']))
+        assert(not mapped(bright.standardized['ra']))
+
+        # a store where no slice has any stars can still be combined
+        empty = stream.Store(os.path.join(directory, f'example-{label}-empty-store'))
+        empty.start(dict(catalog=LSPM.catalog))
+        for i in range(3):
+            empty.record(i, 0, empty.write_chunk(i, sky.standardized[:0]))
+        empty.combine()
+        table = empty.open()
+        assert(len(table) == 0)
+        assert(table['ra'].dtype == sky.standardized['ra'].dtype)
+
 if __name__ == '__main__':
     # pull out anything that starts with `test_`
     d = locals()
@@ -0,0 +1,60 @@
+'''
+Test the TESS Input Catalog constellation (without needing the internet).
+'''
+
+from thefriendlystars.imports import *
+from thefriendlystars.constellations import *
+from thefriendlystars.benchmarks import offline, center, cluster
+
+label = 'tic'
+directory = 'examples'
+mkdir(directory)
+
+def test_cone(N=1000):
+    with offline(N):
+        cone = TIC(center, radius=3*u.arcmin)
+        assert(0 < len(cone.standardized) <= N)
+        assert(np.all(cone.magnitude < TIC.magnitudelimit))
+        assert(np.all(np.isfinite(cone.pm_ra_cosdec)))
+        moved = cone.at_epoch(2020.0)
+        assert(np.all(np.isfinite(moved.ra)))
+        cone.finder()
+        plt.savefig(os.path.join(directory, f'example-{label}-cone.pdf'))
+
+def test_batch(N=1000):
+    with offline(N) as archive:
+        queries = []
+        original = archive.query_mast_catalog
+        def counted(*args, **kwargs):
+            queries.append(args)
+            return original(*args, **kwargs)
+        archive.query_mast_catalog = counted
+
+        # one query covers all the targets in a cluster
+        targets = cluster(10)
+        cones = TIC.batch(targets, radius=1*u.arcmin)
+        assert(len(queries) == 1)
+        assert(len(cones) == 10)
+        for target, cone in zip(targets, cones):
+            stars = SkyCoord(cone.ra, cone.dec)
+            assert(np.all(stars.separation(target) <= 1*u.arcmin))
+
+        # and they're cached, as if they'd been downloaded one by one
+        TIC(targets[0], radius=1*u.arcmin)
+        TIC.batch(targets, radius=1*u.arcmin)
+        assert(len(queries) == 1)
+        assert(TIC.needing_download(targets, radius=1*u.arcmin) == [])
+
+        # (each was made as a whole constellation, just without downloading)
+        made = TIC.from_standardized(cones[0].standardized, targets[0], 1*u.arcmin)
+        assert(made.filename == cones[0].filename)
+        assert(made._propagated == {} and made._regions == {})
+        assert(np.all(made.at_epoch(2020.0).ra == cones[0].at_epoch(2020.0).ra))
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
@@ -0,0 +1,70 @@
+'''
+Test the 2MASS constellation, with its per-star epochs (without needing the internet).
+'''
+
+from thefriendlystars.imports import *
+from thefriendlystars.constellations import *
+from thefriendlystars.benchmarks import offline, center, synthetic_constellation
+
+label = 'twomass'
+directory = 'examples'
+mkdir(directory)
+
+def test_cone(N=1000):
+    with offline(N):
+        cone = TwoMass(center)
+        assert(0 < len(cone.standardized) <= N)
+        assert(np.shape(cone.epoch) == (len(cone.standardized),))
+        assert(np.all((cone.epoch > 1997) & (cone.epoch < 2001.1)))
+        cone.finder()
+        assert('1997' in plt.gca().collections[0].get_label())
+        plt.savefig(os.path.join(directory, f'example-{label}-cone.pdf'))
+
+def test_epochs(N=1000):
+    '''
+    Are the stars each moved by their own time difference, and matched that way?
+    '''
+    reference = synthetic_constellation(N, seed=0, epoch=2015.5)
+    dates = np.random.RandomState(1).uniform(1997, 2001, N)
+    observed = reference.at_epoch(dates)
+    assert(np.all(observed.epoch == dates))
+
+    # moving each star back again recovers the original positions
+    back = observed.at_epoch(2015.5)
+    assert(np.allclose(back.ra.to('deg').value, reference.ra.to('deg').value))
+
+    # the cross-match is exact for every star
+    ok, i_ref = observed.crossMatchTo(reference, radius=0.01*u.arcsec)
+    assert(np.all(ok))
+    assert(np.all(i_ref == np.arange(N)))
+
+def test_fast(N=2):
+    '''
+    Is each star matched to the reference star closest to it at its own epoch,
+    even when a fast mover lands on a different star at the typical epoch?
+    '''
+    # a fast star, and a still one 3" from where the fast one was in 2005
+    ra, dec = [10.0, 10.0], [20.0, 20.0 + 3/3600]
+    reference = Constellation.from_coordinates(ra=ra*u.deg, dec=dec*u.deg,
+                                               pm_ra_cosdec=[0, 0]*u.mas/u.year,
+                                               pm_dec=[5000, 0]*u.mas/u.year,
+                                               obstime=2005.0*u.year)
+    observed = Constellation.from_coordinates(ra=ra*u.deg, dec=dec*u.deg,
+                                              obstime=[2005.0, 2025.0]*u.year)
+    ok, i_ref = observed.crossMatchTo(reference, radius=1*u.arcsec)
+    assert(np.all(ok))
+    assert(np.all(i_ref == [0, 1]))
+
+    # references without proper motions are matched where they are
+    still = Constellation.from_coordinates(ra=ra*u.deg, dec=dec*u.deg)
+    ok, i_ref = observed.crossMatchTo(still, radius=1*u.arcsec)
+    assert(np.all(ok))
+    assert(np.all(i_ref == [0, 1]))
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
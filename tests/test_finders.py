@@ -3,6 +3,7 @@ Test basic finder capabilities.
 '''
 from thefriendlystars.imports import *
 from thefriendlystars.finders import *
+from thefriendlystars.benchmarks import offline
 
 directory = 'examples'
 mkdir(directory)
@@ -30,6 +31,113 @@ def test_grid():
 
     return f
 
+def test_template():
+    '''
+    Can we reuse one plotted finder for many targets?
+    '''
+    centers = [SkyCoord(ra*u.deg, -15*u.deg) for ra in [10, 20, 30]]
+    with offline(100):
+        t = FinderTemplate(radius=2*u.arcmin, images=[DSS2r, TwoMassJ])
+        first = t.savefig(centers[0], os.path.join(directory, 'example-template-0.png'))
+        artists = [len(p.ax.get_children()) for p in t.finder.panels]
+        for i, c in enumerate(centers[1:]):
+            again = t.savefig(c, os.path.join(directory, f'example-template-{i+1}.png'))
+
+            # the same figure, with no new artists, showing the new stars
+            assert(again is first)
+            assert([len(p.ax.get_children()) for p in t.finder.panels] == artists)
+            panel = t.finder.panels[0]
+            scatter = panel.plotted['constellations'][0]
+            now, (xi, eta) = panel.locate(panel.constellations[0])
+            assert(panel.constellations[0].meta['center'].separation(c) < 1*u.arcsec)
+            assert(np.allclose(scatter.get_offsets(), np.transpose([xi.to_value('arcmin'), eta.to_value('arcmin')])))
+            assert(t.finder.suptitle.get_text() == t.finder.title())
+
+    return t
+
+def test_render():
+    '''
+    Can we render finders straight to raster images?
+    '''
+    from thefriendlystars.render import downsample
+    from PIL import Image as PILImage
+
+    image = np.arange(36.0).reshape(6, 6)
+    assert(downsample(image, 2).shape == (3, 3))
+    assert(downsample(image, 4).shape == (1, 1))
+    assert(downsample(image, 2)[0, 0] == np.mean(image[:2, :2]))
+
+    with offline(100):
+        f = Finder(SkyCoord(10*u.deg, -15*u.deg), radius=2*u.arcmin,
+                   images=[DSS2r, TwoMassJ], constellations=[Gaia])
+        for dpi in [50, 100]:
+            rgba = f.render(dpi=dpi)
+            width, height = f.illustration.figure.get_size_inches()*dpi
+            assert(rgba.shape == (int(round(height)), int(round(width)), 4))
+            assert(rgba.dtype == np.uint8)
+        for format in ['png', 'jpg', 'webp']:
+            filename = os.path.join(directory, f'example-render.{format}')
+            f.render(filename, dpi=50)
+            assert(PILImage.open(filename).size == (rgba.shape[1]//2, rgba.shape[0]//2))
+
+def test_center():
+    '''
+    Is a finder's center resolved only once, for all its panels?
+    '''
+    from thefriendlystars import field
+
+    resolved = []
+    def fake(name):
+        resolved.append(name)
+        return SkyCoord(10*u.deg, -15*u.deg)
+
+    original = field.get
+    field.get = fake
+    try:
+        with offline(100):
+            f = Finder('Fake Star', radius=2*u.arcmin,
+                       images=[DSS2r, TwoMassJ], constellations=[Gaia])
+            again = Finder('Fake Star', radius=2*u.arcmin,
+                           images=[DSS2r], constellations=[Gaia])
+    finally:
+        field.get = original
+
+    assert(resolved == ['Fake Star'])
+    assert(all(p.center is f.center for p in f.panels))
+    assert(f.center == again.center)
+    assert(hash(f.center) == hash(again.center))
+    assert('FakeStar' in f.panels[0].image.filename)
+    assert(f.title().startswith('Fake Star'))
+    return f
+
+def test_overlays(N=2000):
+    '''
+    Can we overlay ellipses, labels, and matches, one artist per layer?
+    '''
+    with offline(N):
+        p = Panel(SkyCoord(10*u.deg, -15*u.deg), radius=2*u.arcmin, image=DSS2r, constellations=[Gaia])
+        p.plot()
+        before = len(p.ax.get_children())
+        g = p.constellations[0]
+        ellipses = p.draw_ellipses(nsigma=100)
+        labels = p.draw_labels(limit=20)
+        matches = p.draw_matches(g, g)
+        assert(len(p.ax.get_children()) == before + 3)
+        assert(len(matches.get_segments()) == len(g.standardized))
+
+        plt.savefig(os.path.join(directory, 'example-overlays.png'))
+        shown = labels[0].shown
+        assert(0 < len(shown) <= 20)
+
+        # the labels shown are in order of brightness
+        magnitudes = np.asarray(g.magnitude)[shown]
+        assert(np.all(np.diff(magnitudes) >= 0))
+
+        # a new panel's data replaces the overlays
+        other = Panel(SkyCoord(20*u.deg, -15*u.deg), radius=2*u.arcmin, image=DSS2r, constellations=[Gaia])
+        p.swap(other)
+        assert(len(p.ax.get_children()) == before)
+    return p
 
 if __name__ == '__main__':
     # pull out anything that starts with `test_`
@@ -1,5 +1,7 @@
 from thefriendlystars import *
 from thefriendlystars.panels import *
+from thefriendlystars.benchmarks import offline, center
+from matplotlib.transforms import Affine2D
 
 directory = 'examples'
 mkdir(directory)
@@ -15,6 +17,70 @@ def test_tessffi():
     i.imshow()
     plt.savefig(os.path.join(directory,'example-tess-image.pdf'))
 
+def test_statistics():
+    with offline(100):
+        i = DSS2r(center, radius=2*u.arcmin)
+
+        # the statistics are calculated once, and close to exact
+        s = i.statistics
+        assert(i.statistics is s)
+        assert(np.isclose(s['median'], np.median(i.data), atol=s['mad_std']))
+        assert(np.isclose(s['max'], np.max(i.data)))
+
+        # each level of the pyramid is half the size of the one before
+        shapes = [np.shape(p) for p in i.pyramid]
+        assert(shapes[0] == i.data.shape)
+        assert(all(b[0] == a[0]//2 for a, b in zip(shapes[:-1], shapes[1:])))
+        assert(i.level_for(Affine2D().scale(1.0)) == 0)
+        assert(i.level_for(Affine2D().scale(0.25)) == 2)
+        assert(i.level_for(Affine2D().scale(1e-6)) == len(i.pyramid) - 1)
+
+        # replacing the data resets them
+        i.data = i.data[:100, :100]
+        assert(i.statistics is not s)
+        assert(i.pyramid[0].shape == (100, 100))
+
+        # panels draw the pyramid level that matches their size (whenever they're drawn)
+        p = Panel(center, radius=2*u.arcmin, image=i, constellations=[])
+        p.plot()
+        figure = p.ax.figure
+        shapes = []
+        for dpi in [10, 400]:
+            figure.savefig(os.path.join(directory, f'example-pyramid-{dpi}.png'), dpi=dpi)
+            shapes.append(p.plotted['image'].get_array().shape)
+        assert(shapes[0][0] < shapes[1][0] == i.pyramid[0].shape[0])
+        assert(shapes[0] in [np.shape(x) for x in i.pyramid])
+
+def test_processing():
+    with offline(100):
+        i = DSS2r(center, radius=2*u.arcmin, process=['subtractbackground', 'clip', 'crop'])
+
+        # native floats, with the background removed, read-only
+        assert(i.data.dtype == np.float32)
+        assert(i.data.dtype.isnative)
+        assert(np.abs(np.median(i.data)) < i.statistics['mad_std'])
+        assert(np.min(i.data) >= -i.clip_below*i.statistics['mad_std'] - 1e-3)
+        assert(not i.data.flags.writeable)
+
+        # cropped to (a little more than) the radius
+        rows, cols = i.data.shape
+        middle = i.wcs.pixel_to_world((cols - 1)/2, (rows - 1)/2)
+        assert(middle.separation(center) < 5*u.arcsec)
+        assert(rows < DSS2r(center, radius=2*u.arcmin).data.shape[0])
+
+        # (with a header that matches)
+        assert((i.header['NAXIS1'], i.header['NAXIS2']) == (cols, rows))
+        assert(WCS(i.header).pixel_to_world((cols - 1)/2, (rows - 1)/2).separation(middle) < 0.01*u.arcsec)
+
+        # making the data native doesn't scramble the downloaded data
+        plain = DSS2r(center, radius=2*u.arcmin, process=None)
+        assert(plain._downloaded.data.dtype.isnative)
+        assert(np.all(plain._downloaded.data == plain.data))
+
+        # identical images reuse the processed data
+        again = DSS2r(center, radius=2*u.arcmin, process=['subtractbackground', 'clip', 'crop'])
+        assert(again.data is i.data)
+
 
 if __name__ == '__main__':
     # pull out anything that starts with `test_`
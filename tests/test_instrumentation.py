@@ -0,0 +1,51 @@
+'''
+Test the timers and counters that keep track of where time goes.
+'''
+from thefriendlystars.imports import *
+from thefriendlystars.constellations import *
+from thefriendlystars import instrumentation
+import json
+
+directory = 'examples'
+mkdir(directory)
+
+def test_timers(N=1000):
+    '''
+    Do timers and counters get recorded and reported?
+    '''
+    instrumentation.reset()
+
+    ra = np.random.uniform(0, 360, N)*u.deg
+    dec = np.random.uniform(-90,90, N)*u.deg
+    pm = np.random.normal(0, 100, N)*u.mas/u.year
+    sky = Constellation.from_coordinates(ra=ra, dec=dec, pm_ra_cosdec=pm, pm_dec=pm)
+    for epoch in [1950, 2000, 2050]:
+        sky.at_epoch(epoch)
+
+    with instrumentation.timer('test.something') as counts:
+        counts['bytes_read'] += 42
+    instrumentation.count('test.something', cache_hits=1)
+
+    t = instrumentation.table()
+    row = t[t['name'] == 'Constellation.at_epoch'][0]
+    assert(row['calls'] == 3)
+    assert(row['rows'] == 3*N)
+    assert(row['wall'] > 0)
+
+    filename = os.path.join(directory, 'example-timing.json')
+    instrumentation.to_json(filename, note='test')
+    with open(filename) as f:
+        reread = json.load(f)
+    assert(reread['records']['test.something']['bytes_read'] == 42)
+    assert(reread['records']['test.something']['cache_hits'] == 1)
+    assert(reread['records']['test.something']['calls'] == 1)
+
+    instrumentation.print_table()
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
@@ -2,6 +2,9 @@
 Test input/output capabilities.
 '''
 from thefriendlystars.constellations import *
+from thefriendlystars.benchmarks import offline, center
+from thefriendlystars import io
+import threading, time
 
 directory = 'examples'
 mkdir(directory)
@@ -13,6 +16,76 @@ def test_io():
     reread = LSPM.from_text(filename)
     assert((reread.at_epoch(2000).ra == cone.at_epoch(2000).ra).all())
 
+def test_coalescing(N=8):
+    '''
+    Do simultaneous constructions of the same Field download only once?
+    '''
+    with offline(100) as archive:
+        downloads = []
+        original = archive.query_gaia
+        def slow_query(query):
+            downloads.append(query)
+            time.sleep(0.2)
+            return original(query)
+        archive.query_gaia = slow_query
+
+        threads = [threading.Thread(target=Gaia, args=(center,)) for i in range(N)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert(len(downloads) == 1)
+
+        # a damaged cache file should be treated as missing
+        g = Gaia(center)
+        with open(g.filename, 'wb') as f:
+            f.write(b'not a pickle')
+        Gaia(center)
+        assert(len(downloads) == 2)
+
+def test_atomic():
+    '''
+    Does an interrupted write leave the original file untouched?
+    '''
+    filename = os.path.join(directory, 'atomic.txt')
+    with io.atomic(filename) as temporary:
+        with open(temporary, 'w') as f:
+            f.write('complete')
+    try:
+        with io.atomic(filename) as temporary:
+            with open(temporary, 'w') as f:
+                f.write('partial')
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    with open(filename) as f:
+        assert(f.read() == 'complete')
+    assert(not [x for x in os.listdir(directory) if x.endswith('.partial')])
+
+def test_exclusive(N=8):
+    '''
+    Do exclusive sections take turns, and clean up after themselves?
+    '''
+    filename = os.path.join(directory, 'exclusive.txt')
+    inside, most = [0], [0]
+    def work():
+        with io.exclusive(filename):
+            inside[0] += 1
+            most[0] = max(most[0], inside[0])
+            time.sleep(0.01)
+            assert(os.path.exists(filename + '.lock'))
+            inside[0] -= 1
+    threads = [threading.Thread(target=work) for i in range(N)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert(most[0] == 1)
+
+    # no lock files or locks are left behind
+    assert(not os.path.exists(filename + '.lock'))
+    assert(os.path.abspath(filename) not in io._locks)
+
 if __name__ == '__main__':
     # pull out anything that starts with `test_`
     d = locals()
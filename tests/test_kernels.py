@@ -0,0 +1,68 @@
+'''
+Test the chunked, threaded numerical kernels.
+'''
+from thefriendlystars.imports import *
+from thefriendlystars import kernels
+from thefriendlystars.benchmarks import synthetic_constellation, scaling
+
+def test_propagate(N=10000):
+    '''
+    Do chunks and threads give the same answers as Quantity arithmetic?
+    '''
+    r = np.random.RandomState(0)
+    ra, dec = r.uniform(0, 360, N)*u.deg, r.uniform(-89, 89, N)*u.deg
+    pmra, pmdec = r.normal(0, 100, N)*u.mas/u.year, r.normal(0, 100, N)*u.mas/u.year
+    dt = r.uniform(-100, 100, N)*u.year
+
+    expected_ra = (ra + pmra/np.cos(dec)*dt).to_value(u.deg)
+    expected_dec = (dec + pmdec*dt).to_value(u.deg)
+
+    original = kernels.chunk_size
+    kernels.chunk_size = 1000
+    try:
+        for n in [1, 3]:
+            newra, newdec = kernels.propagate(ra.value, dec.value, pmra.value, pmdec.value, dt.value, n=n)
+            assert(np.allclose(newra, expected_ra, rtol=0, atol=1e-12))
+            assert(np.allclose(newdec, expected_dec, rtol=0, atol=1e-12))
+
+        # single values are shared by every star
+        newra, newdec = kernels.propagate(ra.value, dec.value, 0.0, 0.0, 10.0, n=2)
+        assert(np.all(newra == ra.value) and np.all(newdec == dec.value))
+    finally:
+        kernels.chunk_size = original
+
+def test_crossmatch(N=10000):
+    '''
+    Do threaded cross-matches find the same stars as astropy?
+    '''
+    sky = synthetic_constellation(N, seed=0)
+    this = sky.at_epoch(1990.0)
+    expected, d2d, _ = this.skycoord().match_to_catalog_sky(sky.skycoord())
+    original = kernels.workers
+    try:
+        for n in [1, 4]:
+            kernels.workers = n
+            indices, separations = kernels.nearest(this.ra.value, this.dec.value, sky.ra.value, sky.dec.value)
+            assert(np.all(indices == expected))
+            assert(np.allclose(separations, d2d.deg, rtol=0, atol=1e-10))
+            ok, i_ref = this.crossMatchTo(sky)
+            assert(np.all(i_ref == np.arange(N)[ok]))
+    finally:
+        kernels.workers = original
+
+def test_scaling(N=10000):
+    '''
+    Can we measure the speedup from more threads?
+    '''
+    t = scaling(N, workers=[1, 2], repeat=1)
+    assert(list(t['workers']) == [1, 2])
+    assert(t['at_epoch_speedup'][0] == 1)
+    return t
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
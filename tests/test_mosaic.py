@@ -0,0 +1,72 @@
+'''
+Test cutting images out of shared tiles (without needing the internet).
+'''
+from thefriendlystars.images import *
+from thefriendlystars.images import mosaic
+from thefriendlystars import io
+from thefriendlystars.benchmarks import offline, center
+
+def test_mosaic():
+    nearby = center.directional_offset_by(45*u.deg, 2*u.arcmin)
+    with offline(100) as archive:
+        downloads = []
+        original = archive.get_skyview_images
+        def counted(*args, **kwargs):
+            downloads.append(kwargs)
+            return original(*args, **kwargs)
+        archive.get_skyview_images = counted
+
+        try:
+            mosaic.pixelscale = 4*u.arcsec
+            mosaic.get_tile.cache_clear()
+
+            # two images of nearby targets share one tile
+            a = DSS2r(center, radius=2*u.arcmin, mosaic=True)
+            b = DSS2r(nearby, radius=2*u.arcmin, mosaic=True)
+            assert(len(downloads) == 1)
+            assert(mosaic.get_tile.cache_info().hits == 1)
+
+            # the cutouts are views of the tile's pixels
+            header, data, wcs = mosaic.cutout('DSS2 Red', center, 4*u.arcmin)
+            tile = mosaic.get_tile('DSS2 Red', *mosaic.locate(center), 0.5, 0.1, 4.0, io.cache_directory, archive)
+            assert(np.shares_memory(data, tile.data))
+
+            # (and stay views, unless a processing step changes the pixels)
+            viewed = DSS2r(center, radius=2*u.arcmin, mosaic=True, process=None)
+            assert(np.shares_memory(viewed.data, tile.data))
+            assert(not np.shares_memory(a.data, tile.data))
+            before = tile.data.copy()
+            DSS2r(nearby, radius=2*u.arcmin, mosaic=True, process=['subtractbackground', 'clip'])
+            assert(np.all(tile.data == before))
+
+            # the cutouts are centered in the right places
+            for image, target in [(a, center), (b, nearby)]:
+                rows, cols = image.data.shape
+                middle = image.wcs.pixel_to_world((cols - 1)/2, (rows - 1)/2)
+                assert(middle.separation(target) < 5*u.arcsec)
+                assert(image.epoch is not None)
+                image.derive_pix2local()
+
+            # an image too big for a tile is downloaded on its own
+            DSS2r(center, radius=10*u.arcmin, mosaic=True)
+            assert(len(downloads) == 2)
+
+            # a different archive (or cache directory) gets its own tiles
+            with offline(100) as other:
+                cut = mosaic.cutout('DSS2 Red', center, 4*u.arcmin)[1]
+                assert(not np.shares_memory(cut, tile.data))
+        finally:
+            mosaic.pixelscale = 1*u.arcsec
+            mosaic.get_tile.cache_clear()
+
+def test_grid():
+    for dec in [-89.9, -45, 0, 30, 89.9]:
+        for ra in [0, 90, 359.9]:
+            c = SkyCoord(ra*u.deg, dec*u.deg)
+            band, column = mosaic.locate(c)
+            middle = mosaic.tile_center(band, column, mosaic.tile_size.to('deg').value)
+            assert(np.abs(middle.dec - c.dec) <= mosaic.tile_size/2)
+
+if __name__ == '__main__':
+    test_mosaic()
+    test_grid()
@@ -0,0 +1,30 @@
+'''
+Test prewarming the cache (without needing the internet).
+'''
+from thefriendlystars.finders import *
+from thefriendlystars.benchmarks import offline, center
+from thefriendlystars.prewarm import prewarm
+from thefriendlystars import instrumentation
+
+def test_prewarm():
+    targets = [center, center.directional_offset_by(0*u.deg, 1*u.deg)]
+    with offline(100):
+        report = prewarm(targets, images=[DSS2r, TwoMassJ, TESS],
+                                  constellations=[Gaia],
+                                  radius=2*u.arcmin)
+        print(report)
+        assert(len(report) == 8)
+
+        # there are no recorded TESS cutouts to replay
+        failed = report[report['error'] != '']
+        assert(set(failed['field']) == {'TESS'})
+
+        # everything else should now be loaded, not downloaded
+        instrumentation.reset()
+        Finder(center, radius=2*u.arcmin, images=[DSS2r, TwoMassJ], constellations=[Gaia])
+        counts = instrumentation.table()
+        assert('Gaia.download' not in counts['name'])
+        assert('DSS2r.download' not in counts['name'])
+
+if __name__ == '__main__':
+    test_prewarm()
@@ -0,0 +1,85 @@
+'''
+Test the finder chart service (without needing the internet).
+'''
+from thefriendlystars.imports import *
+from thefriendlystars.benchmarks import offline, cluster
+from thefriendlystars import service
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+from urllib.error import HTTPError
+import threading, json
+
+def test_service():
+    with offline(100):
+        httpd = service.server(port=0, workers=4)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{httpd.server_address[1]}'
+        def get(path):
+            with urlopen(base + path) as response:
+                return response.read()
+        try:
+            # several charts at once
+            urls = [f'/finder?ra={c.ra.deg}&dec={c.dec.deg}&images=DSS2r&radius=2&dpi=50' for c in cluster(3)]
+            with ThreadPoolExecutor(3) as pool:
+                charts = list(pool.map(get, urls))
+            for chart in charts:
+                assert(chart[:8] == b'\x89PNG\r\n\x1a\n')
+
+            # the same chart again comes straight from memory
+            assert(get(urls[0]) == charts[0])
+            # a new format for the same finder reuses its data
+            assert(get(urls[0] + '&format=jpeg')[:2] == b'\xff\xd8')
+            stats = json.loads(get('/stats'))
+            assert(stats['chart_hits'] == 1)
+            assert(stats['finder_hits'] == 1)
+            assert(stats['templates'] == 1)
+
+            # bad requests are refused
+            try:
+                get('/finder?images=DSS2r')
+                assert(False)
+            except HTTPError as e:
+                assert(e.code == 400)
+            for bad in ['images=DSS2r,Nonsense', 'constellations=os']:
+                try:
+                    get(f'/finder?ra=10&dec=-15&{bad}')
+                    assert(False)
+                except HTTPError as e:
+                    assert(e.code == 400)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+def test_failure():
+    '''
+    Is a template that fails partway through showing a finder replaced?
+    '''
+    with offline(100):
+        s = service.Service()
+        a, b, c = cluster(3)
+        chart = lambda x: s.chart(ra=x.ra.deg, dec=x.dec.deg, images='DSS2r,TwoMassJ', radius=2, dpi=50)
+        chart(a)
+        (layout, template), = s.templates.items()
+        def broken(other):
+            raise RuntimeError('this panel failed')
+        template.finder.panels[1].swap = broken
+        try:
+            chart(b)
+            assert(False)
+        except RuntimeError:
+            pass
+        assert(layout not in s.templates)
+
+        # the next chart gets a fresh template
+        chart(c)
+        assert(s.templates[layout] is not template)
+        shown = s.templates[layout].finder
+        assert(all(p.center == shown.center for p in shown.panels))
+
+if __name__ == '__main__':
+    # pull out anything that starts with `test_`
+    d = locals()
+    tests = [x for x in d if 'test_' in x]
+    # run those functions and save their output
+    outputs = {k.split('_')[-1]:d[k]()
+               for k in tests}
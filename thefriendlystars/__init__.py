@@ -13,6 +13,8 @@ from .constellations import *
 from .finders import *
 from .panels import *
 from . import io
+from . import instrumentation
+from . import archives
 
 def autosave_on():
     io.cache = True
@@ -0,0 +1,440 @@
+'''
+One place through which all the archive queries flow.
+
+Every download in tfs (Gaia, Vizier, MAST, SkyView, and
+TESS cutouts) goes through the methods of one backend,
+which is available as `archives.backend`. The default
+`Archive` backend talks to the real archives, sharing
+one pool of HTTP connections, limiting how many queries
+can be sent to each archive at once, and retrying
+failed queries with an exponential backoff.
+
+The backend can be swapped out, for example for a
+`LocalArchive` that replays responses stored in a
+directory (for working offline, testing, or load testing):
+
+    from thefriendlystars import archives
+    with archives.using(archives.LocalArchive('tfs-recordings')):
+        g = Gaia('GJ1132')
+'''
+
+from .imports import *
+from . import io, synthetic
+from .instrumentation import timer
+from contextlib import contextmanager
+from urllib.error import HTTPError, URLError
+from astropy.table import MaskedColumn, vstack
+import re, time, hashlib, threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# which errors might go away if we try again?
+transient = (requests.exceptions.ConnectionError,
+             requests.exceptions.Timeout,
+             URLError,
+             ConnectionError,
+             TimeoutError)
+
+def is_transient(error):
+    '''
+    Is this an error worth retrying? (Server errors are,
+    but "not found" or "bad request" errors are not.)
+    '''
+    if isinstance(error, HTTPError):
+        return error.code >= 500
+    if isinstance(error, requests.exceptions.HTTPError):
+        return (error.response is not None) and (error.response.status_code >= 500)
+    return isinstance(error, transient)
+
+def as_skycoord(center):
+    '''
+    Make sure a center is a SkyCoord (accepting strings
+    of "ra dec" in degrees, or names to be resolved).
+    '''
+    if isinstance(center, str):
+        try:
+            return SkyCoord(center, unit='deg')
+        except ValueError:
+            return SkyCoord.from_name(center)
+    return center
+
+def describe(x):
+    '''
+    A compact, repeatable string describing a query input.
+    '''
+    if isinstance(x, SkyCoord):
+        return x.icrs.to_string('decimal', precision=6)
+    return str(x)
+
+class Archive(Talker):
+    '''
+    The real archives, reached through astroquery (and lightkurve).
+    '''
+
+    # how many simultaneous queries are allowed to each archive?
+    limits = dict(gaia=4, vizier=4, mast=4, skyview=4)
+
+    def __init__(self, retries=3, backoff=1.0, limits={}, poolsize=16):
+        '''
+        Parameters
+        ----------
+        retries : int
+            How many times should a failed query be retried?
+        backoff : float
+            The wait (in seconds) before the first retry,
+            which doubles with each subsequent retry.
+        limits : dict
+            The maximum number of simultaneous queries for
+            each archive (overriding the defaults in .limits)
+        poolsize : int
+            The number of connections to keep open, per host.
+        '''
+        Talker.__init__(self)
+        self.retries = retries
+        self.backoff = backoff
+        self.limits = dict(self.limits, **limits)
+        self.poolsize = poolsize
+        self.connect()
+
+    def connect(self):
+        '''
+        Set up the concurrency limits and the pool of connections.
+        '''
+        self.semaphores = {k:threading.BoundedSemaphore(v) for k, v in self.limits.items()}
+
+        # one shared pool of connections (urllib3's pools are thread-safe,
+        # but requests.Session isn't documented to be, so each thread
+        # gets its own session, all of which use this one pool)
+        self.adapter = HTTPAdapter(pool_connections=self.poolsize, pool_maxsize=self.poolsize)
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # (pickles, e.g. sent to worker processes, get their own limits and connections)
+        state = dict(vars(self))
+        for k in ['semaphores', 'adapter', '_local']:
+            state.pop(k)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.connect()
+
+    @property
+    def session(self):
+        '''
+        The HTTP session for the current thread (sharing the pool of connections).
+        '''
+        try:
+            return self._local.session
+        except AttributeError:
+            session = requests.Session()
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            self._local.session = session
+            return session
+
+    def share_session(self, service):
+        '''
+        Point an astroquery service at our shared HTTP session.
+        (This should be a new instance of the service, not one
+        of astroquery's module-level singletons, so that other
+        backends and other users of astroquery aren't affected.)
+        '''
+        if hasattr(service, '_session'):
+            service._session = self.session
+        return service
+
+    def call(self, archive, function, *args, **kwargs):
+        '''
+        Call a function that queries an archive, staying within
+        the concurrency limit, and retrying transient failures.
+
+        Parameters
+        ----------
+        archive : str
+            The archive being queried ('gaia', 'vizier', 'mast', 'skyview').
+        function : function
+            The function that actually does the query.
+        *args, **kwargs
+            Passed along to the function.
+        '''
+        for attempt in range(self.retries + 1):
+            try:
+                with self.semaphores[archive], timer(f'archive.{archive}') as counts:
+                    counts['attempts'] += 1
+                    return function(*args, **kwargs)
+            except Exception as error:
+                if (attempt == self.retries) or not is_transient(error):
+                    raise
+                wait = self.backoff*2**attempt
+                self.speak(f'{archive} query failed ({error}); retrying in {wait:.1f}s')
+                time.sleep(wait)
+
+    def query_gaia(self, query, upload=None, upload_name='targets'):
+        '''
+        Send an ADQL query to the Gaia archive, and return a table.
+
+        Parameters
+        ----------
+        query : str
+            The ADQL query.
+        upload : astropy.table.Table
+            A table to upload along with the query, which the
+            query can use as `tap_upload.{upload_name}`.
+            (Queries with uploads are run as asynchronous jobs,
+            so their results aren't cut off at 2000 rows.)
+        upload_name : str
+            The name of the uploaded table.
+        '''
+        import astroquery.gaia
+
+        def run():
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore")
+                if upload is None:
+                    job = astroquery.gaia.Gaia.launch_job(query)
+                else:
+                    job = astroquery.gaia.Gaia.launch_job_async(query,
+                                                                upload_resource=upload,
+                                                                upload_table_name=upload_name)
+                return job.get_results()
+        return self.call('gaia', run)
+
+    def query_vizier(self, catalog, columns=['*'], column_filters={},
+                           coordinates=None, radius=None, row_limit=-1):
+        '''
+        Query a Vizier catalog, either in a cone (if coordinates and
+        radius are given) or across the whole sky, and return a table.
+        '''
+        from astroquery.vizier import Vizier
+
+        def run():
+            v = self.share_session(Vizier(columns=columns, column_filters=column_filters))
+            v.ROW_LIMIT = row_limit
+            if coordinates is None:
+                return v.query_constraints(catalog=catalog, **column_filters)[0]
+            else:
+                return v.query_region(coordinates=coordinates,
+                                      radius=radius,
+                                      catalog=catalog)[0]
+        return self.call('vizier', run)
+
+    def query_mast_catalog(self, catalog, coordinates=None, radius=None, **criteria):
+        '''
+        Query a MAST catalog (e.g. 'TIC' or 'GALEX'), either in a
+        cone (if coordinates and radius are given) or by criteria.
+        '''
+        from astroquery.mast import CatalogsClass
+
+        def run():
+            Catalogs = self.share_session(CatalogsClass())
+            if coordinates is None:
+                return Catalogs.query_criteria(catalog=catalog, **criteria)
+            else:
+                return Catalogs.query_region(coordinates=coordinates,
+                                             radius=radius,
+                                             catalog=catalog,
+                                             **criteria)
+        return self.call('mast', run)
+
+    def get_skyview_images(self, position, survey, radius, pixels=None):
+        '''
+        Download images from SkyView, returning a list of HDULists.
+        (The images are 2*radius wide, and `pixels` across.)
+        '''
+        import astroquery.skyview
+
+        def run():
+            SkyView = self.share_session(astroquery.skyview.SkyViewClass())
+            return SkyView.get_images(position=position,
+                                      radius=radius,
+                                      survey=survey,
+                                      pixels=pixels)
+        return self.call('skyview', run)
+
+    def get_tesscut(self, position, cutout_size):
+        '''
+        Download a TESS FFI cutout (of the first available
+        sector), returning a lightkurve TargetPixelFile.
+        '''
+        from lightkurve.search import search_tesscut
+
+        def run():
+            return search_tesscut(position).download(cutout_size=cutout_size)
+        return self.call('mast', run)
+
+class LocalArchive(Archive):
+    '''
+    A stand-in for the archives, which responds to
+    queries with responses stored in a local directory.
+    '''
+
+    def __init__(self, directory='tfs-recordings', source=None, synthesize=True, N=1000, seed=42, **kw):
+        '''
+        Parameters
+        ----------
+        directory : str
+            Where are the recorded responses stored?
+        source : Archive
+            If a query has no recorded response, it
+            can be passed along to this other archive
+            (e.g. the real one), and the response recorded.
+        synthesize : bool
+            If a query has no recorded response (and no
+            source is given), should a fake response be
+            synthesized (and recorded, so it is the same
+            next time)? If False, a LookupError is raised.
+        N : int
+            How many stars should a synthetic catalog have?
+        seed : int
+            The random seed for synthetic responses.
+        **kw
+            Passed along to Archive.
+        '''
+        Archive.__init__(self, **kw)
+        self.directory = directory
+        self.source = source
+        self.synthesize = synthesize
+        self.N = N
+        self.seed = seed
+        mkdir(self.directory)
+
+    def _filename(self, kind, key):
+        '''
+        Where should the response to a given query be recorded?
+        '''
+        h = hashlib.md5(f'{kind}|{key}|{self.N}'.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f'{kind}-{h}.pickled')
+
+    def respond(self, kind, key, real, fake=None):
+        '''
+        Respond to a query, with a recording if possible.
+
+        Parameters
+        ----------
+        kind : str
+            Which archive is this (e.g. 'gaia')?
+        key : str
+            A string uniquely describing the query.
+        real : function
+            Calling this will get the response from the source archive.
+        fake : function
+            Calling this will synthesize a fake response.
+        '''
+        filename = self._filename(kind, key)
+        try:
+            with open(filename, 'rb') as f:
+                return pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            pass
+
+        if self.source is not None:
+            response = real()
+        elif self.synthesize and (fake is not None):
+            response = fake()
+        else:
+            raise LookupError(f'No recorded {kind} response for "{key}" in {self.directory}.')
+
+        with io.atomic(filename) as temporary:
+            with open(temporary, 'wb') as f:
+                pickle.dump(response, f)
+        return response
+
+    def query_gaia(self, query, upload=None, upload_name='targets'):
+        if upload is not None:
+            return self.query_gaia_upload(query, upload, upload_name)
+
+        # pull the cone (if any) out of the ADQL
+        match = re.search(r"CIRCLE\('ICRS',([^,]+),([^,]+),([^)]+)\)", query)
+        if match is None:
+            center, radius = None, None
+        else:
+            ra, dec, r = [float(x) for x in match.groups()]
+            center, radius = SkyCoord(ra*u.deg, dec*u.deg), r*u.deg
+
+        if 'tmass' in query:
+            fake = lambda: synthetic.tmass_table(self.N, center=center, radius=radius, seed=self.seed)
+        else:
+            fake = lambda: synthetic.gaia_table(self.N, center=center, radius=radius, seed=self.seed)
+        return self.respond('gaia', query, lambda: self.source.query_gaia(query), fake)
+
+    def query_gaia_upload(self, query, upload, upload_name):
+        '''
+        Respond to a Gaia query that joins with an uploaded
+        table of targets (with columns target_id, ra, dec),
+        by faking a cone around each target.
+        '''
+        match = re.search(r"CIRCLE\('ICRS',[^,]+,[^,]+,([^)]+)\)", query)
+        radius = float(match.group(1))*u.deg
+        key = f"{query}|{upload_name}|{','.join(f'{i}:{ra:.9f}:{dec:.9f}' for i, ra, dec in upload.iterrows('target_id', 'ra', 'dec'))}"
+
+        def fake():
+            # (each cone is the same as a query for that cone alone)
+            cones = []
+            for i, ra, dec in upload.iterrows('target_id', 'ra', 'dec'):
+                cone = synthetic.gaia_table(self.N, center=SkyCoord(ra*u.deg, dec*u.deg), radius=radius, seed=self.seed)
+                cone.add_column(MaskedColumn(np.full(len(cone), i), name='target_id'), index=0)
+                cones.append(cone)
+            return vstack(cones)
+        real = lambda: self.source.query_gaia(query, upload=upload, upload_name=upload_name)
+        return self.respond('gaia', key, real, fake)
+
+    def query_vizier(self, catalog, columns=['*'], column_filters={},
+                           coordinates=None, radius=None, row_limit=-1):
+        center = None if coordinates is None else as_skycoord(coordinates)
+        key = f'{catalog}|{columns}|{column_filters}|{describe(center)}|{radius}|{row_limit}'
+        fake = lambda: synthetic.lspm_table(self.N, center=center, radius=radius, seed=self.seed)
+        real = lambda: self.source.query_vizier(catalog, columns=columns,
+                                                         column_filters=column_filters,
+                                                         coordinates=coordinates,
+                                                         radius=radius,
+                                                         row_limit=row_limit)
+        return self.respond('vizier', key, real, fake)
+
+    def query_mast_catalog(self, catalog, coordinates=None, radius=None, **criteria):
+        key = f'{catalog}|{describe(coordinates)}|{radius}|{sorted(criteria.items())}'
+        real = lambda: self.source.query_mast_catalog(catalog, coordinates=coordinates,
+                                                               radius=radius,
+                                                               **criteria)
+        fake = None
+        if (catalog.lower() == 'tic') and (coordinates is not None):
+            fake = lambda: synthetic.tic_table(self.N, center=as_skycoord(coordinates),
+                                                       radius=radius, seed=self.seed)
+        return self.respond('mast', key, real, fake)
+
+    def get_skyview_images(self, position, survey, radius, pixels=None):
+        key = f'{describe(position)}|{survey}|{radius}|{pixels}'
+        fake = lambda: [fits.HDUList([synthetic.image_hdu(as_skycoord(position),
+                                                          radius=radius,
+                                                          pixels=pixels or 300,
+                                                          seed=self.seed)])]
+        real = lambda: self.source.get_skyview_images(position, survey, radius, pixels=pixels)
+        return self.respond('skyview', key, real, fake)
+
+    def get_tesscut(self, position, cutout_size):
+        key = f'{describe(position)}|{cutout_size}'
+        real = lambda: self.source.get_tesscut(position, cutout_size)
+        return self.respond('tesscut', key, real)
+
+# the backend through which all archive queries go
+backend = Archive()
+
+def use(new):
+    '''
+    Send all future archive queries through a new backend.
+    '''
+    global backend
+    backend = new
+
+@contextmanager
+def using(new):
+    '''
+    Send archive queries through a new backend,
+    but only for the duration of a `with` block.
+    '''
+    original = backend
+    use(new)
+    try:
+        yield new
+    finally:
+        use(original)
@@ -0,0 +1,381 @@
+'''
+An offline benchmark suite for the slow parts of tfs.
+
+Archive queries are sent to an `archives.LocalArchive`,
+which replays recorded responses from a directory (or, if
+a response has never been recorded, synthesizes a fake
+one of a configurable size), so the benchmarks measure
+only what happens on this computer. Results are stored
+as JSON files named after the current git commit, so
+different commits can be compared with `compare`.
+
+From the command line, this might look like:
+
+    python -m thefriendlystars.benchmarks --sizes 1000 10000
+    python -m thefriendlystars.benchmarks --compare old.json new.json
+    python -m thefriendlystars.benchmarks --scaling 10000000
+
+To record real archive responses (while online) for later replay:
+
+    recorder = archives.LocalArchive('tfs-recordings', source=archives.Archive())
+    with archives.using(recorder):
+        Finder(center).plot()
+'''
+
+from .imports import *
+from . import io, synthetic, archives, kernels
+from .constellations import Gaia, TIC, Constellation
+from .images import DSS2r, TwoMassJ
+from .panels import Panel
+from .finders import Finder, FinderTemplate
+from contextlib import contextmanager
+import time, json, platform, subprocess, tempfile, shutil
+
+@contextmanager
+def offline(N=1000, recordings=None):
+    '''
+    For the duration of a block, use a temporary (empty) cache
+    directory and replay archive responses instead of querying.
+
+    Parameters
+    ----------
+    N : int
+        How many stars should synthetic catalogs have?
+    recordings : str
+        A directory of recorded responses. If None, a
+        temporary directory of synthetic responses is used.
+    '''
+    original = io.cache_directory
+    io.cache_directory = tempfile.mkdtemp(prefix='tfs-benchmark-')
+    directory = recordings or tempfile.mkdtemp(prefix='tfs-recordings-')
+    try:
+        with archives.using(archives.LocalArchive(directory, N=N)) as archive:
+            yield archive
+    finally:
+        shutil.rmtree(io.cache_directory, ignore_errors=True)
+        if recordings is None:
+            shutil.rmtree(directory, ignore_errors=True)
+        io.cache_directory = original
+
+def synthetic_constellation(N, seed=None, epoch=2015.5):
+    '''
+    Create a Constellation of N random stars across the sky.
+    '''
+    r = np.random.RandomState(seed)
+    ra, dec = synthetic.random_positions(N, seed=seed)
+    return Constellation.from_coordinates(ra=ra*u.deg, dec=dec*u.deg,
+                                          pm_ra_cosdec=r.normal(0, 20, N)*u.mas/u.year,
+                                          pm_dec=r.normal(0, 20, N)*u.mas/u.year,
+                                          obstime=epoch*np.ones(N)*u.year,
+                                          mag=r.uniform(5, 20, N))
+
+def measure(function, setup=lambda: None, repeat=3):
+    '''
+    Time a function, returning the best and median of `repeat` tries.
+
+    Parameters
+    ----------
+    function : function
+        The function to time. It's given the output of `setup`.
+    setup : function
+        A function to run (untimed) before each try.
+    repeat : int
+        How many times to try?
+    '''
+    times = []
+    for i in range(repeat):
+        inputs = setup()
+        start = time.perf_counter()
+        function(inputs)
+        times.append(time.perf_counter() - start)
+    return dict(best=np.min(times), median=np.median(times), repeat=repeat)
+
+center = SkyCoord(11.247*u.deg, -15.271*u.deg)
+
+def bench_standardize_table(N, **kw):
+    raw = synthetic.gaia_table(N, seed=0)
+    return measure(lambda t: Gaia.standardize_table(t), setup=lambda: raw.copy(), **kw)
+
+def bench_at_epoch(N, **kw):
+    c = synthetic_constellation(N, seed=0)
+    return measure(lambda _: c.at_epoch(1950.0), setup=c.forget_epochs, **kw)
+
+def bench_crossMatchTo(N, **kw):
+    reference = synthetic_constellation(N, seed=0)
+    this = reference.at_epoch(2000.0)
+    return measure(lambda _: this.crossMatchTo(reference), **kw)
+
+def bench_crossMatch_epochs(N, **kw):
+    reference = synthetic_constellation(N, seed=0)
+    # (like 2MASS, with each star observed on its own date)
+    dates = np.random.RandomState(1).uniform(1997, 2001, N)
+    this = reference.at_epoch(dates)
+    return measure(lambda _: this.crossMatchTo(reference), **kw)
+
+def bench_region(N, **kw):
+    sky = synthetic_constellation(N, seed=0)
+    sky.region(center, 5*u.arcmin, epochs=1995.0)
+    # (the spatial index is kept, but each region is searched again)
+    return measure(lambda _: sky.region(center, 5*u.arcmin, epochs=1995.0),
+                   setup=lambda: sky._regions.clear(), **kw)
+
+def bench_cone(N, **kw):
+    sky = synthetic_constellation(N, seed=0)
+    sky.paths
+    # (like an old plate, far from the catalog's epoch)
+    return measure(lambda _: sky.cone(center, 5*u.arcmin, 1953.2), **kw)
+
+def bench_uncertainties(N, **kw):
+    sky = synthetic_constellation(N, seed=0)
+    sky.standardized['ra-error'] = sky.standardized['dec-error'] = np.full(N, 0.1)*u.mas
+    sky.standardized['pm_ra_cosdec-error'] = sky.standardized['pm_dec-error'] = np.full(N, 0.2)*u.mas/u.year
+    # (the uncertainties at an old epoch, and 10 Monte Carlo samples of each star)
+    return measure(lambda _: (sky.uncertainties_at(1953.2), sky.sample_at(1953.2, samples=10, seed=0)), **kw)
+
+def bench_cache_load(N, recordings=None, **kw):
+    with offline(N, recordings):
+        Gaia(center)
+        return measure(lambda _: Gaia(center), **kw)
+
+def bench_Panel_plot(N, recordings=None, **kw):
+    with offline(N, recordings):
+        def setup():
+            plt.close('all')
+            return Panel(center, image=DSS2r, constellations=[Gaia])
+        def plot(p):
+            p.plot()
+            plt.gcf().canvas.draw()
+        return measure(plot, setup=setup, **kw)
+
+def bench_Finder_plot(N, recordings=None, **kw):
+    with offline(N, recordings):
+        def setup():
+            plt.close('all')
+            return Finder(center, images=[DSS2r, TwoMassJ], constellations=[Gaia])
+        def plot(f):
+            f.plot()
+            plt.gcf().canvas.draw()
+        return measure(plot, setup=setup, **kw)
+
+def bench_Finder_template(N, recordings=None, **kw):
+    with offline(N, recordings):
+        t = FinderTemplate(images=[DSS2r, TwoMassJ], constellations=[Gaia])
+        t.plot(center)
+        def plot(_):
+            t.plot(center)
+            t.finder.illustration.figure.canvas.draw()
+        return measure(plot, **kw)
+
+def bench_Finder_render(N, recordings=None, **kw):
+    with offline(N, recordings):
+        t = FinderTemplate(images=[DSS2r, TwoMassJ], constellations=[Gaia])
+        return measure(lambda _: t.render(center, format='png', dpi=100), **kw)
+
+def cluster(N=25, radius=5*u.arcmin, seed=0):
+    '''
+    Scatter N targets across a small patch of sky (like the core of a cluster).
+    '''
+    ra, dec = synthetic.random_positions(N, center=center, radius=radius, seed=seed)
+    return SkyCoord(ra*u.deg, dec*u.deg)
+
+def forget(prefix):
+    '''
+    Remove every cached file starting with prefix (so it will be downloaded again).
+    '''
+    for f in glob.glob(os.path.join(io.cache_directory, prefix + '-*')):
+        os.remove(f)
+
+def bench_TIC_cone(N, recordings=None, **kw):
+    with offline(N, recordings):
+        return measure(lambda _: TIC(center, radius=10*u.arcmin), setup=lambda: forget('TIC'), **kw)
+
+def bench_TIC_batch(N, recordings=None, **kw):
+    with offline(N, recordings):
+        targets = cluster()
+        return measure(lambda _: TIC.batch(targets, radius=2*u.arcmin), setup=lambda: forget('TIC'), **kw)
+
+def bench_Gaia_batch(N, recordings=None, **kw):
+    with offline(N, recordings):
+        targets = cluster()
+        return measure(lambda _: Gaia.batch(targets, radius=2*u.arcmin), setup=lambda: forget('Gaia'), **kw)
+
+# benchmarks that replay archive responses accept `recordings`
+replayed = ['cache_load', 'Panel_plot', 'Finder_plot', 'Finder_template', 'Finder_render',
+            'TIC_cone', 'TIC_batch', 'Gaia_batch']
+
+benchmarks = dict(standardize_table=bench_standardize_table,
+                  at_epoch=bench_at_epoch,
+                  crossMatchTo=bench_crossMatchTo,
+                  crossMatch_epochs=bench_crossMatch_epochs,
+                  region=bench_region,
+                  cone=bench_cone,
+                  uncertainties=bench_uncertainties,
+                  cache_load=bench_cache_load,
+                  Panel_plot=bench_Panel_plot,
+                  Finder_plot=bench_Finder_plot,
+                  Finder_template=bench_Finder_template,
+                  Finder_render=bench_Finder_render,
+                  TIC_cone=bench_TIC_cone,
+                  TIC_batch=bench_TIC_batch,
+                  Gaia_batch=bench_Gaia_batch)
+
+def commit():
+    '''
+    What's the current git commit (if any)?
+    '''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(__file__)).decode().strip()
+    except (subprocess.CalledProcessError, OSError):
+        return 'unknown'
+
+def run(sizes=[1000, 10000], names=None, repeat=3, directory='tfs-benchmarks', recordings=None):
+    '''
+    Run the benchmarks, and save the results.
+
+    Parameters
+    ----------
+    sizes : list
+        The numbers of stars in the synthetic catalogs.
+    names : list
+        Which benchmarks should be run? (None = all)
+    repeat : int
+        How many times should each be repeated?
+    directory : str
+        Where should the results be saved? (None = don't save)
+    recordings : str
+        A directory of recorded archive responses to replay.
+        (None = synthesize responses, of the sizes above)
+
+    Returns
+    -------
+    results : dict
+        The meta-data and timings, as saved to the JSON file.
+    '''
+
+    results = dict(meta=dict(commit=commit(),
+                             date=Time.now().isot,
+                             python=platform.python_version(),
+                             numpy=np.__version__,
+                             machine=platform.machine(),
+                             cpus=os.cpu_count()),
+                   timings={})
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for name in names or benchmarks:
+            for N in sizes:
+                kw = dict(recordings=recordings) if name in replayed else {}
+                timing = benchmarks[name](N, repeat=repeat, **kw)
+                results['timings'][f'{name}[{N}]'] = timing
+                print(f'{name}[{N}]: {timing["best"]:.4f}s')
+
+    plt.close('all')
+    if directory is not None:
+        mkdir(directory)
+        filename = os.path.join(directory, f'{results["meta"]["commit"]}.json')
+        with open(filename, 'w') as f:
+            json.dump(results, f, indent=2, default=float)
+        print(f'saved benchmarks to {filename}')
+    return results
+
+def scaling(N=10**6, workers=None, repeat=3):
+    '''
+    How much faster are propagations and cross-matches
+    of a big constellation with more threads?
+
+    Parameters
+    ----------
+    N : int
+        The number of stars.
+    workers : list
+        The numbers of threads to try. (Defaults
+        to powers of 2, up to the number of CPUs.)
+    repeat : int
+        How many times should each be repeated?
+
+    Returns
+    -------
+    speedups : astropy.table.Table
+        The best times for each number of threads,
+        and how much faster they are than one thread.
+    '''
+    cpus = os.cpu_count() or 1
+    if workers is None:
+        workers = sorted(set([2**i for i in range(int(np.log2(cpus)) + 1)] + [cpus]))
+
+    sky = synthetic_constellation(N, seed=0)
+    this = sky.at_epoch(2000.0)
+    original = kernels.workers
+    rows = []
+    try:
+        for n in workers:
+            kernels.workers = n
+            propagating = measure(lambda _: sky.at_epoch(1950.0), setup=sky.forget_epochs, repeat=repeat)
+            matching = measure(lambda _: this.crossMatchTo(sky), setup=sky.forget_epochs, repeat=repeat)
+            rows.append((n, propagating['best'], matching['best']))
+            print(f'{n} threads: at_epoch {propagating["best"]:.4f}s, crossMatchTo {matching["best"]:.4f}s')
+    finally:
+        kernels.workers = original
+
+    t = Table(rows=rows, names=['workers', 'at_epoch', 'crossMatchTo'])
+    for k in ['at_epoch', 'crossMatchTo']:
+        t[f'{k}_speedup'] = t[k][0]/t[k]
+        t[k].format = t[f'{k}_speedup'].format = '.4f'
+    t.meta.update(N=N, cpus=cpus, numexpr=kernels.numexpr is not None)
+    return t
+
+def compare(old, new):
+    '''
+    Compare two sets of benchmark results.
+
+    Parameters
+    ----------
+    old, new : str or dict
+        Filenames of, or the results from, two runs.
+
+    Returns
+    -------
+    comparison : astropy.table.Table
+        The best times from each, and new/old ratios.
+    '''
+    def read(x):
+        if isinstance(x, str):
+            with open(x) as f:
+                return json.load(f)
+        return x
+    old, new = read(old), read(new)
+
+    names = [k for k in new['timings'] if k in old['timings']]
+    before = [old['timings'][k]['best'] for k in names]
+    after = [new['timings'][k]['best'] for k in names]
+    t = Table(dict(benchmark=names, old=before, new=after,
+                   ratio=np.array(after)/np.array(before)),
+              names=['benchmark', 'old', 'new', 'ratio'])
+    for k in ['old', 'new', 'ratio']:
+        t[k].format = '.4f'
+    t.meta['old'] = old['meta']
+    t.meta['new'] = new['meta']
+    return t
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Run the tfs benchmarks.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--names', nargs='+', default=None, choices=list(benchmarks))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--directory', default='tfs-benchmarks')
+    parser.add_argument('--recordings', default=None)
+    parser.add_argument('--compare', nargs=2, default=None, metavar=('OLD', 'NEW'))
+    parser.add_argument('--scaling', type=int, default=None, metavar='N',
+                        help='time N stars with different numbers of threads')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare(*args.compare).pprint(max_lines=-1)
+    elif args.scaling is not None:
+        scaling(args.scaling, repeat=args.repeat).pprint(max_lines=-1)
+    else:
+        run(sizes=args.sizes, names=args.names, repeat=args.repeat,
+            directory=args.directory, recordings=args.recordings)
@@ -0,0 +1,406 @@
+'''
+Tools for managing the local cache of downloaded data.
+
+Every file in `io.cache_directory` gets an entry in an index
+(index.json, in the same directory), recording its size, when
+it was created, when it was last used, and how many times it
+has been used. With that index, the cache can be listed, kept
+within a byte budget (by evicting the least-recently-used or
+least-frequently-used files), and made to forget files from
+a survey after a time-to-live (e.g. when a new data release
+makes old downloads stale).
+
+The limits are set in `io`, for example:
+
+    from thefriendlystars import io
+    io.cache_budget = 5e9                # bytes
+    io.cache_policy = 'lru'              # or 'lfu'
+    io.cache_ttl = dict(Gaia=30*u.day)   # by survey
+
+From the command line, this might look like:
+
+    python -m thefriendlystars.cache list
+    python -m thefriendlystars.cache prune --budget 1e9
+    python -m thefriendlystars.cache prewarm GJ1132 LHS1140
+'''
+
+from .imports import *
+from . import io
+import json, time, atexit, threading
+
+# files in the cache directory that aren't cached data
+ignored_suffixes = ('.lock', '.held', '.partial')
+
+def survey_of(filename):
+    '''
+    Which survey (Field class) does a cached file belong to?
+    (Cached files are named after the repr of their Field.)
+    '''
+    return os.path.basename(filename).split('-')[0]
+
+def seconds(x):
+    '''
+    Convert a time (with or without astropy units) to seconds.
+    '''
+    try:
+        return x.to('s').value
+    except AttributeError:
+        return float(x)
+
+class Cache(Talker):
+    '''
+    A Cache keeps an index of the files in one cache directory.
+    '''
+
+    # how many accesses to collect before rewriting the index
+    flush_every = 100
+
+    # how old (in seconds) must a partial write be before it's considered abandoned?
+    abandoned = 3600
+
+    # how old (in seconds) can the index get before pruning rescans the directory?
+    rescan_every = 600
+
+    def __init__(self, directory):
+        '''
+        Parameters
+        ----------
+        directory : str
+            The cache directory to manage.
+        '''
+        Talker.__init__(self)
+        self.directory = directory
+        self.indexfilename = os.path.join(directory, 'index.json')
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._scanned = 0
+
+    def _read(self):
+        '''
+        Read the index from disk (or start a new, empty one).
+        '''
+        try:
+            with open(self.indexfilename) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _write(self, index):
+        '''
+        Write the index to disk (atomically).
+        '''
+        mkdir(self.directory)
+        with io.atomic(self.indexfilename) as temporary:
+            with open(temporary, 'w') as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+
+    def _update(self, change):
+        '''
+        Read, modify, and rewrite the index,
+        while no other thread or process can.
+
+        Parameters
+        ----------
+        change : function
+            Modifies an index dictionary in place.
+        '''
+        with io.exclusive(self.indexfilename):
+            index = self._read()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for name, (accessed, hits) in pending.items():
+                if name in index:
+                    index[name]['accessed'] = max(index[name]['accessed'], accessed)
+                    index[name]['hits'] += hits
+            change(index)
+            self._write(index)
+        return index
+
+    def flush(self):
+        '''
+        Write any recorded accesses into the index.
+        '''
+        if self._pending:
+            self._update(lambda index: None)
+
+    def register(self, filename):
+        '''
+        Record that a file has (just) been written to the cache.
+        '''
+        name = os.path.basename(filename)
+        def change(index):
+            now = time.time()
+            index[name] = dict(size=os.path.getsize(filename),
+                               created=now,
+                               accessed=now,
+                               hits=0,
+                               survey=survey_of(name))
+        self._update(change)
+        if io.cache_budget is not None:
+            self.prune(keep=[name])
+
+    def touch(self, filename):
+        '''
+        Record that a file in the cache has (just) been used.
+        '''
+        name = os.path.basename(filename)
+        with self._lock:
+            accessed, hits = self._pending.get(name, (0, 0))
+            self._pending[name] = (time.time(), hits + 1)
+            n = len(self._pending)
+        if n >= self.flush_every:
+            self.flush()
+
+    def expired(self, filename):
+        '''
+        Is a cached file older than the time-to-live for its survey?
+        '''
+        try:
+            ttl = seconds(io.cache_ttl[survey_of(filename)])
+        except KeyError:
+            return False
+        try:
+            return (time.time() - os.path.getmtime(filename)) > ttl
+        except OSError:
+            return False
+
+    def scan(self):
+        '''
+        Make the index match the files actually in the directory,
+        adding entries for unknown files and dropping missing ones.
+        '''
+        def change(index):
+            try:
+                present = [f for f in os.listdir(self.directory)
+                             if not f.endswith(ignored_suffixes)
+                             and not f.startswith('.')
+                             and f != 'index.json']
+            except FileNotFoundError:
+                present = []
+            for name in list(index):
+                if name not in present:
+                    index.pop(name)
+            for name in present:
+                if name not in index:
+                    path = os.path.join(self.directory, name)
+                    index[name] = dict(size=os.path.getsize(path),
+                                       created=os.path.getmtime(path),
+                                       accessed=os.path.getatime(path),
+                                       hits=0,
+                                       survey=survey_of(name))
+        index = self._update(change)
+        self._scanned = time.time()
+        return index
+
+    def stale(self):
+        '''
+        Is the index missing, or has it been a while since
+        it was checked against the files in the directory?
+        '''
+        return ((not os.path.exists(self.indexfilename)) or
+                (time.time() - self._scanned) > self.rescan_every)
+
+    def current(self):
+        '''
+        The index, rescanned from the directory only if it's stale.
+        (Files written through the cache register themselves,
+        so the index usually doesn't need the directory listed.)
+        '''
+        if self.stale():
+            return self.scan()
+        self.flush()
+        return self._read()
+
+    def list(self):
+        '''
+        List the contents of the cache.
+
+        Returns
+        -------
+        table : astropy.table.Table
+            One row per cached file, with its survey, size,
+            creation and last-access times, and number of uses,
+            sorted from most- to least-recently used.
+        '''
+        index = self.scan()
+        names = sorted(index, key=lambda k: -index[k]['accessed'])
+        t = Table(dict(name=names,
+                       survey=[index[k]['survey'] for k in names],
+                       size=[index[k]['size'] for k in names],
+                       created=Time([index[k]['created'] for k in names] or [0], format='unix').isot[:len(names)],
+                       accessed=Time([index[k]['accessed'] for k in names] or [0], format='unix').isot[:len(names)],
+                       hits=[index[k]['hits'] for k in names],
+                       expired=[self.expired(os.path.join(self.directory, k)) for k in names]),
+                  names=['name', 'survey', 'size', 'created', 'accessed', 'hits', 'expired'])
+        t.meta['directory'] = self.directory
+        t.meta['total'] = int(np.sum(t['size']))
+        return t
+
+    def remove(self, name):
+        '''
+        Remove one file from the cache.
+        '''
+        path = os.path.join(self.directory, os.path.basename(name))
+        with io.exclusive(path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def prune(self, budget=None, policy=None, keep=[], dry_run=False):
+        '''
+        Remove expired files, and then evict files
+        until the cache fits within its byte budget.
+        (Lock files and partial writes aren't cached
+        data, so they don't count toward the budget;
+        see `tidy` for removing any left behind.)
+
+        Parameters
+        ----------
+        budget : float
+            The maximum total size, in bytes (defaults to io.cache_budget).
+        policy : str
+            'lru' evicts least-recently-used files first,
+            'lfu' evicts least-frequently-used files first
+            (defaults to io.cache_policy).
+        keep : list
+            Names of files that should not be evicted.
+        dry_run : bool
+            If True, only report what would be removed.
+
+        Returns
+        -------
+        removed : list
+            The names of the files that were (or would be) removed.
+        '''
+        budget = budget if budget is not None else io.cache_budget
+        policy = policy or io.cache_policy
+        index = self.current()
+
+        # first, anything past its time-to-live
+        removed = [k for k in index
+                     if self.expired(os.path.join(self.directory, k))]
+
+        # then, evict until we're within budget
+        if budget is not None:
+            if policy == 'lru':
+                order = lambda k: (index[k]['accessed'], index[k]['hits'])
+            elif policy == 'lfu':
+                order = lambda k: (index[k]['hits'], index[k]['accessed'])
+            else:
+                raise ValueError(f'"{policy}" is not a known cache policy.')
+
+            total = np.sum([index[k]['size'] for k in index if k not in removed])
+            for k in sorted(index, key=order):
+                if total <= budget:
+                    break
+                if (k in removed) or (k in keep):
+                    continue
+                removed.append(k)
+                total -= index[k]['size']
+
+        if dry_run:
+            return removed
+
+        for k in removed:
+            self.remove(k)
+            self.speak(f'removed {k} from {self.directory}')
+        self._update(lambda index: [index.pop(k, None) for k in removed])
+        return removed
+
+    def tidy(self):
+        '''
+        Remove any lock files and partial writes left behind
+        (for example, by processes that were killed).
+
+        Returns
+        -------
+        removed : list
+            The names of the files that were removed.
+        '''
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        removed = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.endswith('.lock'):
+                # (wait for whoever might hold the lock; releasing it removes the file)
+                with io.exclusive(path[:-len('.lock')]):
+                    pass
+                removed.append(name)
+            elif name.endswith('.partial'):
+                try:
+                    if (time.time() - os.path.getmtime(path)) > self.abandoned:
+                        os.remove(path)
+                        removed.append(name)
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def clear(self):
+        '''
+        Remove everything from the cache (including
+        any leftover lock files and partial writes).
+        '''
+        removed = self.prune(budget=0)
+        self.tidy()
+        return removed
+
+def prewarm(targets, **kw):
+    '''
+    Download (into the cache) everything needed to make
+    Finders for a list of targets. (See `prewarm.prewarm`.)
+    '''
+    from .prewarm import prewarm
+    return prewarm(targets, **kw)
+
+# one Cache for each directory that's been used
+_caches = {}
+
+def manager(directory=None):
+    '''
+    Get the Cache for a directory (defaulting to io.cache_directory).
+    '''
+    directory = directory or io.cache_directory
+    if directory not in _caches:
+        _caches[directory] = Cache(directory)
+    return _caches[directory]
+
+@atexit.register
+def _flush_all():
+    for c in _caches.values():
+        try:
+            c.flush()
+        except Exception:
+            pass
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Inspect and tidy the tfs cache.')
+    parser.add_argument('command', choices=['list', 'prune', 'clear', 'prewarm'])
+    parser.add_argument('targets', nargs='*', help='(for prewarm) target names')
+    parser.add_argument('--directory', default=None)
+    parser.add_argument('--budget', type=float, default=None)
+    parser.add_argument('--policy', default=None, choices=['lru', 'lfu'])
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    if args.directory is not None:
+        io.cache_directory = args.directory
+
+    c = manager()
+    if args.command == 'list':
+        t = c.list()
+        t.pprint(max_lines=-1, max_width=-1)
+        print(f'{len(t)} files, {t.meta["total"]/1e6:.1f} MB in {c.directory}')
+    elif args.command == 'prune':
+        removed = c.prune(budget=args.budget, policy=args.policy, dry_run=args.dry_run)
+        print(f'{"would remove" if args.dry_run else "removed"} {len(removed)} files')
+    elif args.command == 'clear':
+        removed = c.clear()
+        print(f'removed {len(removed)} files')
+    elif args.command == 'prewarm':
+        if not args.targets:
+            parser.error('prewarm needs at least one target')
+        prewarm(args.targets)
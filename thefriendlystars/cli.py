@@ -0,0 +1,347 @@
+'''
+The `tfs` command-line tool, for making many finder charts at once.
+
+    tfs finder targets.csv --images DSS2r,TwoMassJ --constellations Gaia --workers 16
+    tfs finder GJ1132 LHS1140 --format pdf --directory charts
+    tfs prewarm targets.csv
+    tfs serve --port 8000
+    tfs cache list
+    tfs cache prewarm targets.csv
+
+The jobs can be target names (given directly), or files of them:
+
+    .csv   one job per row, with a "target" column (or "ra" and "dec"
+           columns in degrees, and an optional "name"), and optionally
+           any of the columns radius (arcmin), images, constellations,
+           format, dpi, filename
+    .yaml  either a list of jobs (names, or dicts with the columns
+           above), or a dict with "defaults" and "jobs"
+    other  one target name per line ("#" starts a comment)
+
+Each chart gets a sidecar file (its filename + '.json') recording
+the settings that made it, so running the same jobs again skips
+any charts that are already up to date (unless --force). The charts
+are made by a pool of worker processes, each of which keeps one
+FinderTemplate per layout and shares the on-disk cache.
+'''
+
+from .imports import *
+from . import io, cache, render, archives
+from .version import __version__
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse, csv, json, hashlib, time, sys
+
+# the settings of a job (and their defaults)
+defaults = dict(radius=5.0,
+                images='DSS2r,TwoMassJ,TESS',
+                constellations='Gaia',
+                format='png',
+                dpi=100,
+                filename=None)
+
+def as_list(x):
+    '''
+    Make a list out of a comma-separated string (or a list).
+    '''
+    if isinstance(x, str):
+        return [i.strip() for i in x.split(',') if i.strip()]
+    return list(x)
+
+def read_jobs(source, **settings):
+    '''
+    Read a list of jobs from a file (or from one target name).
+
+    Parameters
+    ----------
+    source : str
+        A .csv or .yaml file of jobs, a file of target
+        names (one per line), or a target name itself.
+    **settings
+        Defaults for any settings the jobs don't include.
+
+    Returns
+    -------
+    jobs : list
+        One dict of settings for each finder chart.
+    '''
+    base = dict(defaults, **{k:v for k, v in settings.items() if v is not None})
+    extension = os.path.splitext(source)[-1].lower()
+
+    if not os.path.exists(source):
+        rows = [dict(target=source)]
+    elif extension == '.csv':
+        with open(source, newline='') as f:
+            rows = [{k.strip():v for k, v in row.items() if v not in (None, '')}
+                    for row in csv.DictReader(f)]
+    elif extension in ['.yaml', '.yml']:
+        import yaml
+        with open(source) as f:
+            loaded = yaml.safe_load(f) or []
+        if isinstance(loaded, dict):
+            base.update(loaded.get('defaults', {}))
+            loaded = loaded.get('jobs', [])
+        rows = [dict(target=x) if isinstance(x, str) else dict(x) for x in loaded]
+    else:
+        with open(source) as f:
+            rows = [dict(target=line.split('#')[0].strip()) for line in f]
+        rows = [r for r in rows if r['target']]
+
+    return [dict(base, **row) for row in rows]
+
+def center_of(job):
+    '''
+    The center of a job (a name, or a SkyCoord if it has "ra" and "dec").
+    '''
+    if 'ra' in job and 'dec' in job:
+        return SkyCoord(float(job['ra'])*u.deg, float(job['dec'])*u.deg)
+    return job['target']
+
+def name_of(job):
+    '''
+    A name for a job, suitable for a filename.
+    '''
+    name = job.get('name') or job.get('target') or '{}{:+}'.format(job['ra'], job['dec'])
+    return str(name).replace(' ', '').replace(os.sep, '-')
+
+def output_for(job, directory='.'):
+    '''
+    Where should the chart for a job be written?
+    '''
+    filename = job.get('filename') or f'{name_of(job)}.{job["format"]}'
+    return os.path.join(directory, filename)
+
+def fingerprint(job):
+    '''
+    A hash of everything that affects how a job's chart looks.
+    '''
+    recipe = dict(center=str(center_of(job)),
+                  radius=float(job['radius']),
+                  images=as_list(job['images']),
+                  constellations=as_list(job['constellations']),
+                  format=str(job['format']),
+                  dpi=float(job['dpi']),
+                  version=__version__)
+    return hashlib.sha1(json.dumps(recipe, sort_keys=True).encode()).hexdigest()
+
+def up_to_date(job, directory='.'):
+    '''
+    Has a job's chart already been made, with the same settings?
+    '''
+    filename = output_for(job, directory)
+    try:
+        with open(filename + '.json') as f:
+            return os.path.exists(filename) and json.load(f)['fingerprint'] == fingerprint(job)
+    except (IOError, ValueError, KeyError):
+        return False
+
+# (in each worker process) one FinderTemplate for each layout
+_templates = {}
+
+def warm(cache_directory, backend):
+    '''
+    Set up a worker process (to draw without a screen, and share
+    the cache and the archive backend of the parent process, even
+    if the worker was spawned rather than forked).
+    '''
+    plt.switch_backend('Agg')
+    io.cache_directory = cache_directory
+    archives.use(backend)
+
+def make(job, directory='.'):
+    '''
+    Make the finder chart for one job (and its sidecar file).
+
+    Returns
+    -------
+    seconds : float
+        How long it took.
+    '''
+    from . import images, constellations
+    from .finders import FinderTemplate
+
+    start = time.perf_counter()
+    layout = (float(job['radius']), tuple(as_list(job['images'])), tuple(as_list(job['constellations'])))
+    if layout not in _templates:
+        _templates[layout] = FinderTemplate(radius=layout[0]*u.arcmin,
+                                            images=[getattr(images, i) for i in layout[1]],
+                                            constellations=[getattr(constellations, c) for c in layout[2]])
+    template = _templates[layout]
+
+    filename = output_for(job, directory)
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    format, dpi = str(job['format']).lower(), float(job['dpi'])
+    with io.atomic(filename) as temporary:
+        if format in render.formats:
+            template.render(center_of(job), temporary, dpi=dpi, format=format)
+        else:
+            template.savefig(center_of(job), temporary, dpi=dpi, format=format)
+
+    seconds = time.perf_counter() - start
+    with io.atomic(filename + '.json') as temporary:
+        with open(temporary, 'w') as f:
+            json.dump(dict(fingerprint=fingerprint(job),
+                           target=str(center_of(job)),
+                           seconds=seconds,
+                           made=Time.now().isot), f, indent=1)
+    return seconds
+
+def finders(jobs, directory='.', workers=1, force=False, progress=True):
+    '''
+    Make finder charts for a list of jobs, skipping those
+    that are already up to date.
+
+    Parameters
+    ----------
+    jobs : list
+        The jobs (see `read_jobs`).
+    directory : str
+        The directory for the charts.
+    workers : int
+        How many processes should make charts at once?
+    force : bool
+        Should charts be remade, even if they're up to date?
+    progress : bool
+        Should a progress bar be shown?
+
+    Returns
+    -------
+    report : astropy.table.Table
+        One row per job (in the same order as the jobs), with its
+        name, filename, status ('made', 'skipped', or 'failed'),
+        time, and error.
+    '''
+
+    rows = [None]*len(jobs)
+    todo = []
+    for i, job in enumerate(jobs):
+        if (not force) and up_to_date(job, directory):
+            rows[i] = (name_of(job), output_for(job, directory), 'skipped', 0.0, '')
+        else:
+            todo.append(i)
+    print(f'making {len(todo)} finders ({len(jobs) - len(todo)} are already up to date)')
+
+    def record(i, outcome):
+        job = jobs[i]
+        try:
+            seconds, status, error = outcome(), 'made', ''
+        except Exception as e:
+            seconds, status, error = np.nan, 'failed', f'{e.__class__.__name__}: {e}'
+            print(f'failed to make a finder for {name_of(job)} ({error})')
+        rows[i] = (name_of(job), output_for(job, directory), status, seconds, error)
+
+    if workers <= 1:
+        for i in tqdm(todo, disable=not progress):
+            record(i, lambda: make(jobs[i], directory))
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=warm,
+                                 initargs=(io.cache_directory, archives.backend)) as pool:
+            futures = {pool.submit(make, jobs[i], directory):i for i in todo}
+            for future in tqdm(as_completed(futures), total=len(futures), disable=not progress):
+                record(futures[future], future.result)
+
+    report = Table(rows=rows or None,
+                   names=['name', 'filename', 'status', 'seconds', 'error'],
+                   dtype=[str, str, str, float, str])
+    return report
+
+def main(argv=None):
+    '''
+    Run the `tfs` command-line tool.
+    '''
+    parser = argparse.ArgumentParser(prog='tfs', description='Make finder charts with thefriendlystars.')
+    parser.add_argument('--cache-directory', default=None, help='(defaults to io.cache_directory)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    f = commands.add_parser('finder', help='make finder charts')
+    f.add_argument('jobs', nargs='+', help='target names, or .csv/.yaml/.txt files of jobs')
+    f.add_argument('--images', default=None, help=f'(default: {defaults["images"]})')
+    f.add_argument('--constellations', default=None, help=f'(default: {defaults["constellations"]})')
+    f.add_argument('--radius', type=float, default=None, help=f'(arcmin, default: {defaults["radius"]})')
+    f.add_argument('--format', default=None, help=f'(default: {defaults["format"]})')
+    f.add_argument('--dpi', type=float, default=None, help=f'(default: {defaults["dpi"]})')
+    f.add_argument('--directory', default='.')
+    f.add_argument('--workers', type=int, default=1)
+    f.add_argument('--prewarm', action='store_true', help='download everything first')
+    f.add_argument('--force', action='store_true', help='remake charts that are up to date')
+
+    p = commands.add_parser('prewarm', help='download everything some finders will need')
+    p.add_argument('jobs', nargs='+')
+    p.add_argument('--images', default=None)
+    p.add_argument('--constellations', default=None)
+    p.add_argument('--radius', type=float, default=None)
+
+    s = commands.add_parser('serve', help='run a local HTTP service that renders finders')
+    s.add_argument('--host', default='127.0.0.1')
+    s.add_argument('--port', type=int, default=8000)
+    s.add_argument('--workers', type=int, default=8)
+    s.add_argument('--finders', type=int, default=64, help='how many finders to keep in memory')
+    s.add_argument('--charts', type=int, default=256, help='how many rendered charts to keep in memory')
+
+    c = commands.add_parser('cache', help='inspect and tidy the cache')
+    c.add_argument('action', choices=['list', 'prune', 'clear', 'prewarm'])
+    c.add_argument('jobs', nargs='*', help='(for prewarm) target names, or .csv/.yaml/.txt files of jobs')
+    c.add_argument('--budget', type=float, default=None)
+    c.add_argument('--policy', default=None, choices=['lru', 'lfu'])
+    c.add_argument('--dry-run', action='store_true')
+
+    args = parser.parse_args(argv)
+    if args.cache_directory is not None:
+        io.cache_directory = args.cache_directory
+
+    if args.command == 'cache' and args.action == 'prewarm':
+        # (the same as `tfs prewarm`, with the default layout)
+        if not args.jobs:
+            parser.error('cache prewarm needs at least one target')
+        args.command = 'prewarm'
+        args.images = args.constellations = args.radius = None
+
+    if args.command in ['finder', 'prewarm']:
+        settings = dict(images=args.images, constellations=args.constellations, radius=args.radius)
+        if args.command == 'finder':
+            settings.update(format=args.format, dpi=args.dpi)
+        jobs = [job for source in args.jobs for job in read_jobs(source, **settings)]
+
+    if (args.command == 'prewarm') or (args.command == 'finder' and args.prewarm):
+        from .prewarm import prewarm
+        from . import images, constellations
+        # (grouped by layout, since prewarm takes one layout at a time)
+        layouts = {}
+        for job in jobs:
+            layout = (float(job['radius']), tuple(as_list(job['images'])), tuple(as_list(job['constellations'])))
+            layouts.setdefault(layout, []).append(center_of(job))
+        for (radius, i, k), centers in layouts.items():
+            prewarm(centers, images=[getattr(images, x) for x in i],
+                             constellations=[getattr(constellations, x) for x in k],
+                             radius=radius*u.arcmin)
+
+    if args.command == 'finder':
+        report = finders(jobs, directory=args.directory, workers=args.workers, force=args.force)
+        for status in ['made', 'skipped', 'failed']:
+            print(f'{np.sum(report["status"] == status)} {status}')
+        failed = report[report['status'] == 'failed']
+        if len(failed):
+            failed.pprint(max_lines=-1, max_width=-1)
+            return 1
+
+    elif args.command == 'serve':
+        from .service import serve
+        serve(host=args.host, port=args.port, workers=args.workers,
+              finders=args.finders, charts=args.charts)
+
+    elif args.command == 'cache':
+        m = cache.manager()
+        if args.action == 'list':
+            t = m.list()
+            t.pprint(max_lines=-1, max_width=-1)
+            print(f'{len(t)} files, {t.meta["total"]/1e6:.1f} MB in {m.directory}')
+        elif args.action == 'prune':
+            removed = m.prune(budget=args.budget, policy=args.policy, dry_run=args.dry_run)
+            print(f'{"would remove" if args.dry_run else "removed"} {len(removed)} files')
+        elif args.action == 'clear':
+            removed = m.clear()
+            print(f'removed {len(removed)} files')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+'''
+Declarative descriptions of how to standardize a catalog.
+
+Every Constellation needs its archive's table converted into a
+standardized table (identifiers, then coordinates, then magnitudes,
+then errors, with units). Rather than writing that conversion by
+hand for each catalog, an Adapter describes which column holds what
+(and in what units), and compiles that into one standardizer that
+works on whole columns at once:
+
+    adapter = Adapter(identifiers=dict(TIC='ID'),
+                      ra=('ra', 'deg'), dec=('dec', 'deg'),
+                      pm_ra_cosdec=('pmRA', 'mas/yr'), pm_dec=('pmDEC', 'mas/yr'),
+                      epoch=2000.0,
+                      filters=dict(T='Tmag'))
+    standardized = adapter.standardize(table)
+
+Constellations with an `.adapter` can be downloaded, cached, and
+standardized without any other catalog-specific code (see
+`astroqueryConstellation`).
+'''
+
+from ..imports import *
+
+# the zero points of the ways epochs can be stored in a column
+julian = dict(jd=2451545.0, mjd=51544.5)
+
+def filled(column, fill=np.nan):
+    '''
+    The values of a (possibly masked) column as a plain array,
+    with any masked values replaced by `fill` (or, for strings
+    and integers, by '' and 0).
+    '''
+    values = np.ma.asarray(column)
+    if values.dtype.kind in 'US':
+        fill = ''
+    elif values.dtype.kind in 'iub':
+        fill = 0
+    return np.ma.filled(values, fill)
+
+class Adapter:
+    '''
+    An Adapter maps the columns of one catalog's
+    tables onto a standardized Constellation table.
+    '''
+
+    def __init__(self, identifiers,
+                       ra, dec,
+                       pm_ra_cosdec=None, pm_dec=None,
+                       radial_velocity=None,
+                       parallax=None,
+                       epoch=2000.0,
+                       filters={},
+                       errors={},
+                       minimum_snr=None,
+                       farthest=np.nan*u.pc):
+        '''
+        Each quantity is described by a (column, unit) pair,
+        naming the column in the catalog's tables and the
+        units in which it's stored there.
+
+        Parameters
+        ----------
+        identifiers : dict
+            The identifier columns, as {name:column}. (The first
+            is used as the key for finding stars.)
+        ra, dec : tuple
+            The celestial coordinates, as (column, unit).
+        pm_ra_cosdec, pm_dec : tuple
+            The proper motions, as (column, unit). If None,
+            the stars are assumed not to move. (Masked
+            proper motions are also treated as zero.)
+        radial_velocity : tuple
+            The radial velocity, as (column, unit). If None, NaN.
+            (Masked radial velocities are treated as zero.)
+        parallax : tuple
+            The parallax, as (column, unit), from which distances
+            are calculated. If None, distances are NaN.
+        epoch : float, or tuple
+            The epoch of the coordinates, either as one decimal
+            year for the whole catalog, or as (column, format) for
+            an epoch per star, where format is 'year', 'jd', or 'mjd'.
+        filters : dict
+            The magnitude columns, as {filter:column}.
+        errors : dict
+            The uncertainties, as {key:(column, unit)}, where each
+            key is one of the coordinates. (For 'distance', give
+            the column of the parallax uncertainty; for 'ra',
+            the uncertainty should be of RA*cos(Dec), as in Gaia.)
+        minimum_snr : float
+            Parallaxes with a lower signal-to-noise than this (or
+            masked ones) are treated as unmeasured.
+        farthest : astropy.units.quantity.Quantity
+            The distance given to stars without a measured parallax.
+        '''
+
+        def compile(spec):
+            if spec is None:
+                return None
+            column, unit = spec
+            return column, u.Unit(unit)
+
+        self.identifiers = dict(identifiers)
+        self.ra, self.dec = compile(ra), compile(dec)
+        self.motions = dict(pm_ra_cosdec=compile(pm_ra_cosdec),
+                            pm_dec=compile(pm_dec),
+                            radial_velocity=compile(radial_velocity))
+        self.parallax = compile(parallax)
+        self.epoch = epoch
+        self.filters = dict(filters)
+        self.errors = {k:compile(v) for k, v in errors.items()}
+        self.minimum_snr = minimum_snr
+        self.farthest = farthest
+
+    @property
+    def columns(self):
+        '''
+        The catalog columns this adapter needs (for building queries).
+        '''
+        needed = list(self.identifiers.values())
+        needed += [self.ra[0], self.dec[0]]
+        needed += [m[0] for m in self.motions.values() if m is not None]
+        if self.parallax is not None:
+            needed.append(self.parallax[0])
+        if not np.isscalar(self.epoch):
+            needed.append(self.epoch[0])
+        needed += list(self.filters.values())
+        needed += [e[0] for e in self.errors.values()]
+        return list(dict.fromkeys(needed))
+
+    @property
+    def error_keys(self):
+        '''
+        The coordinates that have uncertainties.
+        '''
+        return list(self.errors)
+
+    def epochs(self, table):
+        '''
+        The epoch of each star (in decimal years).
+        '''
+        N = len(table)
+        if np.isscalar(self.epoch):
+            return np.full(N, float(self.epoch))
+        column, format = self.epoch
+        values = filled(table[column]).astype(float)
+        if format == 'year':
+            return values
+        return 2000.0 + (values - julian[format])/365.25
+
+    def standardize(self, table, catalog=None):
+        '''
+        Standardize a table from this catalog.
+
+        Parameters
+        ----------
+        table : astropy.table.Table
+            The table downloaded from the archive.
+            (It's not modified.)
+        catalog : str
+            The name to store in the table's meta.
+
+        Returns
+        -------
+        standardized : astropy.table.Table
+            Identifiers, coordinates, magnitudes, and errors.
+        '''
+
+        N = len(table)
+        columns = {}
+
+        for name, column in self.identifiers.items():
+            columns[name + '-id'] = filled(table[column])
+
+        # positions and motions
+        for k, spec in [('ra', self.ra), ('dec', self.dec)]:
+            columns[k] = filled(table[spec[0]])*spec[1]
+        for k, spec in self.motions.items():
+            if spec is None:
+                default = np.nan if k == 'radial_velocity' else 0.0
+                unit = u.km/u.s if k == 'radial_velocity' else u.mas/u.year
+                columns[k] = np.full(N, default)*unit
+            else:
+                columns[k] = filled(table[spec[0]], 0.0)*spec[1]
+
+        # distances, from parallaxes
+        if self.parallax is None:
+            columns['distance'] = np.full(N, np.nan)*u.pc
+        else:
+            column, unit = self.parallax
+            parallax = filled(table[column]).astype(float)
+            bad = ~np.isfinite(parallax) | (parallax <= 0)
+            if self.minimum_snr is not None and 'distance' in self.errors:
+                uncertainty = filled(table[self.errors['distance'][0]]).astype(float)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    bad |= ~(parallax/uncertainty >= self.minimum_snr)
+            parallax[bad] = np.nan
+            distance = (parallax*unit).to(u.pc, equivalencies=u.parallax())
+            distance[bad] = self.farthest
+            columns['distance'] = distance
+        columns['obstime'] = self.epochs(table)*u.year
+
+        for f, column in self.filters.items():
+            columns[f + '-mag'] = filled(table[column]).astype(float)
+
+        for k, (column, unit) in self.errors.items():
+            if k == 'distance':
+                fractional = filled(table[column]).astype(float)*unit/(parallax*self.parallax[1])
+                columns[k + '-error'] = columns['distance']*fractional.decompose()
+            else:
+                columns[k + '-error'] = filled(table[column])*unit
+
+        standardized = Table(columns, copy=False)
+        if catalog is not None:
+            standardized.meta['catalog'] = catalog
+        return standardized
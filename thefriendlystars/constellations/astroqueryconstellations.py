@@ -1,36 +1,51 @@
-"""
-NOT YET IMPLEMENTED???
-"""
+'''
+A base class for catalogs that are described by an Adapter.
+'''
 
 from .constellation import *
-from astroquery.mast import Catalogs
+from .. import archives
+from ..instrumentation import timer
 
 
 class astroqueryConstellation(Constellation):
     '''
-    A base class for all queries that
-    depend on astroquery
+    A base class for cone searches of catalogs that
+    depend on astroquery. Subclasses need only say which
+    catalog to query (.catalog, from .archive) and how to
+    read its columns (.adapter); downloading, caching,
+    and standardizing are all handled here.
     '''
 
     catalog = None
     name = 'astroquery'
+    archive = 'mast'
     color = 'black'
+    adapter = None
     defaultfilter = None # this is the default filter to display
-    filters = None
-    #epoch = 2015.5 # the default epoch
     magnitudelimit = 20.0
-    identifier_keys = []
-    error_keys = []
     epoch = 2000.0
 
-    @classmethod
-    def from_cone(cls,
-                  center,
-                  radius=3*u.arcmin,
-                  magnitudelimit=20,
-                  **kw):
+    # the largest cone that batch() will send as one query
+    batch_radius = 0.25*u.deg
+
+    def __init_subclass__(cls, **kw):
+        '''
+        Take the identifiers, filters, and errors from the adapter.
         '''
-        Create a Constellation from a cone search of the sky,
+        super().__init_subclass__(**kw)
+        if cls.adapter is not None:
+            cls.identifier_keys = list(cls.adapter.identifiers)
+            cls.filters = list(cls.adapter.filters)
+            cls.error_keys = cls.adapter.error_keys
+            if np.isscalar(cls.adapter.epoch):
+                cls.epoch = cls.adapter.epoch
+
+    def __init__(self,
+                 center,
+                 radius=3*u.arcmin,
+                 **kw):
+        '''
+        Initialize a Constellation from a cone search of the sky,
         characterized by a positional center and a radius from it.
 
         Parameters
@@ -40,123 +55,118 @@ class astroqueryConstellation(Constellation):
             If a str, SkyCoord will be resolved with SkyCoord.from_name
         radius : float, with units of angle
             The angular radius for the query.
-        magnitudelimit : float
-            The maximum magnitude to include in the download.
-            (This is explicitly thinking UV/optical/IR, would
-            need to change to flux to be able to include other
-            wavelengths.)
         '''
 
-        # convert the center into astropy coordinates
-        center = parse_center(center)
-
+        self.center = center
+        self.radius = radius
 
-        # run the query
-        print('querying astroquery, centered on {} with radius {}, for G<{}'.format(center, radius, magnitudelimit))
-        table = Catalogs.query_object(center, radius=radius, catalog=self.catalog)
+        # poulate the ._downloaded attribute (either by loading or downloading)
+        self.populate()
 
-        # store the search parameters in this object
-        c = cls(cls.standardize_table(table))
-        c.standardized.meta['center'] = center
-        c.standardized.meta['radius'] = radius
-        c.standardized.meta['magnitudelimit'] = magnitudelimit
+        # feed a standardized table as inputs to create a constellation
+        Constellation.__init__(self, self._downloaded)
 
-        return c
+    @classmethod
+    def from_cone(cls, center, radius=3*u.arcmin, **kw):
+        '''
+        Create a Constellation from a cone search of the sky.
+        (This is the same as creating one directly.)
+        '''
+        return cls(center, radius=radius, **kw)
 
-    """
     @classmethod
-    def from_sky(cls, distancelimit=15, magnitudelimit=18):
+    def query(cls, center, radius):
         '''
-        Create a Constellation from a criteria search of the whole sky.
+        Download the raw table for a cone from the archive.
 
         Parameters
         ----------
-        distancelimit : float
-            Maximum distance (parsecs).
-        magnitudelimit : float
-            Maximum magnitude (for Gaia G).
+        center : SkyCoord
+            The center of the cone.
+        radius : astropy.units.quantity.Quantity
+            The radius of the cone.
+        '''
+        return archives.backend.query_mast_catalog(cls.catalog, coordinates=center, radius=radius)
 
+    def download(self):
         '''
+        Download a cone search of stars in this field.
+        This populates the hidden ._downloaded table.
+        '''
+        center = self.coordinate_center
 
-        # define a query for cone search surrounding this center
-        criteria = []
-        if distancelimit is not None:
-            criteria.append('parallax >= {}'.format(1000.0/distancelimit))
-        if magnitudelimit is not None:
-            criteria.append('phot_g_mean_mag <= {}'.format(magnitudelimit))
+        print('querying {}, centered on {} with radius {}'.format(self.name, center, self.radius))
+        self._downloaded = self.brighter(self.standardize_table(self.query(center, self.radius)))
 
-        allskyquery = """{} WHERE {}""".format(cls.basequery, ' and '.join(criteria))
-        print(allskyquery)
+        self._downloaded.meta['center'] = center
+        self._downloaded.meta['radius'] = self.radius
+        self._downloaded.meta['magnitudelimit'] = self.magnitudelimit
 
-        # run the query
-        print('querying Gaia DR2, for distance<{} and G<{}'.format(distancelimit, magnitudelimit))
-        table = query(allskyquery)
+    @classmethod
+    def brighter(cls, standardized):
+        '''
+        Keep only the stars brighter than the magnitude limit.
+        '''
+        with np.errstate(invalid='ignore'):
+            bright = standardized[cls.defaultfilter + '-mag'] < cls.magnitudelimit
+        return standardized[bright]
 
-        # store the search parameters in this object
-        c = cls(cls.standardize_table(table))
+    @classmethod
+    def batch(cls, centers, radius=3*u.arcmin):
+        '''
+        Create cones around many centers, sending each group
+        of nearby centers (like the stars of a cluster) to the
+        archive as one bigger cone (no bigger than .batch_radius),
+        which is then split up and cached as the individual cones.
 
-        c.standardized.meta['query'] = allskyquery
-        c.standardized.meta['magnitudelimit'] = magnitudelimit
-        c.standardized.meta['distancelimit'] = distancelimit
+        Parameters
+        ----------
+        centers : list
+            The centers (names or SkyCoords) of the cones.
+        radius : astropy.units.quantity.Quantity
+            The radius of each cone.
+
+        Returns
+        -------
+        constellations : list
+            One constellation for each center.
+        '''
 
-        #c.distancelimit = distancelimit
-        #c.magnitudelimit = magnitudelimit or c.magnitudelimit
-        return c
-    """
+        # gather nearby centers (of cones that aren't cached yet) into groups
+        todo = cls.needing_download(centers, radius)
+        coordinates = SkyCoord([parse_center(c) for c in todo]) if todo else None
+        remaining = np.ones(len(todo), bool)
+        with timer(f'{cls.__name__}.batch') as counts:
+            for i in range(len(todo)):
+                if not remaining[i]:
+                    continue
+                separation = coordinates[i].separation(coordinates)
+                group = remaining & (separation + radius <= cls.batch_radius)
+                group[i] = True
+                remaining[group] = False
+                if group.sum() == 1:
+                    continue
+
+                # query the cone covering the whole group, and split it up
+                cover = np.max(separation[group]) + radius
+                print(f'querying {cls.name} for {group.sum()} cones at once, within {cover.to("arcmin"):.2f} of {coordinates[i]}')
+                standardized = cls.brighter(cls.standardize_table(cls.query(coordinates[i], cover)))
+                stars = SkyCoord(standardized['ra'], standardized['dec'])
+                counts['queries'] += 1
+                members = np.nonzero(group)[0]
+                cls._split_batch([todo[j] for j in members], radius,
+                                 [standardized[stars.separation(coordinates[j]) <= radius] for j in members])
+                counts['cones'] += len(members)
+
+        # load (or, for the stragglers, download) each cone
+        return [cls(c, radius=radius) for c in centers]
 
     @classmethod
     def standardize_table(cls, table):
         '''
-        Extract objects from an astroquery table.
+        Extract objects from a table downloaded from this catalog.
         '''
-
-        # tidy up quantities, setting motions to 0 if poorly defined
-        for key in ['pmra', 'pmdec', 'parallax', 'radial_velocity']:
-            bad = table[key].mask
-            table[key][bad] = 0.0
-
-        bad = table['parallax']/table['parallax_error'] < 1
-        bad += table['parallax'].mask
-        table['parallax'][bad] = np.nan
-        distance = 1000*u.pc/table['parallax'].data
-
-        distance[bad] = 10000*u.pc#np.nanmax(distance)
-        identifiers  = {'GaiaDR2-id':table['source_id']}
-
-        # create skycoord objects
-        coordinates = dict(  ra=table['ra'].data*u.deg,
-                             dec=table['dec'].data*u.deg,
-                             pm_ra_cosdec=table['pmra'].data*u.mas/u.year,
-                             pm_dec=table['pmdec'].data*u.mas/u.year,
-                             radial_velocity=table['radial_velocity'].data*u.km/u.s,
-                             distance=distance, # weirdly, messed with RA + Dec signs if parallax is zero
-                             obstime=cls.epoch*np.ones(len(table))*u.year)#Time(, format='decimalyear'))
-
-        magnitudes = {k+'-mag':table['phot_{}_mean_mag'.format(k.lower())].data for k in cls.filters}
-
-
-        errors = dict(distance= distance*(table['parallax_error'].data/table['parallax'].data),
-                      pm_ra_cosdec=table['pmra_error'].data*u.mas/u.year,
-                      pm_dec=table['pmdec_error'].data*u.mas/u.year,
-                      radial_velocity=table['radial_velocity_error'].data*u.km/u.s)
-
-        error_table = Table(data=[errors[k] for k in cls.error_keys],
-                            names=[k+'-error' for k in cls.error_keys])
-
-
-        #for key in ['pmra', 'pmdec', 'parallax', 'radial_velocity']:
-        #        bad = table[key].mask
-        #        table[key][bad] = 0.0
-
-
-        standardized = hstack([Table(identifiers),
-                               Table(coordinates),
-                               Table(magnitudes),
-                               error_table])
-
-        standardized.meta['catalog'] = 'Gaia'
-
-        return standardized
-
-#class TIC(astroqueryConstellation):
-#    catalog = 'TIC'
+        with timer(f'{cls.__name__}.standardize_table') as counts:
+            standardized = cls.adapter.standardize(table, catalog=cls.name)
+            counts['rows'] += len(standardized)
+            return standardized
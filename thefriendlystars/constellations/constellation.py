@@ -1,50 +1,88 @@
-from ..field import Field
+from ..field import Field, Center, resolve, parse_center, download_tic_coord
 from ..imports import *
+from .. import archives, kernels, io, cache
+from ..instrumentation import timed, timer, count
 from astropy.table import hstack
+from collections import OrderedDict
 
 # a shortcut getting the coordinates for an object, by its name
 get = coord.SkyCoord.from_name
 
-def download_tic_coord(tic):
+def unit_vectors(ra, dec):
     '''
-    Use the MAST archive to download a SkyCoord for one
-    star from the TESS Input Catalog.
+    The (x, y, z) unit vectors pointing toward celestial coordinates.
 
-    '''
-
-
-    # import Catalogs only when we need it
-    # (otherwise, we'll need the internet to ever run tfs)
-    from astroquery.mast import Catalogs
+    Parameters
+    ----------
+    ra, dec : astropy.units.quantity.Quantity
+        The positions.
 
-    # download that TIC from the archive
-    t = Catalogs.query_criteria(catalog="Tic", ID=tic)[0]
-
-    # the 'ra' and 'dec' columns were propagated to J2000 (https://outerspace.stsci.edu/display/TESS/TIC+v8+and+CTL+v8.xx+Data+Release+Notes)
-    obstime='J2000.0'
+    Returns
+    -------
+    xyz : array
+        The unit vectors, with shape (3, ...).
+    '''
+    return kernels.unit_vectors(u.Quantity(ra).to_value(u.deg), u.Quantity(dec).to_value(u.deg))
 
-    # define a sky coord, with proper motions and a time
-    s = coord.SkyCoord(  ra=t['ra']*u.deg,
-                         dec=t['dec']*u.deg,
-                         pm_ra_cosdec=t['pmRA']*u.mas/u.year,
-                         pm_dec=t['pmDEC']*u.mas/u.year,
-                         obstime='J2000.0')
+def value_in(x, unit):
+    '''
+    The value of a Quantity (or TimeDelta) in some unit.
+    (This raises a TypeError for None, as for missing proper motions.)
+    '''
+    if x is None:
+        raise TypeError(f'None has no value in {unit}.')
+    return x.to_value(unit)
 
-    return s
+def as_obstime(epoch):
+    '''
+    Convert an epoch (an astropy Time, or decimal year(s))
+    into a Quantity in years.
+    '''
+    try:
+        epoch.year
+        return epoch
+    except AttributeError:
+        try:
+            return epoch.decimalyear*u.year
+        except AttributeError:
+            return np.asarray(epoch, dtype=float)*u.year
 
+def remember(memo, key, value, limit):
+    '''
+    Remember a value in a memo (an OrderedDict), forgetting
+    the least recently used entries beyond some limit.
+    '''
+    memo[key] = value
+    memo.move_to_end(key)
+    while len(memo) > limit:
+        memo.popitem(last=False)
 
-def parse_center(center):
+def propagate_linearly(ra, dec, pm_ra_cosdec, pm_dec, dt):
     '''
-    Flexible wrapper to ensure we return a SkyCoord center.
+    Move positions along their proper motions, in straight lines.
+    Any of these can be arrays (one value per star), so
+    every star can be moved by its own time difference.
+    (The work is done by kernels.propagate, in chunks
+    spread over kernels.workers threads.)
+
+    Parameters
+    ----------
+    ra, dec : astropy.units.quantity.Quantity
+        The positions.
+    pm_ra_cosdec, pm_dec : astropy.units.quantity.Quantity
+        The proper motions.
+    dt : astropy.units.quantity.Quantity
+        The time (or times) by which to move them.
+
+    Returns
+    -------
+    ra, dec : astropy.units.quantity.Quantity
+        The new positions, in degrees.
     '''
-    if type(center) == str:
-        if center[0:3].lower() == 'tic':
-            tic = int(center[3:])
-            return download_tic_coord(tic)
-        else:
-            return coord.SkyCoord.from_name(center)
-    else:
-        return center
+    newra, newdec = kernels.propagate(value_in(ra, u.deg), value_in(dec, u.deg),
+                                      value_in(pm_ra_cosdec, u.mas/u.year), value_in(pm_dec, u.mas/u.year),
+                                      value_in(dt, u.year))
+    return newra*u.deg, newdec*u.deg
 
 class Constellation(Field):
     '''
@@ -61,9 +99,20 @@ class Constellation(Field):
     filters = ['filter']
     defaultfilter = 'filter'
     error_keys = []
+
+    # epochs closer than this (in years) share one propagation
+    # (0 = only exactly the same epoch, None = never reuse)
+    epoch_tolerance = 0.0
+
+    # how many propagations (by at_epoch) and regions (by region) are remembered?
+    epochs_remembered = 8
+    regions_remembered = 32
+
+    # the range of epochs over which stars' paths are indexed (see .paths)
+    path_epochs = (1900.0, 2100.0)
     coordinate_keys = ['ra', 'dec', 'distance', 'pm_ra_cosdec', 'pm_dec', 'radial_velocity', 'obstime']
 
-    def __init__(self, standardized):
+    def __init__(self, standardized, copy=True):
         '''
         Initialize a Constellation object.
 
@@ -72,13 +121,16 @@ class Constellation(Field):
         ----------
         standardized : astropy.table.Table
             Must contain at least one identifier, coordinates, and at least one magnitude.
+        copy : bool
+            Should the columns be copied? (If not, the Constellation
+            uses the table's columns, such as memory-mapped ones.)
         '''
 
         # set up the talker for this catalog
         Talker.__init__(self)
 
         # create an astropy table
-        self.standardized = QTable(standardized)
+        self.standardized = QTable(standardized, copy=copy)
         #self.identifiers = self.standardized[[i + '-id' for i in self.identifier_keys]]
         #self.coordinates = self.standardized['coordinates']
         #self.magnitudes = self.standardized[[f+'-mag' for f in self.filters]]
@@ -102,12 +154,267 @@ class Constellation(Field):
 
         #
         self.epoch = self.obstime.to('year').value
-        if (self.epoch == self.epoch[0]).all():
+        if len(self.epoch) == 0:
+            self.epoch = type(self).epoch
+        elif (self.epoch == self.epoch[0]).all():
             self.epoch = self.epoch[0]
 
         # connect a shortcut to the meta parts of the table
         self.meta = self.standardized.meta
 
+        # forget any propagations (and regions) of the old coordinates
+        self.forget_epochs()
+        self._paths = None
+        self._regions = OrderedDict()
+
+    def forget_epochs(self):
+        '''
+        Forget the propagations remembered by `at_epoch`.
+        '''
+        self._propagated = OrderedDict()
+
+    def __getstate__(self):
+        # (copies and pickles don't bring along the remembered propagations or regions)
+        state = dict(vars(self))
+        state.update(_propagated=OrderedDict(), _paths=None, _regions=OrderedDict())
+        return state
+
+    def subset(self, indices):
+        '''
+        A Constellation (of the same kind) of some of these stars.
+
+        Parameters
+        ----------
+        indices : array
+            The indices (or a boolean mask) of the stars to keep.
+        '''
+        subset = copy.copy(self)
+        subset.standardized = self.standardized[indices]
+        subset.propagate()
+        return subset
+
+    def proper_motions(self):
+        '''
+        The proper motions of the stars (in mas/yr), as plain
+        arrays, with zeros for any that are missing.
+
+        Returns
+        -------
+        pm_ra_cosdec, pm_dec : array
+            The proper motions.
+        '''
+        N = len(self.standardized)
+        motions = []
+        for k in ['pm_ra_cosdec', 'pm_dec']:
+            try:
+                motions.append(np.nan_to_num(value_in(getattr(self, k, None), u.mas/u.year)))
+            except TypeError:
+                motions.append(np.zeros(N))
+        return motions
+
+    def copy(self):
+        '''
+        A Constellation (of the same kind) with its own copy of the table.
+        '''
+        duplicate = copy.copy(self)
+        duplicate.standardized = self.standardized.copy()
+        duplicate.propagate()
+        return duplicate
+
+    @classmethod
+    def from_standardized(cls, standardized, center=None, radius=None):
+        '''
+        Create a Constellation of this kind straight from a
+        standardized table, as if it had been downloaded for
+        a field with this center and radius (but without
+        downloading or loading anything).
+
+        Parameters
+        ----------
+        standardized : astropy.table.Table
+            The standardized table of stars.
+        center : SkyCoord object, or str
+            The center of the field.
+        radius : astropy.units.quantity.Quantity
+            The radius of the field.
+        '''
+        c = cls.__new__(cls)
+        c.center, c.radius = center, radius
+        c._downloaded = standardized
+        Constellation.__init__(c, standardized)
+        return c
+
+    @classmethod
+    def needing_download(cls, centers, radius):
+        '''
+        Which of these cones aren't in the cache (or have
+        expired)? If caching is turned off, none of them are.
+
+        Parameters
+        ----------
+        centers : list
+            The centers (names or SkyCoords) of the cones.
+        radius : astropy.units.quantity.Quantity
+            The radius of each cone.
+
+        Returns
+        -------
+        centers : list
+            The centers of the cones that need to be downloaded.
+        '''
+        if not io.cache:
+            return []
+        manager = cache.manager()
+        def needed(center):
+            filename = cls.filename_for(center, radius)
+            return not (os.path.exists(filename) and not manager.expired(filename))
+        return [c for c in centers if needed(c)]
+
+    @classmethod
+    def _split_batch(cls, centers, radius, tables, **meta):
+        '''
+        Cache the cones downloaded together by a batch
+        query, as if each had been downloaded alone.
+
+        Parameters
+        ----------
+        centers : list
+            The centers (names or SkyCoords) of the cones.
+        radius : astropy.units.quantity.Quantity
+            The radius of each cone.
+        tables : list
+            The standardized table of the stars in each cone.
+        **meta : dict
+            Anything else to record in the meta of each table.
+        '''
+        manager = cache.manager()
+        for center, table in zip(centers, tables):
+            field = cls.from_standardized(table, center, radius)
+            field._downloaded.meta.update(meta)
+            field._downloaded.meta['center'] = field.coordinate_center
+            field._downloaded.meta['radius'] = radius
+            field._downloaded.meta['magnitudelimit'] = cls.magnitudelimit
+            with io.exclusive(field.filename):
+                field.save()
+            manager.register(field.filename)
+
+    def index_paths(self, epochs=None):
+        '''
+        Make an index of the paths these stars sweep
+        across the sky (see constellations.paths).
+
+        Parameters
+        ----------
+        epochs : tuple
+            The (earliest, latest) epochs to cover.
+            (Defaults to .path_epochs.)
+        '''
+        from .paths import PathIndex
+        with timer('Constellation.index_paths') as counts:
+            paths = PathIndex(self.ra, self.dec,
+                              getattr(self, 'pm_ra_cosdec', None),
+                              getattr(self, 'pm_dec', None),
+                              self.obstime,
+                              epochs=self.path_epochs if epochs is None else epochs)
+            counts['rows'] += len(paths)
+        return paths
+
+    @property
+    def paths(self):
+        '''
+        An index of the paths these stars sweep across the
+        sky over .path_epochs (made the first time it's needed).
+        '''
+        if self._paths is None:
+            self._paths = self.index_paths()
+        return self._paths
+
+    def cone(self, center, radius, epoch):
+        '''
+        The stars that are within a radius of a center,
+        at a particular epoch. Only stars whose paths
+        come near the cone are propagated, so this is
+        quick even for epochs far from the catalog's.
+
+        Parameters
+        ----------
+        center : str, SkyCoord, or Center
+            The center of the cone.
+        radius : astropy.units.quantity.Quantity
+            The radius of the cone.
+        epoch : float
+            The epoch, as a decimal year.
+
+        Returns
+        -------
+        cone : Constellation
+            The stars in the cone (still at their own epochs).
+        '''
+        center = resolve(center)
+        epoch = float(getattr(epoch, 'decimalyear', epoch))
+        with timer('Constellation.cone') as counts:
+            paths = self.paths if self.paths.covers(epoch) else self.index_paths((epoch, epoch))
+            indices = paths.cone(center.coordinate, radius, epoch)
+            counts['selected'] += len(indices)
+        return self.subset(indices)
+
+    def region(self, center, radius, epochs=None):
+        '''
+        The stars that could be within some radius of a
+        center, at any time over a span of epochs. These are
+        found with the index of the stars' paths (see .paths),
+        so the cost scales with the number of stars nearby
+        (not in the catalog).
+
+        Regions are remembered for each center and radius (up
+        to .regions_remembered of them, most recently used), so
+        asking again (over a span of epochs already covered)
+        returns that same Constellation.
+
+        Parameters
+        ----------
+        center : str, SkyCoord, or Center
+            The center of the region.
+        radius : astropy.units.quantity.Quantity
+            The radius of the region.
+        epochs : float, or list
+            The epoch(s) at which the stars might be shown,
+            as decimal years. (Defaults to their own epochs.)
+
+        Returns
+        -------
+        region : Constellation
+            The stars that might be in the region.
+        '''
+        center = resolve(center)
+        epochs = np.atleast_1d(np.hstack([self.epoch if epochs is None else epochs])).astype(float)
+        span = (np.nanmin(epochs), np.nanmax(epochs))
+
+        # reuse a region that already covered these epochs
+        key = (center, radius.to(u.arcsec).value)
+        if key in self._regions:
+            covered, region = self._regions[key]
+            if (covered[0] <= span[0]) and (span[1] <= covered[1]):
+                count('Constellation.region', reused=1)
+                self._regions.move_to_end(key)
+                return region
+            span = (min(span[0], covered[0]), max(span[1], covered[1]))
+
+        with timer('Constellation.region') as counts:
+            # search the index of the stars' paths (or, for unusual epochs, a new one)
+            if self.paths.covers(span):
+                paths = self.paths
+            else:
+                paths = self.index_paths(span)
+            indices = paths.candidates(center.coordinate, radius)
+            region = self.subset(indices)
+
+            counts['rows'] += len(self.standardized)
+            counts['selected'] += len(indices)
+
+        remember(self._regions, key, (span, region), self.regions_remembered)
+        return region
+
     @classmethod
     def from_coordinates(cls,   ra=None, dec=None,
                                 distance=None,
@@ -157,10 +464,11 @@ class Constellation(Field):
     def coordinates(self):
         return  self.standardized[self.coordinate_keys]
 
-    #def skycoord(self):
-    #    inputs = self.coordinates
-    #    inputs['obstime'] = Time(self.obstime, format='decimalyear')
-    #    return coord.SkyCoord(**inputs)
+    def skycoord(self):
+        '''
+        The (RA, Dec) positions of the stars, as a SkyCoord.
+        '''
+        return coord.SkyCoord(ra=self.ra, dec=self.dec)
 
     @property
     def identifiers(self):
@@ -265,14 +573,33 @@ class Constellation(Field):
     def magnitude(self):
         return self.magnitudes[self.defaultfilter+'-mag']
 
+    @property
+    def epoch_label(self):
+        '''
+        The epoch (or range of epochs) of these stars, as a string.
+        '''
+        if np.isscalar(self.epoch):
+            return '{:.1f}'.format(self.epoch)
+        return '{:.1f}-{:.1f}'.format(np.nanmin(self.epoch), np.nanmax(self.epoch))
+
     def at_epoch(self, epoch=2000):
         '''
-        Return SkyCoords of the objects, propagated to a (single) given epoch.
+        Return SkyCoords of the objects, propagated to a given epoch.
+
+        Propagations to single epochs are remembered, so asking
+        again for an epoch within .epoch_tolerance (in years) of
+        one already calculated returns a copy of that propagation,
+        without calculating it again. (Only the .epochs_remembered
+        most recently used propagations are kept.) (The tolerance is 0 unless
+        it's changed; a star moving 5"/yr moves 0.5" in 0.1 years.)
 
         Parameters
         ----------
-        epoch : Time, or float
+        epoch : Time, or float, or array
             Either an astropy time, or a decimal year of the desired epoch.
+            This can also be an array, with one epoch for each star.
+            (Stars can each have their own original epoch too;
+            every star is moved by its own time difference.)
 
         Returns
         -------
@@ -281,17 +608,33 @@ class Constellation(Field):
             with that epoch stored in the obstime attribute.
         '''
 
+        # reuse a propagation to (nearly) the same epoch, if there is one
+        try:
+            year = float(getattr(epoch, 'decimalyear', epoch)) if np.size(epoch) == 1 else None
+        except (TypeError, ValueError):
+            year = None
+        if (year is None) or (self.epoch_tolerance is None):
+            return self._at_epoch(epoch)
+        if self._propagated:
+            nearest = min(self._propagated, key=lambda y: abs(y - year))
+            if abs(nearest - year) <= self.epoch_tolerance:
+                count('Constellation.at_epoch', reused=1)
+                self._propagated.move_to_end(nearest)
+                return self._propagated[nearest].copy()
+        projected = self._at_epoch(epoch)
+        remember(self._propagated, year, projected, self.epochs_remembered)
+        return projected.copy()
+
+    @timed('Constellation.at_epoch', rows=lambda c: len(c.standardized))
+    def _at_epoch(self, epoch):
+        '''
+        Propagate to an epoch (without remembering it; see `at_epoch`).
+        '''
+
         projected = copy.deepcopy(self)
 
         # calculate the time offset from the epochs of the orignal coordinates
-        try:
-            epoch.year
-            newobstime = epoch
-        except AttributeError:
-            try:
-                newobstime = epoch.decimalyear*u.year
-            except AttributeError:
-                newobstime = epoch*u.year
+        newobstime = as_obstime(epoch)
 
         #with warnings.catch_warnings() :
         #    warnings.filterwarnings("ignore")
@@ -302,8 +645,8 @@ class Constellation(Field):
         # calculate the new positions, propagated linearly by dt
         try:
             # if proper motions exist
-            newra = (self.ra + self.pm_ra_cosdec/np.cos(self.dec)*dt).to(u.deg)
-            newdec = (self.dec + self.pm_dec*dt).to(u.deg)
+            newra, newdec = propagate_linearly(self.ra, self.dec,
+                                               getattr(self, 'pm_ra_cosdec', None), getattr(self, 'pm_dec', None), dt)
         except TypeError:
             # assume no proper motions, if they're not defined
             newra = self.ra
@@ -312,12 +655,145 @@ class Constellation(Field):
 
         projected.standardized['ra'] = newra
         projected.standardized['dec'] = newdec
-        projected.standardized['obstime'] = newobstime
+        projected.standardized['obstime'] = newobstime*np.ones(len(self.standardized))
+
+        # the uncertainties of the positions grow with time too
+        if self.has_uncertainties:
+            sigma_ra, sigma_dec = self.uncertainties_at(epoch)
+            projected.standardized['ra-error'] = sigma_ra
+            projected.standardized['dec-error'] = sigma_dec
         projected.propagate()
 
         return projected
 
-    def plot(self, ax=None, sizescale=10, color=None, alpha=0.5, label=None, edgecolor='none', **kw):
+    def error(self, key, unit):
+        '''
+        The uncertainty of one coordinate, as an array in some
+        unit (or zeros, if these stars don't have that uncertainty).
+
+        Parameters
+        ----------
+        key : str
+            The coordinate (like 'ra', 'dec', or 'pm_dec').
+        unit : astropy.units.core.Unit
+            The unit in which the uncertainties should be returned.
+        '''
+        try:
+            return u.Quantity(self.standardized[key + '-error']).to_value(unit)
+        except KeyError:
+            return np.zeros(len(self.standardized))
+
+    @property
+    def has_uncertainties(self):
+        '''
+        Do these stars have uncertainties on their positions or motions?
+        '''
+        return any(k + '-error' in self.standardized.colnames
+                   for k in ['ra', 'dec', 'pm_ra_cosdec', 'pm_dec'])
+
+    def uncertainties_at(self, epoch=2000):
+        '''
+        The uncertainties of the positions of these stars at an
+        epoch, combining the uncertainty of each position (at its
+        own epoch) with that of its proper motion, over the time
+        in between:
+
+            sigma**2 = sigma_position**2 + (sigma_pm*dt)**2
+
+        (This treats the uncertainties on the position and on the
+        proper motion as uncorrelated, as they nearly are at Gaia's
+        reference epoch, so the error ellipses line up with RA and Dec.)
+
+        Parameters
+        ----------
+        epoch : Time, or float, or array
+            Either an astropy time, or a decimal year of the desired
+            epoch (or an array, with one epoch for each star).
+
+        Returns
+        -------
+        sigma_ra_cosdec, sigma_dec : astropy.units.quantity.Quantity
+            The uncertainties of RA*cos(Dec) and Dec, for each star.
+        '''
+        dt = value_in(as_obstime(epoch) - self.obstime, u.year)
+        sigma = []
+        for position, motion in [('ra', 'pm_ra_cosdec'), ('dec', 'pm_dec')]:
+            # (stars with unknown proper motions have unknown uncertainties, except at their own epochs)
+            moved = np.where(dt == 0, 0.0, self.error(motion, u.mas/u.year)*dt)
+            sigma.append(np.hypot(self.error(position, u.mas), moved)*u.mas)
+        return tuple(sigma)
+
+    def sample_at(self, epoch=2000, samples=100, seed=None):
+        '''
+        Draw Monte Carlo samples of the positions of these stars
+        at an epoch, from (uncorrelated) Gaussian uncertainties on
+        their positions and proper motions. The stars are sampled
+        in batches (spread over kernels.workers threads), so
+        even very many stars and samples don't need much memory
+        beyond the outputs.
+
+        Parameters
+        ----------
+        epoch : Time, or float, or array
+            Either an astropy time, or a decimal year of the desired
+            epoch (or an array, with one epoch for each star).
+        samples : int
+            How many samples for each star?
+        seed : int
+            The seed for the random numbers. (With the same
+            seed, the samples are the same, however many
+            threads are used.)
+
+        Returns
+        -------
+        ra, dec : astropy.units.quantity.Quantity
+            The sampled positions, with shape (stars, samples).
+        '''
+        N = len(self.standardized)
+        ra, dec = value_in(self.ra, u.deg), value_in(self.dec, u.deg)
+        try:
+            pmra, pmdec = value_in(self.pm_ra_cosdec, u.mas/u.year), value_in(self.pm_dec, u.mas/u.year)
+        except (AttributeError, TypeError):
+            pmra, pmdec = np.zeros(N), np.zeros(N)
+        dt = np.broadcast_to(value_in(as_obstime(epoch) - self.obstime, u.year), (N,))
+        sigma = {k:self.error(k, u.mas) for k in ['ra', 'dec']}
+        sigma.update({k:self.error(k, u.mas/u.year) for k in ['pm_ra_cosdec', 'pm_dec']})
+
+        # (each batch has about kernels.chunk_size samples, with its own random numbers)
+        size = max(kernels.chunk_size//samples, 1)
+        streams = np.random.SeedSequence(seed).spawn(int(np.ceil(N/size)))
+        sampled_ra, sampled_dec = np.empty((N, samples)), np.empty((N, samples))
+
+        def work(s):
+            random = np.random.default_rng(streams[s.start//size])
+            shape = (s.stop - s.start, samples)
+            def draw(values, key, scale=1.0):
+                return values[s, np.newaxis] + random.standard_normal(shape)*sigma[key][s, np.newaxis]*scale
+            cosdec = np.cos(np.radians(dec[s, np.newaxis]))
+            sampled_ra[s], sampled_dec[s] = kernels.propagate(draw(ra, 'ra', kernels.mas/cosdec),
+                                                              draw(dec, 'dec', kernels.mas),
+                                                              draw(pmra, 'pm_ra_cosdec'),
+                                                              draw(pmdec, 'pm_dec'),
+                                                              dt[s, np.newaxis], n=1)
+
+        with timer('Constellation.sample_at') as counts:
+            kernels.map_chunks(work, N, size=size)
+            counts['samples'] += N*samples
+        return sampled_ra*u.deg, sampled_dec*u.deg
+
+    def marker_sizes(self, sizescale=10):
+        '''
+        The marker sizes with which to plot the stars
+        (bigger for brighter stars).
+
+        Parameters
+        ----------
+        sizescale : (optional) float
+            The marker size for a star at the magnitudelimit.
+        '''
+        return np.maximum(sizescale*(1 + self.magnitudelimit - self.magnitude), 1)
+
+    def plot(self, ax=None, sizescale=10, color=None, alpha=0.5, label=None, edgecolor='none', xy=None, ellipses=None, **kw):
         '''
         Plot the ra and dec of the coordinates,
         at a given epoch, scaled by their magnitude.
@@ -330,6 +806,14 @@ class Constellation(Field):
             The marker size for scatter for a star at the magnitudelimit.
         color : (optional) any valid color
             The color to plot (but there is a default for this catalog.)
+        xy : (optional) tuple
+            The (x, y) positions at which to plot the stars
+            (for example, in local coordinates). If None,
+            their RA and Dec are used.
+        ellipses : (optional) float
+            If given, also draw the error ellipses of the
+            stars' positions (see `plot_ellipses`), with
+            this many sigma as their semi-axes.
         **kw : dict
             Additional keywords will be passed on to plt.scatter.
 
@@ -339,22 +823,63 @@ class Constellation(Field):
         plotted : outputs from the plots
         '''
         # calculate the sizes of the stars (logarithmic with brightness?)
-        size = np.maximum(sizescale*(1 + self.magnitudelimit - self.magnitude), 1)
+        size = self.marker_sizes(sizescale)
 
         if ax is None:
             ax = plt.gca()
 
         # make a scatter plot of the RA + Dec
-        scatter = ax.scatter(self.ra, self.dec,
+        x, y = (self.ra, self.dec) if xy is None else xy
+        scatter = ax.scatter(x, y,
                               s=size,
                               color=color or self.color,
-                              label=label or '{} ({:.1f})'.format(self.name, self.epoch),
+                              label=label or '{} ({})'.format(self.name, self.epoch_label),
                               alpha=alpha,
                               edgecolor=edgecolor,
                               **kw)
 
+        if ellipses is not None:
+            self.plot_ellipses(ax=ax, nsigma=ellipses, xy=xy, edgecolor=color or self.color, alpha=alpha)
+
         return scatter
 
+    def plot_ellipses(self, ax=None, nsigma=1, xy=None, **kw):
+        '''
+        Plot the error ellipses of the positions of these stars
+        (from their 'ra-error' and 'dec-error', which `at_epoch`
+        calculates for its epoch), as one EllipseCollection.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+            The axes into which they should be plotted.
+        nsigma : float
+            The semi-axes are this many sigma.
+        xy : (optional) tuple
+            The (x, y) positions of the stars in local
+            tangent-plane coordinates. If None, the
+            ellipses are plotted in RA and Dec.
+        **kw : dict
+            Additional keywords will be passed on to
+            overlays.ellipses (and EllipseCollection).
+
+        Returns
+        -------
+        collection : matplotlib.collections.EllipseCollection
+            The ellipses.
+        '''
+        from ..overlays import ellipses
+
+        if ax is None:
+            ax = plt.gca()
+        widths = 2*nsigma*self.error('ra', u.mas)*u.mas
+        heights = 2*nsigma*self.error('dec', u.mas)*u.mas
+        if xy is None:
+            # (in RA, the ellipses are wider away from the equator)
+            xy = (self.ra, self.dec)
+            widths = widths/np.cos(self.dec)
+        return ellipses(ax, *xy, widths, heights, **kw)
+
     def finder(self, figsize=(7,7), **kwargs):
         '''
         Plot a finder chart. This *does* create a new figure.
@@ -430,7 +955,7 @@ class Constellation(Field):
         if epoch is None:
             epoch = self.epoch
 
-        return self.at_epoch(epoch).separation(center)
+        return self.at_epoch(epoch).separation(parse_center(center))
 
     def crossMatchTo(self, reference, radius=1*u.arcsec, visualize=False):
         '''
@@ -463,7 +988,34 @@ class Constellation(Field):
         '''
 
         # find the closest match for each of star in this constellation
-        i_ref, d2d_ref, d3d_ref = self.coordinates.match_to_catalog_sky(reference.at_epoch(self.coordinates.obstime))
+        # (with the reference moved to the typical epoch of this catalog)
+        epoch = np.median(self.epoch)
+        moved = reference.at_epoch(epoch)
+        ra, dec = value_in(self.ra, u.deg), value_in(self.dec, u.deg)
+        i_ref, d2d_ref = kernels.nearest(ra, dec, value_in(moved.ra, u.deg), value_in(moved.dec, u.deg))
+
+        # if these stars each have their own epoch, compare them to the reference at exactly that epoch
+        if not np.isscalar(self.epoch):
+            # (any reference star that could be within the radius of a star at its
+            #  epoch is within this reach of it at the typical epoch)
+            pm_ra_cosdec, pm_dec = reference.proper_motions()
+            speed = np.max(np.hypot(pm_ra_cosdec, pm_dec), initial=0)*kernels.mas
+            obstime = value_in(self.obstime, u.year)
+            reach = radius.to_value(u.deg) + speed*np.abs(obstime - epoch)
+            i, j = kernels.pairs(ra, dec, value_in(moved.ra, u.deg), value_in(moved.dec, u.deg), reach)
+
+            # measure each candidate pair at the star's own epoch, and keep the closest
+            there = kernels.propagate(value_in(reference.ra, u.deg)[j], value_in(reference.dec, u.deg)[j],
+                                      pm_ra_cosdec[j], pm_dec[j],
+                                      obstime[i] - value_in(reference.obstime, u.year)[j])
+            chord = np.sqrt(np.sum((kernels.unit_vectors(*there) - kernels.unit_vectors(ra[i], dec[i]))**2, axis=0))
+            separation = kernels.chord_to_angle(chord)
+            order = np.lexsort((separation, i))
+            closest = order[np.unique(i[order], return_index=True)[1]]
+            i_ref[i[closest]] = j[closest]
+            d2d_ref[i[closest]] = separation[closest]
+
+        d2d_ref = coord.Angle(d2d_ref*u.deg)
 
         # extract only those within the specified radius
         ok = d2d_ref < radius
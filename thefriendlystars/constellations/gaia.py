@@ -1,22 +1,28 @@
 from .constellation import *
+from .. import archives
+from .adapters import Adapter
+from ..instrumentation import timer, timed
 
-def query(query):
+def query(query, upload=None):
     '''
     Send an ADQL query to the Gaia archive,
     wait for a response,
     and hang on to the results.
-    '''
 
-    import astroquery.gaia
+    (If a table is uploaded along with the query,
+    the query can use it as `tap_upload.targets`.)
+    '''
 
     # send the query to the Gaia archive
-    with warnings.catch_warnings() :
-        warnings.filterwarnings("ignore")
-
-        _gaia_job = astroquery.gaia.Gaia.launch_job(query)
+    with timer('gaia.query') as counts:
 
         # return the table of results
-        return _gaia_job.get_results()
+        if upload is None:
+            results = archives.backend.query_gaia(query)
+        else:
+            results = archives.backend.query_gaia(query, upload=upload)
+        counts['rows'] += len(results)
+        return results
 
 
 
@@ -27,15 +33,39 @@ class Gaia(Constellation):
     '''
 
     name = 'Gaia'
+    archive = 'gaia'
     color = 'black'
     defaultfilter = 'G' # this is the default filter to display
     filters = ['G', 'RP', 'BP']
-    basequery = 'SELECT source_id,ra,ra_error,dec,dec_error,pmra,pmra_error,pmdec,pmdec_error,parallax,parallax_error,phot_g_mean_mag,phot_bp_mean_mag,phot_rp_mean_mag,radial_velocity,radial_velocity_error,phot_variable_flag,teff_val,a_g_val FROM gaiadr2.gaia_source'
+    columns = ['source_id', 'ra', 'ra_error', 'dec', 'dec_error', 'pmra', 'pmra_error', 'pmdec', 'pmdec_error',
+               'parallax', 'parallax_error', 'phot_g_mean_mag', 'phot_bp_mean_mag', 'phot_rp_mean_mag',
+               'radial_velocity', 'radial_velocity_error', 'phot_variable_flag', 'teff_val', 'a_g_val']
+    basequery = 'SELECT {} FROM gaiadr2.gaia_source'.format(','.join(columns))
     magnitudelimit = 20.0
     identifier_keys = ['GaiaDR2']
-    error_keys = ['distance', 'pm_ra_cosdec', 'pm_dec', 'radial_velocity']
+    error_keys = ['ra', 'dec', 'distance', 'pm_ra_cosdec', 'pm_dec', 'radial_velocity']
     epoch = 2015.5
 
+    # how many targets can be uploaded in one batch query?
+    batch_size = 1000
+
+    # how the columns of Gaia DR2 map onto a standardized table
+    adapter = Adapter(identifiers={'GaiaDR2':'source_id'},
+                      ra=('ra', 'deg'), dec=('dec', 'deg'),
+                      pm_ra_cosdec=('pmra', 'mas/yr'), pm_dec=('pmdec', 'mas/yr'),
+                      radial_velocity=('radial_velocity', 'km/s'),
+                      parallax=('parallax', 'mas'),
+                      epoch=epoch,
+                      filters={k:'phot_{}_mean_mag'.format(k.lower()) for k in filters},
+                      errors=dict(ra=('ra_error', 'mas'),
+                                  dec=('dec_error', 'mas'),
+                                  distance=('parallax_error', 'mas'),
+                                  pm_ra_cosdec=('pmra_error', 'mas/yr'),
+                                  pm_dec=('pmdec_error', 'mas/yr'),
+                                  radial_velocity=('radial_velocity_error', 'km/s')),
+                      minimum_snr=1,
+                      farthest=10000*u.pc)
+
     def __init__(self,
                  center,
                  radius=3*u.arcmin,
@@ -142,61 +172,66 @@ class Gaia(Constellation):
         self._downloaded.meta['distancelimit'] = distancelimit
 
     @classmethod
-    def standardize_table(cls, table):
+    def batch(cls, centers, radius=3*u.arcmin):
         '''
-        Extract objects from a Gaia DR2 table.
+        Create cones around many centers, by uploading the
+        list of centers to the Gaia archive and crossmatching
+        it with Gaia DR2 in one job (or one per .batch_size
+        centers). The results are split up and cached as the
+        individual cones, as if each had been downloaded alone.
 
         Parameters
         ----------
-        table : astropy.table.Table
-            The data downloaded from a Gaai DR2 query.
+        centers : list
+            The centers (names or SkyCoords) of the cones.
+        radius : astropy.units.quantity.Quantity
+            The radius of each cone.
+
+        Returns
+        -------
+        constellations : list
+            One constellation for each center.
         '''
 
+        todo = cls.needing_download(centers, radius)
 
-        # tidy up quantities, setting motions to 0 if poorly defined
-        for key in ['pmra', 'pmdec', 'parallax', 'radial_velocity']:
-            bad = table[key].mask
-            table[key][bad] = 0.0
-
-        bad = table['parallax']/table['parallax_error'] < 1
-        bad += table['parallax'].mask
-        table['parallax'][bad] = np.nan
-        distance = 1000*u.pc/table['parallax'].data
-
-        distance[bad] = 10000*u.pc#np.nanmax(distance)
-        identifiers  = {'GaiaDR2-id':table['source_id']}
-
-        # create skycoord objects
-        coordinates = dict(  ra=table['ra'].data*u.deg,
-                             dec=table['dec'].data*u.deg,
-                             pm_ra_cosdec=table['pmra'].data*u.mas/u.year,
-                             pm_dec=table['pmdec'].data*u.mas/u.year,
-                             radial_velocity=table['radial_velocity'].data*u.km/u.s,
-                             distance=distance, # weirdly, messed with RA + Dec signs if parallax is zero
-                             obstime=cls.epoch*np.ones(len(table))*u.year)#Time(, format='decimalyear'))
-
-        magnitudes = {k+'-mag':table['phot_{}_mean_mag'.format(k.lower())].data for k in cls.filters}
+        # define a query joining Gaia DR2 to the uploaded targets
+        batchquery = """SELECT targets.target_id,{} FROM gaiadr2.gaia_source AS gaia JOIN tap_upload.targets AS targets ON 1=CONTAINS(POINT('ICRS',gaia.ra,gaia.dec),CIRCLE('ICRS',targets.ra,targets.dec,{})) WHERE gaia.phot_g_mean_mag < {}""".format(','.join('gaia.' + c for c in cls.columns), radius.to(u.deg).value, cls.magnitudelimit)
 
+        with timer(f'{cls.__name__}.batch') as counts:
+            for start in range(0, len(todo), cls.batch_size):
+                chunk = todo[start:start + cls.batch_size]
+                coordinates = SkyCoord([parse_center(c) for c in chunk]).icrs
+                targets = Table(dict(target_id=np.arange(len(chunk)),
+                                     ra=coordinates.ra.deg,
+                                     dec=coordinates.dec.deg))
 
-        errors = dict(distance= distance*(table['parallax_error'].data/table['parallax'].data),
-                      pm_ra_cosdec=table['pmra_error'].data*u.mas/u.year,
-                      pm_dec=table['pmdec_error'].data*u.mas/u.year,
-                      radial_velocity=table['radial_velocity_error'].data*u.km/u.s)
+                # run one query for the whole chunk, and split it up by target
+                print(f'querying Gaia DR2 for {len(chunk)} cones at once, each with radius {radius}')
+                table = query(batchquery, upload=targets)
+                standardized = cls.standardize_table(table)
+                counts['queries'] += 1
 
-        error_table = Table(data=[errors[k] for k in cls.error_keys],
-                            names=[k+'-error' for k in cls.error_keys])
+                target = np.asarray(table['target_id'])
+                order = np.argsort(target, kind='stable')
+                edges = np.searchsorted(target[order], np.arange(len(chunk) + 1))
+                cls._split_batch(chunk, radius,
+                                 [standardized[order[edges[j]:edges[j + 1]]] for j in range(len(chunk))],
+                                 query=batchquery)
+                counts['cones'] += len(chunk)
 
+        # load (or, for the stragglers, download) each cone
+        return [cls(c, radius=radius) for c in centers]
 
-        #for key in ['pmra', 'pmdec', 'parallax', 'radial_velocity']:
-        #        bad = table[key].mask
-        #        table[key][bad] = 0.0
-
-
-        standardized = hstack([Table(identifiers),
-                               Table(coordinates),
-                               Table(magnitudes),
-                               error_table])
-
-        standardized.meta['catalog'] = 'Gaia'
+    @classmethod
+    @timed('Gaia.standardize_table', rows=len)
+    def standardize_table(cls, table):
+        '''
+        Extract objects from a Gaia DR2 table.
 
-        return standardized
+        Parameters
+        ----------
+        table : astropy.table.Table
+            The data downloaded from a Gaia DR2 query.
+        '''
+        return cls.adapter.standardize(table, catalog='Gaia')
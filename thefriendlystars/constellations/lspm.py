@@ -1,5 +1,8 @@
 from .constellation import *
-from astroquery.vizier import Vizier
+from .. import archives
+from . import stream
+from .adapters import Adapter
+from ..instrumentation import timed
 
 
 class LSPM(Constellation):
@@ -9,6 +12,7 @@ class LSPM(Constellation):
     '''
 
     name = 'LSPM'
+    archive = 'vizier'
     color = 'black'
     defaultfilter = 'Ve' # this is the default filter to display
     epoch = 2000.0 # the default epoch
@@ -18,6 +22,13 @@ class LSPM(Constellation):
     catalog = 'I/298/lspm_n'
     magnitudelimit = 18
 
+    # how the columns of LSPM-North map onto a standardized table
+    adapter = Adapter(identifiers={k:k for k in identifier_keys},
+                      ra=('_RAJ2000', 'deg'), dec=('_DEJ2000', 'deg'),
+                      pm_ra_cosdec=('pmRA', 'arcsec/yr'), pm_dec=('pmDE', 'arcsec/yr'),
+                      epoch=epoch,
+                      filters={f:f+'mag' for f in filters})
+
     @classmethod
     def from_cone(cls, center,
                   radius=3*u.arcmin,
@@ -47,16 +58,14 @@ class LSPM(Constellation):
         if magnitudelimit is not None:
             criteria[cls.defaultfilter + 'mag'] = '<{}'.format(magnitudelimit)
 
-        v = Vizier(columns=cls.columns,
-                   column_filters=criteria)
-        v.ROW_LIMIT = -1
-
         # run the query
         print('querying Vizier for {}, centered on {} with radius {}, for G<{}'.format(cls.name, center, radius, magnitudelimit))
 
-        table = v.query_region(coordinates=center,
-                               radius=radius,
-                               catalog=cls.catalog)[0]
+        table = archives.backend.query_vizier(cls.catalog,
+                                              columns=cls.columns,
+                                              column_filters=criteria,
+                                              coordinates=center,
+                                              radius=radius)
 
         # store the search parameters in this object
         c = cls(cls.standardize_table(table))
@@ -87,14 +96,12 @@ class LSPM(Constellation):
         if magnitudelimit is not None:
             criteria[cls.defaultfilter + 'mag'] = '<{}'.format(magnitudelimit)
 
-        v = Vizier(columns=cls.columns,
-                   column_filters=criteria)
-        v.ROW_LIMIT = -1
-
         # run the query
         print('querying Vizier for {}, for {}<{}'.format(cls.name, cls.defaultfilter, magnitudelimit))
 
-        table = v.query_constraints(catalog=cls.catalog, **criteria)[0]
+        table = archives.backend.query_vizier(cls.catalog,
+                                              columns=cls.columns,
+                                              column_filters=criteria)
 
         # store the search parameters in this object
         c = cls(cls.standardize_table(table))
@@ -105,30 +112,44 @@ class LSPM(Constellation):
         return c
 
     @classmethod
-    def standardize_table(cls, table):
+    def ingest(cls, **kw):
+        '''
+        Download the whole catalog, slice by slice, into a local
+        store that can be opened with `from_store`. (All keyword
+        arguments are passed to `stream.ingest`.)
         '''
-        Extract objects from a Gaia DR2 table.
+        return stream.ingest(cls, **kw)
+
+    @classmethod
+    def from_store(cls, directory=None, magnitudelimit=None):
+        '''
+        Create a Constellation from a catalog that has
+        already been ingested into a local store.
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the store (defaulting to
+            the one `ingest` would make).
+        magnitudelimit : float
+            Maximum magnitude (for Ve = "estimated V").
+            (Without one, the columns stay memory-mapped;
+            with one, only the stars brighter are copied.)
         '''
 
-        print(cls)
-        identifiers = {n+'-id':table[n] for n in cls.identifier_keys}
-
-        # create skycoord objects
-        N = len(table)
-        coordinates = dict(  ra=table['_RAJ2000'].data.data*u.deg,
-                             dec=table['_DEJ2000'].data.data*u.deg,
-                             pm_ra_cosdec=table['pmRA'].data.data*u.arcsec/u.year,
-                             pm_dec=table['pmDE'].data.data*u.arcsec/u.year,
-                             radial_velocity=np.nan*np.ones(N)*u.km/u.s,
-                             distance=np.nan*np.ones(N)*u.pc,#distance=1000*u.pc/table['parallax'].data, # weirdly, messed with RA + Dec signs if parallax is zero
-                             obstime=cls.epoch*np.ones(N)*u.year)#Time(, format='decimalyear'))
-        for k in coordinates:
-            print(k, coordinates[k])
-        magnitudes = {f+'-mag':table[f+'mag'].data for f in cls.filters}
-
-        standardized = hstack([Table(identifiers),
-                               Table(coordinates),
-                               Table(magnitudes)])
-        standardized.meta['catalog'] = 'Gaia'
-
-        return standardized
+        store = stream.Store(directory or stream.default_directory(cls))
+        table = store.open()
+        if magnitudelimit is not None:
+            table = table[table[cls.defaultfilter + '-mag'] < magnitudelimit]
+
+        c = cls(table, copy=False)
+        c.standardized.meta['magnitudelimit'] = magnitudelimit or c.magnitudelimit
+        return c
+
+    @classmethod
+    @timed('LSPM.standardize_table', rows=len)
+    def standardize_table(cls, table):
+        '''
+        Extract objects from an LSPM-North table.
+        '''
+        return cls.adapter.standardize(table, catalog=cls.name)
@@ -1,104 +1,74 @@
-from .constellation import *
-from .gaia import *
-import astroquery.mast
+from .astroqueryconstellations import *
+from .gaia import query
+from .adapters import Adapter
+
+class GALEX(astroqueryConstellation):
+    '''
+    GALEX contains ultraviolet sources from the
+    GALEX catalog at MAST (with no proper motions).
+    '''
 
-class GALEX(Constellation):
     name = 'GALEX'
+    archive = 'mast'
+    catalog = 'Galex'
     color = 'orchid'
+    defaultfilter = 'NUV'
+    magnitudelimit = 25
 
-    def coneSearch(self, center, radius=3*u.arcmin, magnitudelimit=25):
-        '''
-        Run a cone search of the GALEX archive
-        '''
-
-
-        self.magnitudelimit = magnitudelimit
-
-        # run the query
-        self.speak('querying GALEX, centered on {} with radius {}'.format(center, radius, magnitudelimit))
-
-        coordinatetosearch = '{0.ra.deg} {0.dec.deg}'.format(center)
-        table = astroquery.mast.Catalogs.query_region(coordinates=center, radius=radius, catalog='GALEX')
-
-
-
-        # the gaia DR2 epoch is 2015.5
-        epoch = 2005#???
+    adapter = Adapter(identifiers={'GALEX':'objID'},
+                      ra=('ra', 'deg'), dec=('dec', 'deg'),
+                      epoch=2005.0,
+                      filters=dict(NUV='nuv_mag', FUV='fuv_mag'))
 
-        # create skycoord objects
-        self.coordinates = SkyCoord(  ra=table['ra'].data*u.deg,
-                                        dec=table['dec'].data*u.deg,
-                                        obstime=Time(epoch, format='decimalyear'))
+class TIC(astroqueryConstellation):
+    '''
+    TIC contains sources from the TESS Input Catalog at MAST,
+    including proper motions and parallaxes (at epoch 2000).
+    '''
 
-        self.magnitudes = dict(NUV=table['nuv_mag'].data, FUV=table['fuv_mag'].data)
-        self.magnitude = self.magnitudes['NUV']
-
-class TIC(Constellation):
     name = 'TIC'
+    archive = 'mast'
+    catalog = 'TIC'
     color = 'green'
-
-    def coneSearch(self, center, radius=3*u.arcmin, magnitudelimit=25):
-        '''
-        Run a cone search of the TIC archive
-        '''
-
-
-        self.magnitudelimit = magnitudelimit
-
-        # run the query
-        self.speak('querying TIC, centered on {} with radius {}'.format(center, radius, magnitudelimit))
-
-        coordinatetosearch = '{0.ra.deg} {0.dec.deg}'.format(center)
-        table = Catalogs.query_region(coordinates=center, radius=radius, catalog='TIC')
-
-
-
-        # the gaia DR2 epoch is 2015.5
-        epoch = 2000#???
-
-        # create skycoord objects
-        self.coordinates = SkyCoord(  ra=table['ra'].data*u.deg,
-                                        dec=table['dec'].data*u.deg,
-                                        obstime=Time(epoch, format='decimalyear'))
-
-        self.magnitudes = dict(T=table['Tmag'].data)
-        self.magnitude = self.magnitudes['T']
-
-
-
-
-
-class TwoMass(Gaia):
-    '''A catalog for 2MASS, using the Gaia-archive hosted search.'''
+    defaultfilter = 'T'
+    magnitudelimit = 20
+
+    # the 'ra' and 'dec' columns were propagated to J2000 (https://outerspace.stsci.edu/display/TESS/TIC+v8+and+CTL+v8.xx+Data+Release+Notes)
+    adapter = Adapter(identifiers={'TIC':'ID'},
+                      ra=('ra', 'deg'), dec=('dec', 'deg'),
+                      pm_ra_cosdec=('pmRA', 'mas/yr'), pm_dec=('pmDEC', 'mas/yr'),
+                      parallax=('plx', 'mas'),
+                      epoch=2000.0,
+                      filters=dict(T='Tmag', G='GAIAmag', V='Vmag', J='Jmag', H='Hmag', K='Kmag'),
+                      errors=dict(distance=('e_plx', 'mas'),
+                                  pm_ra_cosdec=('e_pmRA', 'mas/yr'),
+                                  pm_dec=('e_pmDEC', 'mas/yr')),
+                      minimum_snr=1)
+
+class TwoMass(astroqueryConstellation):
+    '''
+    TwoMass contains 2MASS point sources, using the
+    Gaia-archive hosted copy of the catalog, each
+    with the epoch at which it was observed.
+    '''
 
     name = '2MASS - J'
+    archive = 'gaia'
+    catalog = 'gaiadr1.tmass_original_valid'
     color = 'orange'
     zorder = -1
-    def coneSearch(self, center, radius=3*u.arcmin, magnitudelimit=20):
-        '''
-        Run a cone search of the Gaia DR2.
-        '''
+    defaultfilter = 'J'
+    magnitudelimit = 20
 
+    adapter = Adapter(identifiers={'2MASS':'designation'},
+                      ra=('ra', 'deg'), dec=('dec', 'deg'),
+                      epoch=('j_date', 'jd'),
+                      filters=dict(J='j_m', H='h_m', Ks='ks_m'))
 
-        self.magnitudelimit = magnitudelimit
-
-        # define a query for cone search surrounding this center
-        conequery = """SELECT designation, ra, dec, j_m, h_m, ks_m, j_date FROM gaiadr1.tmass_original_valid WHERE CONTAINS(POINT('ICRS',ra,dec),CIRCLE('ICRS',{},{},{}))=1 and j_m < {}""".format(center.ra.deg, center.dec.deg, radius.to(u.deg).value, magnitudelimit)
-
-
-        # run the query
-        self.speak('querying 2MASS, centered on {} with radius {}, for J<{}'.format(center, radius, magnitudelimit))
-        table = self.query(conequery)
-
-
-
-
-        # create skycoord objects
-        self.coordinates = SkyCoord(ra=table['ra'].data*u.deg,
-                                        dec=table['dec'].data*u.deg,
-                                        obstime=Time(table['j_date'].data, format='jd'))
-
-        self.magnitudes = dict(         J=table['j_m'].data,
-                                        H=table['h_m'].data,
-                                        Ks=table['ks_m'].data)
-        self.magnitude = self.magnitudes['J']
+    @classmethod
+    def query(cls, center, radius):
+        '''
+        Download the raw table for a cone from the Gaia archive.
+        '''
+        conequery = """SELECT {} FROM {} WHERE CONTAINS(POINT('ICRS',ra,dec),CIRCLE('ICRS',{},{},{}))=1 and j_m < {}""".format(','.join(cls.adapter.columns), cls.catalog, center.ra.deg, center.dec.deg, radius.to(u.deg).value, cls.magnitudelimit)
+        return query(conequery)
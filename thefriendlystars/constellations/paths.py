@@ -0,0 +1,159 @@
+'''
+An index of the paths that stars sweep across the sky.
+
+Finding the stars within some radius of a position at some epoch
+usually means propagating the whole catalog to that epoch and then
+measuring every separation. Instead, a PathIndex describes each
+star's path (over a range of epochs) by its middle and its reach
+(how far it strays from the middle), and sorts the stars into tiers
+of similar reach, each with its own spatial index of the middles.
+A cone search then only needs to look in each tier within its
+reach of the cone, and to propagate just those candidates:
+
+    paths = PathIndex(ra, dec, pm_ra_cosdec, pm_dec, obstime, epochs=(1900, 2100))
+    nearby = paths.cone(center, 5*u.arcmin, epoch=1953.2)
+
+Slow stars (most of them) land in tiers with tiny reaches, so
+one very fast star doesn't widen the search for all the others.
+'''
+
+from ..imports import *
+from .constellation import unit_vectors
+from .. import kernels
+from scipy.spatial import cKDTree
+
+def chord(angle):
+    '''
+    The straight-line distance between two unit vectors
+    separated by an angle (given in degrees).
+    '''
+    return 2*np.sin(np.radians(np.minimum(angle, 180.0))/2)
+
+class PathIndex:
+    '''
+    A PathIndex finds which stars can be within
+    a cone at any epoch (within a range of epochs).
+    '''
+
+    # the reach of the slowest tier (in degrees), and the ratio between tiers
+    smallest = 1.0/3600
+    ratio = 4.0
+
+    # how many points along each path are used to measure its reach
+    samples = 9
+
+    def __init__(self, ra, dec, pm_ra_cosdec, pm_dec, obstime, epochs=(1900.0, 2100.0), tiers=8):
+        '''
+        Parameters
+        ----------
+        ra, dec : astropy.units.quantity.Quantity
+            The positions of the stars.
+        pm_ra_cosdec, pm_dec : astropy.units.quantity.Quantity
+            Their proper motions (or None, if they don't move).
+        obstime : astropy.units.quantity.Quantity
+            The epoch (or epochs, one per star) of the positions.
+        epochs : tuple
+            The (earliest, latest) epochs, as decimal years,
+            at which stars will be searched for.
+        tiers : int
+            Into how many tiers (of similar reach) should
+            the stars be sorted?
+        '''
+
+        N = len(ra)
+        self.epochs = (float(np.min(epochs)), float(np.max(epochs)))
+        self.ra = u.Quantity(ra).to_value(u.deg)
+        self.dec = u.Quantity(dec).to_value(u.deg)
+        if (pm_ra_cosdec is None) or (pm_dec is None):
+            self.pm_ra_cosdec, self.pm_dec = np.zeros(N), np.zeros(N)
+        else:
+            self.pm_ra_cosdec = np.nan_to_num(u.Quantity(pm_ra_cosdec).to_value(u.mas/u.year))
+            self.pm_dec = np.nan_to_num(u.Quantity(pm_dec).to_value(u.mas/u.year))
+        self.obstime = np.broadcast_to(u.Quantity(obstime, u.year).value, (N,))
+
+        # the middle of each path, and how far it strays from there
+        self.middle = self.unit_vectors_at(np.mean(self.epochs))
+        reach = np.zeros(N)
+        for epoch in np.linspace(*self.epochs, self.samples):
+            distance = np.sqrt(np.sum((self.unit_vectors_at(epoch) - self.middle)**2, axis=0))
+            reach = np.maximum(reach, distance)
+        # (converted from chords to degrees, with a little room for curved paths)
+        self.reach = kernels.chord_to_angle(reach)*1.05 + 1e-9
+
+        # sort the stars into tiers by their reach
+        tier = np.floor(np.log(np.maximum(self.reach, self.smallest)/self.smallest)/np.log(self.ratio))
+        tier = np.minimum(tier.astype(int), tiers - 1)
+        self.tiers = []
+        for t in np.unique(tier):
+            members = np.nonzero(tier == t)[0]
+            self.tiers.append((members,
+                               np.max(self.reach[members]),
+                               cKDTree(np.transpose(self.middle[:, members]))))
+
+    def __len__(self):
+        return len(self.ra)
+
+    def unit_vectors_at(self, epoch, which=slice(None)):
+        '''
+        The unit vectors of (some of) the stars, at an epoch.
+        '''
+        ra, dec = kernels.propagate(self.ra[which], self.dec[which],
+                                    self.pm_ra_cosdec[which], self.pm_dec[which],
+                                    epoch - self.obstime[which])
+        return kernels.unit_vectors(ra, dec)
+
+    def covers(self, epochs):
+        '''
+        Are these epochs (decimal years) all within this index's range?
+        '''
+        epochs = np.asarray(epochs, dtype=float)
+        return bool(np.all((epochs >= self.epochs[0]) & (epochs <= self.epochs[1])))
+
+    def candidates(self, center, radius):
+        '''
+        The stars that might be within a radius of a center,
+        at any epoch within the range of this index.
+
+        Parameters
+        ----------
+        center : SkyCoord
+            The center of the cone.
+        radius : astropy.units.quantity.Quantity
+            The radius of the cone.
+
+        Returns
+        -------
+        indices : array
+            The (sorted) indices of the candidate stars.
+        '''
+        pointing = unit_vectors(center.icrs.ra, center.icrs.dec)
+        r = radius.to_value(u.deg)
+        found = [members[np.array(tree.query_ball_point(pointing, chord(r + reach)*(1 + 1e-9)), dtype=int)]
+                 for members, reach, tree in self.tiers]
+        return np.sort(np.concatenate(found + [np.zeros(0, int)]))
+
+    def cone(self, center, radius, epoch):
+        '''
+        The stars that are within a radius of a center, at an epoch.
+
+        Parameters
+        ----------
+        center : SkyCoord
+            The center of the cone.
+        radius : astropy.units.quantity.Quantity
+            The radius of the cone.
+        epoch : float
+            The epoch, as a decimal year (within the range of this index).
+
+        Returns
+        -------
+        indices : array
+            The (sorted) indices of the stars in the cone.
+        '''
+        if not self.covers(epoch):
+            raise ValueError(f'{epoch} is outside the range of epochs ({self.epochs}) of this index.')
+        candidates = self.candidates(center, radius)
+        pointing = unit_vectors(center.icrs.ra, center.icrs.dec)
+        there = self.unit_vectors_at(epoch, candidates)
+        distance = np.sqrt(np.sum((there - pointing[:, np.newaxis])**2, axis=0))
+        return candidates[distance <= chord(radius.to_value(u.deg))]
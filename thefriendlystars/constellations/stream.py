@@ -0,0 +1,337 @@
+'''
+Stream whole Vizier catalogs into a local columnar store.
+
+Pulling an entire catalog (like LSPM-North) in one Vizier query
+means one enormous response, parsed and standardized all at once
+in memory. Instead, `ingest` splits the sky into slices (in
+declination or in RA), queries them at the same time (within the
+limits of `archives.backend`), standardizes each slice as it
+arrives, and writes it to disk. Progress is recorded after each
+slice, so an interrupted ingest picks up where it left off.
+
+Once every slice is in, they're combined into one .npy file
+per column, which can be opened (memory-mapped) in an instant:
+
+    LSPM.ingest()
+    sky = LSPM.from_store(magnitudelimit=10)
+'''
+
+from ..imports import *
+from .. import archives, io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json, shutil, tempfile
+
+# the Vizier columns that constrain each kind of slice
+constrained = dict(dec='DEJ2000', ra='RAJ2000')
+
+# the range covered by each kind of slice (in degrees)
+extent = dict(dec=(-90.0, 90.0), ra=(0.0, 360.0))
+
+def slices(N=36, axis='dec'):
+    '''
+    Split the sky into N equal slices along one axis.
+
+    Parameters
+    ----------
+    N : int
+        How many slices?
+    axis : str
+        'dec' (for bands of declination) or 'ra' (for wedges of RA).
+
+    Returns
+    -------
+    edges : list
+        The (lower, upper) edges of each slice, in degrees.
+    '''
+    edges = np.linspace(*extent[axis], N + 1)
+    return list(zip(edges[:-1], edges[1:]))
+
+def default_directory(constellation):
+    '''
+    Where should the store for a Constellation class go?
+    '''
+    return os.path.join(io.store_directory, constellation.name)
+
+def as_array(column):
+    '''
+    Convert a table column into a plain array (with masked
+    values filled in) and the name of its unit (or None).
+    '''
+    unit = getattr(column, 'unit', None)
+    values = np.ma.asarray(getattr(column, 'value', column))
+    if values.dtype.kind == 'f':
+        fill = np.nan
+    elif values.dtype.kind in 'US':
+        fill = ''
+    else:
+        fill = 0
+    return np.ma.filled(values, fill), (None if unit is None else str(unit))
+
+class Store(Talker):
+    '''
+    A Store is a directory of columns (one .npy file each),
+    built up one slice of the sky at a time.
+    '''
+
+    def __init__(self, directory):
+        '''
+        Parameters
+        ----------
+        directory : str
+            The directory for this store.
+        '''
+        Talker.__init__(self)
+        self.directory = directory
+        self.progressfilename = os.path.join(directory, 'progress.json')
+
+    def __repr__(self):
+        return f'<Store {self.directory}>'
+
+    @property
+    def progress(self):
+        '''
+        The record of what's been ingested so far (a dict with
+        the recipe, which slices are done, the columns and their
+        units, and whether they've been combined yet).
+        '''
+        try:
+            with open(self.progressfilename) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save(self, progress):
+        '''
+        Write out the progress record.
+        '''
+        with io.atomic(self.progressfilename) as temporary:
+            with open(temporary, 'w') as f:
+                json.dump(progress, f, indent=1)
+
+    @property
+    def complete(self):
+        '''
+        Have all the slices been ingested and combined?
+        '''
+        return self.progress.get('complete', False)
+
+    def start(self, recipe):
+        '''
+        Start over, with a new recipe (anything already stored is removed).
+        '''
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        self._save(dict(recipe=recipe, done={}, columns=[], units={}, complete=False))
+
+    def clear(self):
+        '''
+        Remove everything in this store.
+        '''
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+    def chunk(self, i):
+        '''
+        The directory holding slice i (before it's been combined).
+        '''
+        return os.path.join(self.directory, 'chunks', f'{i:04}')
+
+    def write_chunk(self, i, table):
+        '''
+        Write the columns of one slice (all at once, so
+        a chunk directory is either complete or absent).
+
+        Parameters
+        ----------
+        i : int
+            Which slice is this?
+        table : astropy.table.Table
+            The standardized table of stars in this slice.
+
+        Returns
+        -------
+        units : dict
+            The unit (or None) of each column.
+        '''
+        final = self.chunk(i)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        temporary = tempfile.mkdtemp(dir=os.path.dirname(final), prefix=f'.{i:04}.')
+        units = {}
+        for name in table.colnames:
+            values, units[name] = as_array(table[name])
+            np.save(os.path.join(temporary, name + '.npy'), values)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.replace(temporary, final)
+        return units
+
+    def record(self, i, rows, units=None):
+        '''
+        Record that slice i (with some number of rows) is done.
+        '''
+        progress = self.progress
+        progress['done'][str(i)] = rows
+        if units and not progress['columns']:
+            progress['columns'] = list(units)
+            progress['units'] = units
+        self._save(progress)
+
+    def combine(self):
+        '''
+        Combine the chunks (in order) into one .npy file per column,
+        streaming through them without loading them all at once.
+        '''
+        progress = self.progress
+        # (slices with no stars may still have stored empty columns, which know their dtypes)
+        chunks = [self.chunk(int(i)) for i in sorted(progress['done'], key=int)
+                                     if os.path.exists(self.chunk(int(i)))]
+        total = sum(progress['done'].values())
+        for name in progress['columns']:
+            pieces = [np.load(os.path.join(c, name + '.npy'), mmap_mode='r') for c in chunks]
+            dtype = np.result_type(*pieces) if pieces else float
+            filename = os.path.join(self.directory, name + '.npy')
+            with io.atomic(filename) as temporary:
+                combined = np.lib.format.open_memmap(temporary, mode='w+',
+                                                     dtype=dtype,
+                                                     shape=(total,))
+                start = 0
+                for p in pieces:
+                    combined[start:start + len(p)] = p
+                    start += len(p)
+                combined.flush()
+                del combined
+        shutil.rmtree(os.path.join(self.directory, 'chunks'), ignore_errors=True)
+        progress['complete'] = True
+        progress['rows'] = total
+        self._save(progress)
+        self.speak(f'combined {len(chunks)} slices ({total} rows) into {self.directory}')
+
+    def open(self, mmap_mode='r'):
+        '''
+        Open the combined columns as a table (memory-mapped,
+        so nothing is read from disk until it's needed).
+
+        Returns
+        -------
+        table : astropy.table.QTable
+            The standardized columns of the whole catalog.
+        '''
+        progress = self.progress
+        if not progress.get('complete', False):
+            raise IOError(f'{self} is incomplete; please finish ingesting it first.')
+        columns = {}
+        for name in progress['columns']:
+            values = np.load(os.path.join(self.directory, name + '.npy'), mmap_mode=mmap_mode)
+            unit = progress['units'][name]
+            columns[name] = values if unit is None else u.Quantity(values, unit, copy=False)
+        table = QTable(columns, copy=False)
+        table.meta['catalog'] = progress['recipe']['catalog']
+        table.meta['store'] = self.directory
+        return table
+
+def fetch(constellation, store, i, lower, upper, axis='dec', criteria={}):
+    '''
+    Query, standardize, and store one slice of a catalog.
+
+    Returns
+    -------
+    rows : int
+        The number of stars in the slice.
+    units : dict
+        The units of the stored columns (or None, if there were no stars).
+    '''
+
+    constraints = dict(criteria)
+    constraints[constrained[axis]] = f'{lower}..{upper}'
+    try:
+        table = archives.backend.query_vizier(constellation.catalog,
+                                              columns=constellation.columns,
+                                              column_filters=constraints)
+    except IndexError:
+        # (Vizier returns no tables at all for an empty slice)
+        return 0, None
+    standardized = constellation.standardize_table(table)
+
+    # keep each star in exactly one slice (Vizier's ranges include both edges)
+    x = standardized[axis].to('deg').value
+    keep = (x >= lower) & ((x < upper) | (upper == extent[axis][1]))
+    standardized = standardized[keep]
+
+    return len(standardized), store.write_chunk(i, standardized)
+
+def ingest(constellation, directory=None, N=36, axis='dec',
+                          magnitudelimit=None,
+                          workers=None,
+                          progress=True,
+                          overwrite=False):
+    '''
+    Download a whole Vizier catalog, slice by slice, into a Store.
+    If interrupted, running it again resumes where it stopped.
+
+    Parameters
+    ----------
+    constellation : Constellation class
+        The catalog to ingest (e.g. LSPM), which must have
+        .catalog, .columns, and .standardize_table.
+    directory : str
+        The directory for the store (defaults to one
+        named after the constellation in `io.store_directory`).
+    N : int
+        How many slices should the sky be split into?
+    axis : str
+        Slice in 'dec' or in 'ra'?
+    magnitudelimit : float
+        The maximum magnitude (in the default filter) to include.
+    workers : int
+        How many slices to download at once (defaulting
+        to the limit of `archives.backend` for this archive).
+    progress : bool
+        Should a progress bar be shown?
+    overwrite : bool
+        Should an existing store be thrown out and started over?
+
+    Returns
+    -------
+    store : Store
+        The completed store, ready to be opened.
+    '''
+
+    store = Store(directory or default_directory(constellation))
+    recipe = dict(catalog=constellation.catalog, N=N, axis=axis, magnitudelimit=magnitudelimit)
+    if overwrite or store.progress.get('recipe') != recipe:
+        store.start(recipe)
+    if store.complete:
+        store.speak(f'{constellation.catalog} has already been ingested')
+        return store
+
+    criteria = {}
+    if magnitudelimit is not None:
+        criteria[constellation.defaultfilter + 'mag'] = '<{}'.format(magnitudelimit)
+
+    done = store.progress['done']
+    todo = [(i, lower, upper) for i, (lower, upper) in enumerate(slices(N, axis))
+                              if str(i) not in done]
+    store.speak(f'ingesting {len(todo)} of {N} slices of {constellation.catalog} into {store.directory}')
+
+    # download the slices at the same time, but record them one by one
+    failures = []
+    workers = workers or archives.backend.limits.get(constellation.archive, 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest') as pool:
+        futures = {pool.submit(fetch, constellation, store, i, lower, upper,
+                               axis=axis, criteria=criteria):i for i, lower, upper in todo}
+        for future in tqdm(as_completed(futures), total=len(futures), disable=not progress):
+            i = futures[future]
+            try:
+                rows, units = future.result()
+            except Exception as e:
+                failures.append(i)
+                print(f'failed to ingest slice {i} of {constellation.catalog} ({e.__class__.__name__}: {e})')
+                continue
+            store.record(i, rows, units)
+
+    if failures:
+        raise IOError(f'{len(failures)} slices of {constellation.catalog} failed; '
+                      f'run ingest again to resume.')
+
+    store.combine()
+    return store
@@ -1,15 +1,113 @@
 from .imports import *
-from . import io
+from . import io, cache, archives
+from .instrumentation import timer
+import threading
 
 # a shortcut getting the coordinates for an object, by its name
 get = SkyCoord.from_name
 
+# errors that mean a cached file is missing (or damaged)
+unreadable = (IOError, EOFError, pickle.UnpicklingError)
+
+# the names that have been resolved so far (shared by everything in this process)
+_resolved = {}
+_resolved_lock = threading.Lock()
+
+def download_tic_coord(tic):
+    '''
+    Use the MAST archive to download a SkyCoord for one
+    star from the TESS Input Catalog.
+
+    '''
+
+    # download that TIC from the archive
+    t = archives.backend.query_mast_catalog("Tic", ID=tic)[0]
+
+    # the 'ra' and 'dec' columns were propagated to J2000 (https://outerspace.stsci.edu/display/TESS/TIC+v8+and+CTL+v8.xx+Data+Release+Notes)
+    obstime='J2000.0'
+
+    # define a sky coord, with proper motions and a time
+    s = coord.SkyCoord(  ra=t['ra']*u.deg,
+                         dec=t['dec']*u.deg,
+                         pm_ra_cosdec=t['pmRA']*u.mas/u.year,
+                         pm_dec=t['pmDEC']*u.mas/u.year,
+                         obstime='J2000.0')
+
+    return s
+
+def resolve_name(name):
+    '''
+    Find the coordinates of an object by its name (or "TIC" number),
+    asking the archives only the first time each name is used.
+    '''
+    with _resolved_lock:
+        if name in _resolved:
+            return _resolved[name]
+    with timer('Field.resolve_name') as counts:
+        if name[0:3].lower() == 'tic':
+            coordinate = download_tic_coord(int(name[3:]))
+        else:
+            coordinate = get(name)
+        counts['resolved'] += 1
+    with _resolved_lock:
+        _resolved[name] = coordinate
+    return coordinate
+
+class Center:
+    '''
+    A Center is a position on the sky that has already been
+    resolved, keeping the name (if any) it was given by. It
+    can be passed to every Finder, Panel, Image, and Constellation
+    without any of them needing to resolve it again.
+    '''
+
+    def __init__(self, name=None, coordinate=None):
+        '''
+        Parameters
+        ----------
+        name : str
+            The name of the target (or None).
+        coordinate : SkyCoord
+            The position (resolved from the name, if None).
+        '''
+        self.name = name
+        self.coordinate = resolve_name(name) if coordinate is None else coordinate
+
+    def __str__(self):
+        if self.name is None:
+            return self.coordinate.to_string('hmsdms')
+        return self.name
+
+    def __repr__(self):
+        return f'<Center {self}>'
+
+    def _key(self):
+        return (self.name, round(self.coordinate.icrs.ra.deg, 9), round(self.coordinate.icrs.dec.deg, 9))
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __eq__(self, other):
+        return isinstance(other, Center) and (self._key() == other._key())
+
+def resolve(center):
+    '''
+    Turn a center (a name, a SkyCoord, or a Center) into a Center.
+    '''
+    if (center is None) or isinstance(center, Center):
+        return center
+    if isinstance(center, str):
+        return Center(center)
+    return Center(None, center)
+
 def parse_center(center):
     '''
     Flexible wrapper to ensure we return a SkyCoord center.
     '''
-    if type(center) == str:
-        center = get(center)
+    if isinstance(center, Center):
+        return center.coordinate
+    if isinstance(center, str):
+        return resolve_name(center)
     return center
 
 class Field(Talker):
@@ -19,32 +117,53 @@ class Field(Talker):
     in converting from celestial to local
     tangent-plane coordinates.
     '''
+
+    # which archive does this download from? (see archives.Archive.limits)
+    archive = None
+
     def __repr__(self):
         '''
         How should this field be represented as a string?
         '''
+        return self.name_for(self.center, self.radius)
+
+    @classmethod
+    def name_for(cls, center, radius):
+        '''
+        The name of a field of this kind, with some center and radius.
+        '''
 
         # what's the name of this survey?
-        name = self.__class__.__name__
+        name = cls.__name__
 
         # what's the target of this particular image
-        if type(self.center) == str:
-            target = self.center.replace(' ','')
-        elif isinstance(self.center, SkyCoord):
-            target = self.center.to_string('hmsdms').replace(' ', '')
-        elif self.center is None:
+        if isinstance(center, Center):
+            target = str(center).replace(' ','')
+        elif type(center) == str:
+            target = center.replace(' ','')
+        elif isinstance(center, SkyCoord):
+            target = center.to_string('hmsdms').replace(' ', '')
+        elif center is None:
             target='allsky'
         else:
             raise ValueError("It's not totally clear what the center should be!")
 
         # what's the radius out to which this image searched?
-        if np.isfinite(self.radius):
-            size = self.radius.to('arcsec')
+        if np.isfinite(radius):
+            size = radius.to('arcsec')
         else:
             size = np.inf # maybe replace with search criteria?
 
         return f'{name}-{target}-{size:.0f}'.replace(' ', '')
 
+    @classmethod
+    def filename_for(cls, center, radius):
+        '''
+        Where would a field of this kind, with some
+        center and radius, be stored in the cache?
+        '''
+        return os.path.join(io.cache_directory, f'{cls.name_for(center, radius)}.pickled')
+
     @property
     def coordinate_center(self):
         '''
@@ -135,18 +254,23 @@ class Field(Talker):
         Save the hard-to-load data.
         '''
         if io.cache:
-            mkdir(io.cache_directory)
-            with open(self.filename, 'wb') as file:
-                pickle.dump(self._downloaded, file)
+            with timer(f'{self.__class__.__name__}.save') as counts:
+                mkdir(io.cache_directory)
+                with io.atomic(self.filename) as temporary:
+                    with open(temporary, 'wb') as file:
+                        pickle.dump(self._downloaded, file)
                 print(f'saved file to {self.filename}')
+                counts['bytes_written'] += os.path.getsize(self.filename)
 
     def load(self):
         '''
         Load the hard-to-download data.
         '''
-        with open(self.filename, 'rb') as file:
-            self._downloaded = pickle.load(file)
-            print(f'loaded file from {self.filename}')
+        with timer(f'{self.__class__.__name__}.load') as counts:
+            with open(self.filename, 'rb') as file:
+                self._downloaded = pickle.load(file)
+                print(f'loaded file from {self.filename}')
+            counts['bytes_read'] += os.path.getsize(self.filename)
 
     def populate(self):
         '''
@@ -154,11 +278,34 @@ class Field(Talker):
         either by loading a pre-existing local file
         or by downloading from the web.
         '''
-        try:
-            # load from a local file
-            self.load()
-        except (IOError, EOFError):
-            # download the necessary data from online
-            print(f'downloading new data to initialize {self}')
-            self.download()
-            self.save()
+        manager = cache.manager()
+        with timer(f'{self.__class__.__name__}.populate') as counts:
+            try:
+                # load from a local file (unless it's gone stale)
+                if manager.expired(self.filename):
+                    raise IOError(f'{self.filename} has expired')
+                self.load()
+                manager.touch(self.filename)
+                counts['cache_hits'] += 1
+            except unreadable:
+                # make sure only one thread or process downloads this at once
+                with io.exclusive(self.filename):
+                    try:
+                        # someone else may have downloaded it while we waited
+                        if manager.expired(self.filename):
+                            raise IOError(f'{self.filename} has expired')
+                        self.load()
+                        manager.touch(self.filename)
+                        counts['cache_hits'] += 1
+                        counts['coalesced'] += 1
+                    except unreadable:
+                        # download the necessary data from online
+                        counts['cache_misses'] += 1
+                        print(f'downloading new data to initialize {self}')
+                        with timer(f'{self.__class__.__name__}.download'):
+                            self.download()
+                        self.save()
+
+            # (outside the lock, in case this evicts other files)
+            if counts['cache_misses'] and io.cache and os.path.exists(self.filename):
+                manager.register(self.filename)
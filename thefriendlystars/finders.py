@@ -10,6 +10,9 @@ from .imports import *
 from .panels import *
 from .images import *
 from .constellations import *
+from .instrumentation import timed
+from .field import resolve
+from . import render as raster
 from illumination import GenericIllustration
 
 # define som
@@ -29,14 +32,16 @@ class Finder(Field):
         a center and a radius.
         '''
 
-        # keep track of the center and radius of this finder
-        self.center = center
+        # keep track of the center (resolved only once, and shared
+        # by every panel, image, and constellation) and the radius
+        self.center = resolve(center)
         self.radius = radius
 
         # populate all the necessary data in the panels
         self.setup_panels(images, constellations)
 
 
+    @timed('Finder.setup_panels')
     def setup_panels(self, images=[], constellations=[]):
         '''
         Populate the panels that will go into this finder.
@@ -93,11 +98,14 @@ class Finder(Field):
         return self.illustration
 
 
-    def draw_title(self, name=None):
+    def title(self, name=None):
+        '''
+        The title for this finder chart.
+        '''
 
         # define a name for this location
         if name is None:
-            name = self.center
+            name = str(self.center)
 
         # pull out a coordinate string for this object
         radec = self.coordinate_center.to_string("hmsdms", precision=1,
@@ -107,7 +115,11 @@ class Finder(Field):
 
         # add an epoch, based on the coordinate center
         epoch = self.coordinate_center.obstime or '????'
-        return plt.suptitle(f'{name} | {radec} ({epoch})', fontsize='xx-large')
+        return f'{name} | {radec} ({epoch})'
+
+    def draw_title(self, name=None):
+        self.suptitle = plt.suptitle(self.title(name), fontsize='xx-large')
+        return self.suptitle
 
     def plot(self, **kwargs):
         '''
@@ -124,3 +136,177 @@ class Finder(Field):
         #plt.ylim(-r, r)
 
         return illustration
+
+    @timed('Finder.render')
+    def render(self, filename=None, dpi=100, format=None, quality=90, rasterize=True):
+        '''
+        Render this finder chart into a raster image,
+        (plotting it first, if it hasn't been plotted yet).
+
+        Parameters
+        ----------
+        filename : str, or file-like object
+            Where should the image be written? If None,
+            the image is only returned (not written).
+        dpi : float
+            The resolution of the output (dots per inch).
+        format : str
+            'png', 'jpeg', or 'webp' (guessed from the filename if None).
+        quality : int
+            The quality for the lossy formats (1-100).
+        rasterize : bool
+            Should the stars be rasterized (also when the
+            figure is later saved to a vector format)?
+
+        Returns
+        -------
+        rgba : array
+            The (height, width, 4) array of uint8 RGBA pixels.
+        '''
+        if getattr(self, 'illustration', None) is None:
+            self.plot()
+        figure = self.illustration.figure
+        figure.set_dpi(dpi)
+
+        # (each panel's image draws only as many pixels as will be seen)
+        for p in self.panels:
+            for scatter in p.plotted['constellations']:
+                scatter.set_rasterized(rasterize)
+
+        rgba = raster.to_rgba(figure)
+        if filename is not None:
+            raster.write(rgba, filename, format=format, quality=quality)
+        return rgba
+
+    def swap(self, other):
+        '''
+        Show the data of another Finder in this (already plotted) one,
+        keeping the figure, axes, and decorations (see Panel.swap).
+
+        Parameters
+        ----------
+        other : Finder
+            A finder (not yet plotted) with the same layout as this one.
+        '''
+        if len(other.panels) != len(self.panels):
+            raise ValueError(f"{other} doesn't have the same layout as {self}.")
+        for mine, theirs in zip(self.panels, other.panels):
+            mine.swap(theirs)
+
+        self.center = other.center
+        self._coordinate_center = other.coordinate_center
+        self.suptitle.set_text(self.title())
+        return self.illustration
+
+class FinderTemplate(Talker):
+    '''
+    A FinderTemplate makes many finder charts with the same
+    layout, plotting the figure, axes, and decorations only
+    once and then swapping in the data for each new target.
+
+        template = FinderTemplate(radius=3*u.arcmin, images=[DSS2r])
+        for target in targets:
+            template.savefig(target, f'{target}.pdf')
+    '''
+
+    def __init__(self, radius=5*u.arcmin,
+                       images=[DSS2r, TwoMassJ, TESS],
+                       constellations=[Gaia]):
+        '''
+        Parameters
+        ----------
+        radius : astropy.units.quantity.Quantity
+            The radius of every finder chart.
+        images : list
+            The images to include (see Finder).
+        constellations : list
+            The constellations to include (see Finder).
+        '''
+        Talker.__init__(self)
+        self.radius = radius
+        self.images = images
+        self.constellations = constellations
+        self.finder = None
+
+    def plot(self, center):
+        '''
+        Plot a finder chart for a new center, into the template.
+
+        Returns
+        -------
+        illustration : illumination.GenericIllustration
+            The illustration (which is the same every time).
+        '''
+        new = Finder(center, radius=self.radius,
+                             images=self.images,
+                             constellations=self.constellations)
+        if self.finder is None:
+            # the first time, plot everything from scratch
+            self.finder = new
+            return self.finder.plot()
+        else:
+            # after that, just swap in the new data
+            return self.finder.swap(new)
+
+    def show(self, new):
+        '''
+        Show an already-created (but not plotted) Finder in the
+        template. Unlike `plot`, this never changes `new` itself,
+        so the same Finder can be kept around and shown again.
+
+        Parameters
+        ----------
+        new : Finder
+            A finder with the same layout as this template.
+
+        Returns
+        -------
+        illustration : illumination.GenericIllustration
+            The illustration (which is the same every time).
+        '''
+        if self.finder is None:
+            # the first time, plot a finder of the template's own
+            self.finder = Finder(new.center, radius=self.radius,
+                                             images=self.images,
+                                             constellations=self.constellations)
+            self.finder.plot()
+        return self.finder.swap(new)
+
+    def savefig(self, center, filename, **kwargs):
+        '''
+        Plot a finder chart for a new center, and save it.
+
+        Parameters
+        ----------
+        center : str, SkyCoord
+            The center of the finder.
+        filename : str
+            Where should it be saved?
+        **kwargs
+            Passed along to savefig.
+        '''
+        illustration = self.plot(center)
+        illustration.figure.savefig(filename, **kwargs)
+        return illustration
+
+    def render(self, center, filename=None, **kwargs):
+        '''
+        Plot a finder chart for a new center, and render it
+        into a raster image (see Finder.render).
+
+        Parameters
+        ----------
+        center : str, SkyCoord
+            The center of the finder.
+        filename : str, or file-like object
+            Where should it be written? (None = don't write)
+        **kwargs
+            Passed along to Finder.render.
+
+        Returns
+        -------
+        rgba : array
+            The (height, width, 4) array of uint8 RGBA pixels.
+        '''
+        self.plot(center)
+        return self.finder.render(filename, **kwargs)
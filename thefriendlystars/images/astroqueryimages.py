@@ -3,8 +3,8 @@ Images that can be accessed through astroquery.skyview
 '''
 
 from .image import *
-import astroquery.skyview
-from astroquery.mast import Tesscut
+from .. import archives, io
+from . import mosaic as tiles
 from urllib.request import HTTPError
 
 class astroqueryImage(Image):
@@ -14,28 +14,62 @@ class astroqueryImage(Image):
     This is an image with a WCS, that's been downloaded from skyview.
     '''
 
+    archive = 'skyview'
+
 
 
     def __init__(self, center,
                        radius=3*u.arcmin,
                        survey='DSS1 Blue',
-                       process='subtractbackground'):
+                       process='subtractbackground',
+                       mosaic=None):
+        '''
+        Parameters
+        ----------
+        center : str, SkyCoord
+            The center of the image.
+        radius : astropy.units.quantity.Quantity
+            The radius of the image.
+        survey : str
+            The SkyView survey to download.
+        process : str, list
+            How should the image be processed? This can be
+            one processing step or a list of them (see
+            Image.process_image), or None for no processing.
+        mosaic : bool
+            Should this image be cut out of a shared tile?
+            (see thefriendlystars.images.mosaic; defaults to io.mosaic)
+        '''
 
         # store the search parameters
         self.center = center
         self.radius = radius
         self.survey = survey
+        self.mosaic = io.mosaic if mosaic is None else mosaic
+        self.process = process
 
-        self.populate()
+        # reuse an identical image, if one's already been processed
+        if self.recall():
+            return
 
-        # simple access for the main ingredients
-        self.header = self._downloaded.header
-        self.data = self._downloaded.data
-        self.wcs = WCS(self._downloaded.header)
+        # cut out from a tile if possible, otherwise download
+        try:
+            if not self.mosaic:
+                raise tiles.OutsideTile
+            self.header, self.data, self.wcs = tiles.cutout(self.survey,
+                                                            self.coordinate_center,
+                                                            2*self.radius)
+        except tiles.OutsideTile:
+            self.populate()
+
+            # simple access for the main ingredients
+            self.header = self._downloaded.header
+            self.data = self._downloaded.data
+            self.wcs = WCS(self._downloaded.header)
 
-        self.process = process
         self.guess_epoch()
         self.process_image()
+        self.remember()
 
 
 
@@ -48,8 +82,8 @@ class astroqueryImage(Image):
 
         try:
             # query sky view for those images
-            hdulist = astroquery.skyview.SkyView.get_images(
-                                        position=self.center,
+            hdulist = archives.backend.get_skyview_images(
+                                        position=self.coordinate_center,
                                         radius=self.radius*2,
                                         survey=self.survey)[0]
         except HTTPError:
@@ -77,11 +111,8 @@ class astroqueryImage(Image):
             if 'epoch' in c.lower():
                 # often the epoch includes a range of years ("1997-2002")
                 epochs = ''.join(c.split()[1:]).split('-')
-                self.epoch = np.mean(np.array(epochs).astype(np.float))
+                self.epoch = np.mean(np.array(epochs).astype(float))
 
-    def process_image(self):
-        if self.process == 'subtractbackground':
-            self.data -= np.median(self.data)
 
 
 
@@ -1,8 +1,9 @@
 from .astroqueryimages import *
 
 class DSS(astroqueryImage):
-    def process_image(self):
-        self.data = self.data - np.median(self.data)
+    '''
+    Images from the Digitized Sky Survey.
+    '''
 
 
 class DSS1b(DSS):
@@ -7,7 +7,26 @@ and any number of catalogs plotted.
 
 from ..field import Field
 from ..imports import *
+from .. import io
+from ..instrumentation import timed
+from ..render import downsample
 from illumination import imshowFrame
+from astropy.wcs.utils import proj_plane_pixel_scales
+from collections import OrderedDict
+import threading
+
+# the most recently processed images (shared by every Image)
+processed = OrderedDict()
+processed_limit = 32
+_processed_lock = threading.Lock()
+
+def sample(data, N=100000):
+    '''
+    A sample of (about) N pixels from an image, taken by
+    striding through it, without copying the whole image.
+    '''
+    step = max(int(np.ceil(np.sqrt(np.size(data)/N))), 1)
+    return data[::step, ::step]
 
 class Image(Field):
     '''
@@ -15,6 +34,242 @@ class Image(Field):
     with a given patch of the sky.
     '''
 
+    # how many pixels are sampled to estimate statistics?
+    samples = 100000
+
+    # how small can the smallest level of the pyramid get?
+    smallest = 16
+
+    # the steps that can go into processing an image (see `process_image`)
+    processing = dict(native='to_native',
+                      subtractbackground='subtract_background',
+                      clip='clip',
+                      crop='crop')
+
+    # how far below the background should 'clip' clip (in mad_std)?
+    clip_below = 5.0
+
+    # how far beyond the radius should 'crop' keep (as a fraction of the radius)?
+    crop_margin = np.sqrt(2)
+
+    @property
+    def steps(self):
+        '''
+        The list of processing steps for this image, from `.process`,
+        which can be a list of steps, or one step (as a string).
+        Either way, the data are always converted to native floats first.
+        '''
+        process = getattr(self, 'process', None)
+        if process is None:
+            return ['native']
+        if isinstance(process, str):
+            process = [process]
+        return ['native'] + [p for p in process if p != 'native']
+
+    def process_image(self):
+        '''
+        Process the data of this image, by applying each of `.steps`
+        in turn. The steps work in place (on the downloaded data)
+        wherever they can, and the processed data are read-only.
+        '''
+        for step in self.steps:
+            try:
+                method = getattr(self, self.processing[step])
+            except KeyError:
+                raise ValueError(f'"{step}" is not one of the processing steps {list(self.processing)}.')
+            method()
+        self.data.flags.writeable = False
+
+    def to_native(self):
+        '''
+        Make sure the data are native-endian, 32-bit floats
+        (byteswapping in place, if that's all that's needed).
+        Read-only data that are already native floats (like
+        mosaic cutouts) are kept as they are, without copying.
+        '''
+        data = self.data
+        if (data.dtype.kind != 'f') or (data.dtype.itemsize != 4) or not (data.dtype.isnative or data.flags.writeable):
+            self.data = data.astype(np.float32)
+        elif not data.dtype.isnative:
+            data.byteswap(inplace=True)
+            self.data = data.view(data.dtype.newbyteorder('='))
+            # (the downloaded data share these bytes, so they need the native dtype too)
+            downloaded = getattr(self, '_downloaded', None)
+            if getattr(downloaded, 'data', None) is data:
+                downloaded.data = self.data
+
+    def make_writeable(self):
+        '''
+        Copy the data if they're read-only (like a view of
+        a mosaic tile), so they can be changed in place.
+        '''
+        if self.data.flags.writeable:
+            return
+        data = self.data.copy()
+        # (the statistics are the same for the copy)
+        if getattr(self, '_statistics', (None,))[0] is self.data:
+            self._statistics = (data, self._statistics[1])
+        self.data = data
+
+    def subtract_background(self):
+        '''
+        Subtract the median (in place).
+        '''
+        self.make_writeable()
+        s = self.statistics
+        self.data -= s['median']
+        # (the statistics shift along with the data)
+        self._statistics = (self.data, dict(median=0.0,
+                                            mad_std=s['mad_std'],
+                                            max=s['max'] - s['median']))
+        self._pyramid = None
+
+    def clip(self):
+        '''
+        Clip (in place) anything more than `clip_below`
+        times the mad_std below the background.
+        '''
+        self.make_writeable()
+        s = self.statistics
+        np.maximum(self.data, s['median'] - self.clip_below*s['mad_std'], out=self.data)
+        self._pyramid = None
+
+    def crop(self):
+        '''
+        Crop (without copying) to the square extending
+        `crop_margin` times the radius around the center
+        (updating the WCS and the header to match).
+        '''
+        x, y = self.wcs.world_to_pixel(self.coordinate_center)
+        scale = np.abs(proj_plane_pixel_scales(self.wcs)[1])*u.deg
+        n = (self.radius*self.crop_margin/scale).decompose().value
+        rows, cols = self.data.shape
+        x0, x1 = max(int(np.floor(x - n)), 0), min(int(np.ceil(x + n)) + 1, cols)
+        y0, y1 = max(int(np.floor(y - n)), 0), min(int(np.ceil(y + n)) + 1, rows)
+        self.data = self.data[y0:y1, x0:x1]
+        self.wcs = self.wcs[y0:y1, x0:x1]
+        self.header = self.header.copy()
+        self.header.update(self.wcs.to_header())
+        self.header['NAXIS1'], self.header['NAXIS2'] = self.data.shape[1], self.data.shape[0]
+        for k in ['_pix2local', '_local2pix']:
+            self.__dict__.pop(k, None)
+
+    @property
+    def processed_key(self):
+        '''
+        What identifies this image, processed in this way?
+        '''
+        return (io.cache_directory, repr(self), tuple(self.steps), getattr(self, 'mosaic', False))
+
+    def recall(self):
+        '''
+        Try to reuse an identical image that's already been processed.
+
+        Returns
+        -------
+        recalled : bool
+            Was a processed image found (and its data reused)?
+        '''
+        with _processed_lock:
+            try:
+                remembered = processed[self.processed_key]
+                processed.move_to_end(self.processed_key)
+            except KeyError:
+                return False
+        self.header, self.data, self.wcs, self.epoch = remembered
+        return True
+
+    def remember(self):
+        '''
+        Keep this processed image, so identical images can reuse it.
+        '''
+        with _processed_lock:
+            processed[self.processed_key] = (self.header, self.data, self.wcs, self.epoch)
+            while len(processed) > processed_limit:
+                processed.popitem(last=False)
+
+    @property
+    def statistics(self):
+        '''
+        Robust statistics of this image (median, mad_std, max),
+        estimated from a sample of its pixels. These are calculated
+        once, and then kept until the data are replaced.
+        '''
+        try:
+            data, statistics = self._statistics
+            assert(data is self.data)
+        except (AttributeError, AssertionError):
+            s = sample(self.data, self.samples)
+            statistics = dict(median=np.nanmedian(s),
+                              mad_std=mad_std(s, ignore_nan=True),
+                              max=np.nanmax(self.data))
+            self._statistics = (self.data, statistics)
+        return statistics
+
+    @property
+    def pyramid(self):
+        '''
+        A list of versions of this image, each half as big (on
+        each side) as the one before, starting from the image itself.
+        These are made once, and then kept until the data are replaced.
+        '''
+        try:
+            data, pyramid = self._pyramid
+            assert(data is self.data)
+        except (AttributeError, TypeError, AssertionError):
+            pyramid = [self.data]
+            while min(np.shape(pyramid[-1])) >= 2*self.smallest:
+                pyramid.append(downsample(pyramid[-1], 2))
+            self._pyramid = (self.data, pyramid)
+        return pyramid
+
+    def level_for(self, transform):
+        '''
+        Which level of the pyramid best matches the resolution
+        at which the image will be displayed?
+
+        Parameters
+        ----------
+        transform : matplotlib.transforms.Transform
+            The transformation from (full-resolution) image
+            pixels to display pixels.
+
+        Returns
+        -------
+        level : int
+            The index of the pyramid level with (no fewer than)
+            one image pixel per displayed pixel.
+        '''
+        (x0, y0), (x1, y1), (x2, y2) = transform.transform([[0, 0], [1, 0], [0, 1]])
+        area = np.abs((x1 - x0)*(y2 - y0) - (x2 - x0)*(y1 - y0))
+        if area <= 0:
+            return 0
+        level = int(np.floor(np.log2(1/np.sqrt(area)))) if area < 1 else 0
+        return min(max(level, 0), len(self.pyramid) - 1)
+
+    def transform_for(self, level):
+        '''
+        The transformation from the pixels of a pyramid level to
+        local coordinates. (Each pixel of a level is the average of
+        a 2**level x 2**level block of pixels in the full image.)
+        '''
+        factor = 2**level
+        shift = (factor - 1)/2.0
+        return Affine2D().scale(factor).translate(shift, shift) + self.pix2local
+
+    @property
+    def norm(self):
+        '''
+        A quick normalization for the colors,
+        based on the (cached) statistics.
+        '''
+        s = self.statistics
+        return plt.matplotlib.colors.SymLogNorm(linthresh=s['mad_std'],
+                                                linscale=1,
+                                                vmin=-s['max'],
+                                                vmax=s['max'])
+
+    @timed('Image.derive_pix2local')
     def derive_pix2local(self):
         '''
         For this image, derive a linear transformation
@@ -141,18 +396,10 @@ class Image(Field):
         else:
             ax = plt.subplot(gridspec, **inputs)
 
-        # a quick normalization for the colors
-        norm = plt.matplotlib.colors.SymLogNorm(
-                              linthresh=mad_std(self.data),
-                              linscale=1,
-                              vmin=-np.max(self.data),
-                              vmax=np.max(self.data))
-
-
-        # create the imshow
+        # create the imshow (with a cached normalization)
         ax.imshow(self.data, origin='lower',
                              cmap='RdBu',
-                             norm=norm,
+                             norm=self.norm,
                              transform=self.pix2local + ax.transData)
 
 
@@ -0,0 +1,198 @@
+'''
+Serve images as cutouts from big, shared tiles.
+
+Every astroqueryImage normally downloads its own image from
+SkyView, so many targets near one another (in a cluster, or in
+one TESS camera) download the same pixels over and over. In
+mosaic mode, the sky is split into a fixed grid of tiles for
+each survey; each tile is downloaded (and cached) once, and
+images are cut out of it. The cutouts are slices of the tile's
+pixels (not copies), with a WCS sliced to match.
+
+Mosaic mode can be turned on for one image, or for all of them:
+
+    i = DSS2r('GJ1132', mosaic=True)
+
+    from thefriendlystars import io
+    io.mosaic = True
+
+The grid is made of declination bands that are `tile_size`
+tall, each split into roughly square tiles in RA. Each tile
+stretches `tile_margin` beyond the edges of its grid cell,
+so any cutout up to `tile_margin` in half-width fits inside
+the tile containing its center. (Bigger cutouts fall back to
+being downloaded on their own.)
+'''
+
+from ..field import Field
+from ..imports import *
+from .. import archives, io
+from astropy.wcs.utils import proj_plane_pixel_scales
+import functools
+
+# the layout of the grid
+tile_size = 0.5*u.deg
+tile_margin = 0.1*u.deg
+pixelscale = 1.0*u.arcsec
+
+class OutsideTile(ValueError):
+    '''
+    A cutout didn't fit within the tile containing its center.
+    '''
+    pass
+
+def locate(center, size=None):
+    '''
+    Which tile of the grid contains a position?
+
+    Parameters
+    ----------
+    center : SkyCoord
+        The position.
+    size : astropy.units.quantity.Quantity
+        The height of the declination bands (defaults to `tile_size`).
+
+    Returns
+    -------
+    band, column : int
+        The declination band (counting up from the south pole),
+        and the column within that band (counting east from RA=0).
+    '''
+    size = (tile_size if size is None else size).to('deg').value
+    nbands = int(np.ceil(180/size))
+    band = min(int((center.dec.deg + 90)//size), nbands - 1)
+    ncolumns = columns_in(band, size)
+    column = int(center.ra.deg//(360/ncolumns)) % ncolumns
+    return band, column
+
+def columns_in(band, size):
+    '''
+    How many tiles wide is a declination band?
+    (So that they're about as wide as they are tall.)
+    '''
+    middle = -90 + (band + 0.5)*size
+    return max(1, int(360*np.cos(np.radians(middle))//size))
+
+def tile_center(band, column, size):
+    '''
+    The center of a tile of the grid (with size in degrees).
+    '''
+    dec = min(-90 + (band + 0.5)*size, 90)
+    ra = (column + 0.5)*360/columns_in(band, size)
+    return SkyCoord(ra*u.deg, dec*u.deg)
+
+class Tile(Field):
+    '''
+    One tile of the mosaic grid, for one survey.
+    '''
+
+    archive = 'skyview'
+
+    def __init__(self, survey, band, column, size=None, margin=None, scale=None):
+        '''
+        Parameters
+        ----------
+        survey : str
+            The SkyView survey (e.g. 'DSS2 Red').
+        band, column : int
+            The location of this tile in the grid.
+        size, margin, scale : astropy.units.quantity.Quantity
+            The grid cell size, the margin around each cell, and the
+            pixel scale (defaulting to tile_size, tile_margin, pixelscale).
+        '''
+        self.survey = survey
+        self.band, self.column = band, column
+        self.size = tile_size if size is None else size
+        self.margin = tile_margin if margin is None else margin
+        self.scale = pixelscale if scale is None else scale
+
+        self.center = tile_center(band, column, self.size.to('deg').value)
+        self.radius = self.size/2 + self.margin
+        self.pixels = int(np.ceil((2*self.radius/self.scale).decompose().value))
+
+        self.populate()
+        self.header = self._downloaded.header
+        self.wcs = WCS(self.header)
+
+        # (native floats, once per tile, so cutouts can be used without copying)
+        self.data = self._downloaded.data
+        if (self.data.dtype != np.float32) or not self.data.dtype.isnative:
+            self.data = self.data.astype(np.float32)
+
+    def __repr__(self):
+        '''
+        How should this tile be represented as a string?
+        '''
+        size = self.size.to('arcmin')
+        scale = self.scale.to('arcsec')
+        return f'Tile-{self.survey}-{self.band}-{self.column}-{size:.0f}-{scale:.1f}'.replace(' ', '')
+
+    def download(self):
+        '''
+        Download the image for this whole tile.
+        '''
+        self._downloaded = archives.backend.get_skyview_images(position=self.center,
+                                                               radius=self.radius,
+                                                               survey=self.survey,
+                                                               pixels=self.pixels)[0][0]
+
+@functools.lru_cache(maxsize=8)
+def get_tile(survey, band, column, size, margin, scale, directory, backend):
+    '''
+    Get a Tile, keeping the most recently used ones in memory
+    (so cutouts of one tile all share the same pixels).
+    (The size and margin are in degrees, the scale in arcsec.
+    The cache directory and the archive backend are part of
+    the key, so tiles from one aren't served for another.)
+    '''
+    return Tile(survey, band, column, size=size*u.deg,
+                                      margin=margin*u.deg,
+                                      scale=scale*u.arcsec)
+
+def cutout(survey, center, halfwidth):
+    '''
+    Cut a square image out of the tile containing its center.
+
+    Parameters
+    ----------
+    survey : str
+        The SkyView survey (e.g. 'DSS2 Red').
+    center : SkyCoord
+        The center of the cutout.
+    halfwidth : astropy.units.quantity.Quantity
+        Half the width of the cutout.
+
+    Returns
+    -------
+    header : astropy.io.fits.Header
+        A header for the cutout (with the tile's comments).
+    data : array
+        The pixels of the cutout, as a read-only view into the tile.
+    wcs : astropy.wcs.WCS
+        The WCS for the cutout.
+    '''
+    band, column = locate(center)
+    tile = get_tile(survey, band, column, tile_size.to('deg').value,
+                                          tile_margin.to('deg').value,
+                                          pixelscale.to('arcsec').value,
+                                          io.cache_directory, archives.backend)
+
+    # where is this cutout in the tile?
+    x, y = tile.wcs.world_to_pixel(center)
+    scale = np.abs(proj_plane_pixel_scales(tile.wcs)[1])*u.deg
+    n = (halfwidth/scale).decompose().value
+    x0, x1 = int(np.round(x - n)), int(np.round(x + n))
+    y0, y1 = int(np.round(y - n)), int(np.round(y + n))
+    rows, cols = tile.data.shape
+    if (x0 < 0) or (y0 < 0) or (x1 > cols) or (y1 > rows):
+        raise OutsideTile(f'A {halfwidth} cutout around {center} runs off the edge of {tile}.')
+
+    # slice (without copying) the data and the WCS
+    data = tile.data[y0:y1, x0:x1]
+    data.flags.writeable = False
+    wcs = tile.wcs[y0:y1, x0:x1]
+
+    header = wcs.to_header()
+    for c in tile.header.get('COMMENT', []):
+        header['COMMENT'] = c
+    return header, data, wcs
@@ -1,13 +1,15 @@
 from .astroqueryimages import *
-from lightkurve.search import search_tesscut
 from lightkurve import TessTargetPixelFile
 from .. import io
+from ..instrumentation import timer
 
 class TESS(astroqueryImage):
     '''
     This is an image with a WCS, that's been cut from TESS FFIs.
     '''
 
+    archive = 'mast'
+
 
     def __init__(self, center, radius=3*u.arcmin, process='subtractbackground'):
 
@@ -19,10 +21,16 @@ class TESS(astroqueryImage):
 
 
         self.process = process
+
+        # reuse an identical image, if one's already been processed
+        if self.recall():
+            return
+
         # figure out an approximate epoch for this image
         self.populate()
         self.guess_epoch()
         self.process_image()
+        self.remember()
 
     @property
     def filename(self):
@@ -33,42 +41,38 @@ class TESS(astroqueryImage):
         Save the hard-to-load data (special for TESS TPF).
         '''
         if io.cache:
-            mkdir(io.cache_directory)
+            with timer('TESS.save') as counts:
+                mkdir(io.cache_directory)
 
-            with open(self.filename, 'wb') as file:
-                self._downloaded.to_fits(self.filename)
+                with io.atomic(self.filename) as temporary:
+                    self._downloaded.to_fits(temporary, overwrite=True)
                 print(f'saved file to {self.filename}')
+                counts['bytes_written'] += os.path.getsize(self.filename)
 
     def load(self):
         '''
         Load the hard-to-download data (special for TESS TPF).
         '''
-        self._downloaded = TessTargetPixelFile(self.filename)
-        print(f'loaded file from {self.filename}')
+        with timer('TESS.load') as counts:
+            self._downloaded = TessTargetPixelFile(self.filename)
+            print(f'loaded file from {self.filename}')
+            counts['bytes_read'] += os.path.getsize(self.filename)
 
 
     def download(self):
-        # figure out the sectors
-        cutout_search = search_tesscut(self.center)
-
         # download only the first sector
         scale = 21*u.arcsec
         radius_in_pixels = np.ceil((self.radius/scale).decompose().value)
         cutout_size=int((2*radius_in_pixels + 1)*np.sqrt(2)) # overfill to get corners on a N-E square
-        self.tpf = cutout_search.download(cutout_size=cutout_size)
+        self.tpf = archives.backend.get_tesscut(self.coordinate_center, cutout_size=cutout_size)
         self._downloaded = self.tpf
 
     def populate(self):
         '''
         Populate the data of this image.
         '''
-        try:
-            self.load()
-            print(f'loaded from {self.filename}')
-        except (IOError, EOFError):
-            print(f'downloading data for {self}')
-            self.download()
-            self.save()
+        # load or download (only once), as for any other Field
+        Field.populate(self)
 
         # take just the first sector (ultimately, should make multiple!)
         primary, pixels, aperture = self._downloaded.hdu
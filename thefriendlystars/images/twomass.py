@@ -1,8 +1,9 @@
 from .astroqueryimages import *
 
 class TwoMass(astroqueryImage):
-    def process_image(self):
-        self.data = self.data - np.median(self.data)
+    '''
+    Images from the Two Micron All Sky Survey.
+    '''
 
 class TwoMassJ(TwoMass):
     def __init__(self, *args, **kwargs):
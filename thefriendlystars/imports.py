@@ -7,6 +7,7 @@ from tqdm import tqdm
 
 # some standard astropy tools
 import astropy.units as u
+import astropy.coordinates as coord
 from astropy.coordinates import SkyCoord
 import astropy.io.fits
 astropy.io.fits.conf.use_memmap = False
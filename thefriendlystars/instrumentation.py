@@ -0,0 +1,207 @@
+'''
+Tools for keeping track of where the time goes.
+
+The slow parts of tfs (downloading, loading, standardizing,
+propagating, plotting) are wrapped in named timers, which
+accumulate the number of calls, the wall-clock and CPU time
+spent inside them, and any counters (cache hits and misses,
+bytes read, rows) that the code being timed chooses to add.
+
+A typical use might look like:
+
+    from thefriendlystars import instrumentation
+    instrumentation.reset()
+    f = Finder('GJ1132')
+    f.plot()
+    instrumentation.print_table()
+    instrumentation.to_json('timing.json')
+'''
+
+import time, json, threading, functools
+from collections import Counter
+from contextlib import contextmanager
+from astropy.table import Table
+from .talker import Talker
+
+class Instrument(Talker):
+    '''
+    An Instrument is a registry of named timers and counters.
+    '''
+
+    def __init__(self, enabled=True):
+        '''
+        Initialize an empty registry.
+
+        Parameters
+        ----------
+        enabled : bool
+            Should timers and counters actually be recorded?
+        '''
+        Talker.__init__(self)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''
+        Forget everything that has been recorded so far.
+        '''
+        with self._lock:
+            self.records = {}
+
+    def _accumulate(self, name, calls=0, wall=0.0, cpu=0.0, counts={}):
+        '''
+        Add some measurements to the record for one name.
+        '''
+        with self._lock:
+            if name not in self.records:
+                self.records[name] = dict(calls=0, wall=0.0, cpu=0.0, counts=Counter())
+            record = self.records[name]
+            record['calls'] += calls
+            record['wall'] += wall
+            record['cpu'] += cpu
+            record['counts'].update(counts)
+
+    @contextmanager
+    def timer(self, name, **counts):
+        '''
+        Time the code inside a `with` block.
+
+        Parameters
+        ----------
+        name : str
+            The name under which this timing will be recorded.
+        **counts : dict
+            Initial values for any counters (e.g. rows=10).
+
+        Yields
+        ------
+        counts : collections.Counter
+            A counter that the timed code can increment,
+            (e.g. counts['bytes_read'] += 100), which will
+            be added to the record when the block exits.
+        '''
+        counts = Counter(counts)
+        if not self.enabled:
+            yield counts
+            return
+
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield counts
+        finally:
+            self._accumulate(name,
+                             calls=1,
+                             wall=time.perf_counter() - wall,
+                             cpu=time.thread_time() - cpu,
+                             counts=counts)
+
+    def count(self, name, **counts):
+        '''
+        Increment counters for a name, without timing anything.
+
+        Parameters
+        ----------
+        name : str
+            The name under which these counts will be recorded.
+        **counts : dict
+            The amounts by which to increment each counter.
+        '''
+        if self.enabled:
+            self._accumulate(name, counts=counts)
+
+    def timed(self, name=None, **counters):
+        '''
+        A decorator that times every call to a function.
+
+        Parameters
+        ----------
+        name : str
+            The name under which the timing will be recorded.
+            (Defaults to the qualified name of the function.)
+        **counters : dict
+            Functions that will be applied to the returned
+            value of each call, whose outputs are added to
+            counters of the same name (e.g. rows=len).
+        '''
+        def decorator(function):
+            label = name or function.__qualname__
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(label) as counts:
+                    result = function(*args, **kwargs)
+                    for k, f in counters.items():
+                        counts[k] += f(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def table(self):
+        '''
+        Summarize the records as an astropy table,
+        with one row per name, sorted by wall time.
+        '''
+        with self._lock:
+            records = {k:dict(v, counts=Counter(v['counts']))
+                       for k, v in self.records.items()}
+
+        counters = sorted(set().union(*[r['counts'] for r in records.values()]))
+        names = sorted(records, key=lambda k: -records[k]['wall'])
+
+        columns = dict(name=names,
+                       calls=[records[k]['calls'] for k in names],
+                       wall=[records[k]['wall'] for k in names],
+                       cpu=[records[k]['cpu'] for k in names])
+        for c in counters:
+            columns[c] = [records[k]['counts'][c] for k in names]
+
+        t = Table(columns, names=['name', 'calls', 'wall', 'cpu'] + counters)
+        t['wall'].unit = 's'
+        t['cpu'].unit = 's'
+        for k in ['wall', 'cpu']:
+            t[k].format = '.4f'
+        return t
+
+    def to_json(self, filename=None, **meta):
+        '''
+        Export the records as a JSON string,
+        and (optionally) write them to a file.
+
+        Parameters
+        ----------
+        filename : str
+            If not None, the JSON will be written here.
+        **meta : dict
+            Extra information (a commit hash, a hostname, ...)
+            to store alongside the records.
+        '''
+        with self._lock:
+            records = {k:dict(calls=v['calls'],
+                              wall=v['wall'],
+                              cpu=v['cpu'],
+                              **v['counts'])
+                       for k, v in self.records.items()}
+        s = json.dumps(dict(meta=meta, records=records), indent=2, sort_keys=True, default=float)
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(s)
+            self.speak(f'saved timing report to {filename}')
+        return s
+
+    def print_table(self):
+        '''
+        Print a table summarizing the records.
+        '''
+        self.speak('\n' + '\n'.join(self.table().pformat(max_lines=-1, max_width=-1)))
+
+# one shared instrument for all of tfs
+instrument = Instrument()
+
+# shortcuts to the shared instrument
+timer = instrument.timer
+count = instrument.count
+timed = instrument.timed
+reset = instrument.reset
+table = instrument.table
+to_json = instrument.to_json
+print_table = instrument.print_table
@@ -1,2 +1,122 @@
+'''
+Settings and tools for the local cache of downloaded data.
+'''
+
+import os, tempfile, threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 cache = True
 cache_directory = 'tfs-downloads'
+
+# limits on the cache (see thefriendlystars.cache)
+cache_budget = None     # the maximum total size in bytes (None = unlimited)
+cache_policy = 'lru'    # evict 'lru' (least-recently-used) or 'lfu' (least-frequently-used) first
+cache_ttl = {}          # how long files stay valid, by survey (e.g. dict(Gaia=30*u.day))
+
+# where whole catalogs are ingested (see thefriendlystars.constellations.stream)
+store_directory = 'tfs-stores'
+
+# should images be cut out of shared tiles? (see thefriendlystars.images.mosaic)
+mosaic = False
+
+# one lock per file being worked on, shared by all threads in this process
+# (each with a count of the threads using it, so it can be dropped afterward)
+_locks = {}
+_locks_lock = threading.Lock()
+
+@contextmanager
+def file_lock(filename):
+    '''
+    Hold an exclusive lock on a file (creating it if need be),
+    which other processes using `file_lock` will wait for.
+    The file is removed when the lock is released.
+    (Where fcntl is unavailable, this falls back to a
+    lock file created with O_EXCL.)
+    '''
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if fcntl is not None:
+        while True:
+            f = open(filename, 'a')
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # (if the holder before us removed the file, lock the new one instead)
+            try:
+                if os.path.samestat(os.fstat(f.fileno()), os.stat(filename)):
+                    break
+            except FileNotFoundError:
+                pass
+            f.close()
+        try:
+            yield
+        finally:
+            os.remove(filename)
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+    else:
+        import time
+        while True:
+            try:
+                fd = os.open(filename + '.held', os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(filename + '.held')
+
+@contextmanager
+def exclusive(filename):
+    '''
+    Make sure only one thread (in this process) and one
+    process (sharing this disk) works on a file at a time.
+
+    Parameters
+    ----------
+    filename : str
+        The file to be worked on. While it's being worked
+        on, a lock file is created next to it, ending in ".lock".
+    '''
+    key = os.path.abspath(filename)
+    with _locks_lock:
+        entry = _locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0], file_lock(filename + '.lock'):
+            yield
+    finally:
+        with _locks_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _locks[key]
+
+@contextmanager
+def atomic(filename):
+    '''
+    Write a file atomically, by writing to a temporary file
+    (in the same directory) that only replaces `filename`
+    once it's complete. Anyone reading `filename` will see
+    either the old file or the new one, never a partial one.
+
+    Yields
+    ------
+    temporary : str
+        The filename to which the data should be written.
+    '''
+    directory, base = os.path.split(filename)
+    fd, temporary = tempfile.mkstemp(dir=directory or '.', prefix=f'.{base}.', suffix='.partial')
+    os.close(fd)
+    try:
+        yield temporary
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
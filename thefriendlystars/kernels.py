@@ -0,0 +1,220 @@
+'''
+Fast numerical kernels for big constellations.
+
+Propagating (or cross-matching) millions of stars with Quantity
+arithmetic allocates a new full-length array at every step, and
+runs on only one core. These kernels instead work on plain arrays
+(in fixed units), write into preallocated outputs, and split the
+work into chunks (small enough to stay in the CPU's cache) that a
+pool of threads can process at the same time. NumPy releases the
+GIL while it works, so the threads really do run in parallel. If
+numexpr is installed, each chunk is calculated with one fused
+expression instead of a series of in-place NumPy operations.
+
+To use 8 threads for everything:
+
+    from thefriendlystars import kernels
+    kernels.workers = 8
+'''
+
+from .imports import *
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+from scipy.spatial import cKDTree
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# how many threads should the kernels use? (None = one per CPU)
+workers = 1
+
+# how many stars should be processed in each chunk?
+chunk_size = 2**16
+
+# (milliarcseconds to degrees)
+mas = 1/3.6e6
+
+def threads(n=None):
+    '''
+    How many threads should be used?
+    '''
+    n = workers if n is None else n
+    if n is None:
+        return os.cpu_count() or 1
+    return max(int(n), 1)
+
+def map_chunks(function, N, n=None, size=None):
+    '''
+    Call function(chunk) on each chunk (a slice) of N rows,
+    spread over a pool of threads.
+
+    Parameters
+    ----------
+    function : function
+        A function that does the work for one slice.
+    N : int
+        The total number of rows.
+    n : int
+        How many threads? (Defaults to kernels.workers.)
+    size : int
+        How many rows in each chunk? (Defaults to kernels.chunk_size.)
+    '''
+    size = chunk_size if size is None else max(int(size), 1)
+    chunks = [slice(i, min(i + size, N)) for i in range(0, N, size)]
+    n = min(threads(n), len(chunks))
+    if n <= 1:
+        for chunk in chunks:
+            function(chunk)
+    else:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(function, chunks))
+
+def propagate(ra, dec, pm_ra_cosdec, pm_dec, dt, n=None):
+    '''
+    Move positions along their proper motions, in straight lines.
+    (This is the kernel of constellations.propagate_linearly.)
+
+    Parameters
+    ----------
+    ra, dec : array
+        The positions, in degrees.
+    pm_ra_cosdec, pm_dec : array
+        The proper motions, in mas/yr.
+    dt : array
+        The time differences, in years.
+    n : int
+        How many threads? (Defaults to kernels.workers.)
+    (Any of these can be single values, shared by every star.)
+
+    Returns
+    -------
+    ra, dec : array
+        The new positions, in degrees.
+    '''
+    inputs = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (ra, dec, pm_ra_cosdec, pm_dec, dt)])
+    shape = inputs[0].shape
+    ra, dec, pmra, pmdec, dt = [x.reshape(-1) if x.ndim != 1 else x for x in inputs]
+    N = len(ra)
+    newra, newdec = np.empty(N), np.empty(N)
+
+    def work(s):
+        if numexpr is not None:
+            local = dict(ra=ra[s], dec=dec[s], pmra=pmra[s], pmdec=pmdec[s], dt=dt[s], mas=mas, radian=np.pi/180)
+            numexpr.evaluate('ra + pmra/cos(dec*radian)*dt*mas', local_dict=local, out=newra[s])
+            numexpr.evaluate('dec + pmdec*dt*mas', local_dict=local, out=newdec[s])
+        else:
+            r = newra[s]
+            np.radians(dec[s], out=r)
+            np.cos(r, out=r)
+            np.divide(pmra[s], r, out=r)
+            r *= dt[s]
+            r *= mas
+            r += ra[s]
+            d = newdec[s]
+            np.multiply(pmdec[s], dt[s], out=d)
+            d *= mas
+            d += dec[s]
+
+    map_chunks(work, N, n)
+    return newra.reshape(shape), newdec.reshape(shape)
+
+def unit_vectors(ra, dec, n=None):
+    '''
+    The (x, y, z) unit vectors pointing toward positions.
+
+    Parameters
+    ----------
+    ra, dec : array
+        The positions, in degrees.
+    n : int
+        How many threads? (Defaults to kernels.workers.)
+
+    Returns
+    -------
+    xyz : array
+        The unit vectors, with shape (3, ...).
+    '''
+    ra, dec = np.broadcast_arrays(np.asarray(ra, dtype=float), np.asarray(dec, dtype=float))
+    shape = ra.shape
+    ra, dec = ra.reshape(-1), dec.reshape(-1)
+    xyz = np.empty((3, len(ra)))
+
+    def work(s):
+        x, y, z = xyz[0, s], xyz[1, s], xyz[2, s]
+        np.radians(ra[s], out=x)
+        np.sin(x, out=y)
+        np.cos(x, out=x)
+        np.radians(dec[s], out=z)
+        cosdec = np.cos(z)
+        np.sin(z, out=z)
+        x *= cosdec
+        y *= cosdec
+
+    map_chunks(work, len(ra), n)
+    return xyz.reshape((3,) + shape)
+
+def chord_to_angle(chord):
+    '''
+    The angle (in degrees) between two unit vectors
+    separated by a straight-line distance.
+    '''
+    return np.degrees(2*np.arcsin(np.minimum(np.asarray(chord)/2, 1)))
+
+def nearest(ra, dec, ra_reference, dec_reference, n=None):
+    '''
+    Find the nearest reference position to each position.
+    (This is the kernel of Constellation.crossMatchTo.)
+
+    Parameters
+    ----------
+    ra, dec : array
+        The positions, in degrees.
+    ra_reference, dec_reference : array
+        The reference positions, in degrees.
+    n : int
+        How many threads? (Defaults to kernels.workers.)
+
+    Returns
+    -------
+    indices : array
+        The index of the nearest reference position to each position.
+    separations : array
+        How far away each nearest reference position is, in degrees.
+    '''
+    tree = cKDTree(np.transpose(unit_vectors(ra_reference, dec_reference, n)))
+    chord, indices = tree.query(np.transpose(unit_vectors(ra, dec, n)), k=1, workers=threads(n))
+    return indices, chord_to_angle(chord)
+
+def pairs(ra, dec, ra_reference, dec_reference, radius, n=None):
+    '''
+    Find every pair of a position and a reference position
+    that are within some radius of each other.
+
+    Parameters
+    ----------
+    ra, dec : array
+        The positions, in degrees.
+    ra_reference, dec_reference : array
+        The reference positions, in degrees.
+    radius : float, or array
+        The radius (or one radius for each position), in degrees.
+    n : int
+        How many threads? (Defaults to kernels.workers.)
+
+    Returns
+    -------
+    i, j : array
+        The indices of the positions, and of the reference
+        positions, of each pair (sorted by i).
+    '''
+    tree = cKDTree(np.transpose(unit_vectors(ra_reference, dec_reference, n)))
+    chord = 2*np.sin(np.radians(np.minimum(radius, 180.0))/2)
+    found = tree.query_ball_point(np.transpose(unit_vectors(ra, dec, n)).reshape(-1, 3),
+                                  np.broadcast_to(chord, np.shape(np.atleast_1d(ra))),
+                                  workers=threads(n))
+    lengths = np.fromiter(map(len, found), int, len(found))
+    i = np.repeat(np.arange(len(found)), lengths)
+    j = np.fromiter(itertools.chain.from_iterable(found), int, lengths.sum())
+    return i, j
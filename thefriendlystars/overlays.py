@@ -0,0 +1,238 @@
+'''
+Overlays that draw many stars' worth of shapes at once.
+
+Drawing one matplotlib artist (a patch, a line, a text) per star
+gets very slow for thousands of stars. Instead, each of these
+functions adds one artist to the axes, which draws all of its
+shapes in a single call: `ellipses` (an EllipseCollection),
+`lines` (a LineCollection), and `labels` (a layer of text that
+shows only the most important labels that don't overlap).
+'''
+
+from .imports import *
+from matplotlib.collections import EllipseCollection, LineCollection
+from matplotlib.artist import Artist
+from matplotlib.font_manager import FontProperties
+
+def in_axis_units(axis, values, unit=None):
+    '''
+    Convert values (which might be Quantities) into the
+    plain numbers an axis uses for its data coordinates.
+
+    Parameters
+    ----------
+    axis : matplotlib.axis.Axis
+        The x or y axis.
+    values : array, or astropy.units.quantity.Quantity
+        The values to convert.
+    unit : astropy.units.core.Unit
+        The unit to use for Quantities, if the axis doesn't have one.
+    '''
+    if isinstance(values, u.Quantity):
+        if axis.units is not None:
+            return np.asarray(axis.convert_units(values), dtype=float)
+        if unit is not None:
+            return values.to_value(unit)
+        return values.value
+    return np.asarray(values, dtype=float)
+
+def ellipses(ax, x, y, widths, heights, angles=0.0, facecolor='none', edgecolor='black', alpha=0.5, **kw):
+    '''
+    Draw many ellipses, as one EllipseCollection.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axes into which the ellipses should be drawn.
+    x, y : array, or astropy.units.quantity.Quantity
+        The centers of the ellipses, in data coordinates.
+    widths, heights : array, or astropy.units.quantity.Quantity
+        The full widths (along x) and heights (along y)
+        of the ellipses, in data coordinates.
+    angles : float, or array
+        The rotation of each ellipse (in degrees, counterclockwise).
+    **kw : dict
+        Additional keywords are passed to EllipseCollection.
+
+    Returns
+    -------
+    collection : matplotlib.collections.EllipseCollection
+        The ellipses.
+    '''
+    unit = getattr(x, 'unit', None)
+    x, y = in_axis_units(ax.xaxis, x), in_axis_units(ax.yaxis, y)
+    widths = in_axis_units(ax.xaxis, widths, unit)
+    heights = in_axis_units(ax.yaxis, heights, unit)
+    widths, heights, angles = np.broadcast_arrays(widths, heights, angles)
+
+    collection = EllipseCollection(widths.ravel(), heights.ravel(), angles.ravel(),
+                                   units='xy',
+                                   offsets=np.transpose([x, y]).reshape(-1, 2),
+                                   offset_transform=ax.transData,
+                                   facecolor=facecolor,
+                                   edgecolor=edgecolor,
+                                   alpha=alpha,
+                                   **kw)
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+def lines(ax, x0, y0, x1, y1, color='black', alpha=0.5, linewidth=1, **kw):
+    '''
+    Draw many line segments, as one LineCollection.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axes into which the lines should be drawn.
+    x0, y0 : array, or astropy.units.quantity.Quantity
+        The starts of the lines, in data coordinates.
+    x1, y1 : array, or astropy.units.quantity.Quantity
+        The ends of the lines, in data coordinates.
+    **kw : dict
+        Additional keywords are passed to LineCollection.
+
+    Returns
+    -------
+    collection : matplotlib.collections.LineCollection
+        The lines.
+    '''
+    x0, x1 = in_axis_units(ax.xaxis, x0), in_axis_units(ax.xaxis, x1)
+    y0, y1 = in_axis_units(ax.yaxis, y0), in_axis_units(ax.yaxis, y1)
+    segments = np.stack([np.transpose([x0, y0]), np.transpose([x1, y1])], axis=1).reshape(-1, 2, 2)
+    collection = LineCollection(segments, colors=color, alpha=alpha, linewidths=linewidth, **kw)
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+class Labels(Artist):
+    '''
+    A layer of text labels, drawn by one artist. Each time it's
+    drawn, it shows only the labels inside the axes, in order of
+    priority, skipping any that would overlap one already shown
+    (and stopping once it has shown `limit` of them).
+    '''
+
+    def __init__(self, x, y, texts, priority=None, limit=None, cull=True,
+                       fontsize=6, color='black', alpha=1, offset=(3, 3), **kw):
+        '''
+        Parameters
+        ----------
+        x, y : array
+            The positions being labeled, in data coordinates.
+        texts : list
+            The labels.
+        priority : array
+            The importance of each label (higher first),
+            like the negative of a magnitude. (None = in order)
+        limit : int
+            The most labels to show. (None = no limit)
+        cull : bool
+            Should labels that would overlap be skipped?
+        fontsize : float
+            The size of the text, in points.
+        color, alpha
+            The color and transparency of the text.
+        offset : tuple
+            How far (in points) each label sits from its position.
+        '''
+        Artist.__init__(self)
+        self.x, self.y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        self.texts = [str(t) for t in texts]
+        priority = np.zeros(len(self.texts)) if priority is None else np.nan_to_num(np.asarray(priority, dtype=float), nan=-np.inf)
+        self.order = np.argsort(-priority, kind='stable')
+        self.limit = limit
+        self.cull = cull
+        self.font = FontProperties(size=fontsize)
+        self.color = color
+        self.offset = offset
+        self.set_alpha(alpha)
+        self.set(**kw)
+        self.shown = np.zeros(0, int)
+
+    def choose(self, renderer):
+        '''
+        Which labels should be shown (as indices, in order of priority)?
+        '''
+        scale = renderer.points_to_pixels(1.0)
+        xy = self.get_transform().transform(np.transpose([self.x, self.y]).reshape(-1, 2))
+        box = self.axes.bbox if self.axes is not None else None
+
+        # (roughly how big each label is, in pixels)
+        height = self.font.get_size_in_points()*scale
+        character = 0.6*height
+        dx, dy = self.offset[0]*scale, self.offset[1]*scale
+
+        # (only labels inside the axes are considered)
+        inside = np.isfinite(xy).all(axis=1)
+        if box is not None:
+            inside &= (xy[:, 0] >= box.x0) & (xy[:, 0] <= box.x1) & (xy[:, 1] >= box.y0) & (xy[:, 1] <= box.y1)
+
+        limit = len(self.texts) if self.limit is None else self.limit
+        occupied = {}
+        shown = []
+        for i in self.order[inside[self.order]]:
+            if len(shown) >= limit:
+                break
+            x, y = xy[i]
+            left, bottom = x + dx, y + dy
+            right, top = left + character*len(self.texts[i]), bottom + height
+            if self.cull:
+                # (check the cells of a grid, each as big as a line of text)
+                cells = [(a, b) for a in range(int(left//height), int(right//height) + 1)
+                                for b in range(int(bottom//height), int(top//height) + 1)]
+                if any(other[0] < right and left < other[2] and other[1] < top and bottom < other[3]
+                       for c in cells for other in occupied.get(c, [])):
+                    continue
+                for c in cells:
+                    occupied.setdefault(c, []).append((left, bottom, right, top))
+            shown.append(i)
+        return np.array(shown, dtype=int)
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        self.shown = self.choose(renderer)
+        scale = renderer.points_to_pixels(1.0)
+        xy = self.get_transform().transform(np.transpose([self.x, self.y]).reshape(-1, 2))
+        gc = renderer.new_gc()
+        gc.set_foreground(self.color)
+        gc.set_alpha(self.get_alpha())
+        if self.axes is not None:
+            gc.set_clip_rectangle(self.axes.bbox)
+        for i in self.shown:
+            renderer.draw_text(gc, xy[i, 0] + self.offset[0]*scale, xy[i, 1] + self.offset[1]*scale,
+                               self.texts[i], self.font, 0.0)
+        gc.restore()
+        self.stale = False
+
+def labels(ax, x, y, texts, priority=None, limit=None, cull=True, **kw):
+    '''
+    Draw many text labels, as one Labels layer.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axes into which the labels should be drawn.
+    x, y : array, or astropy.units.quantity.Quantity
+        The positions being labeled, in data coordinates.
+    texts : list
+        The labels.
+    priority : array
+        The importance of each label (higher first).
+    limit : int
+        The most labels to show. (None = no limit)
+    cull : bool
+        Should labels that would overlap be skipped?
+    **kw : dict
+        Additional keywords are passed to Labels.
+
+    Returns
+    -------
+    layer : Labels
+        The labels.
+    '''
+    layer = Labels(in_axis_units(ax.xaxis, x), in_axis_units(ax.yaxis, y), texts,
+                   priority=priority, limit=limit, cull=cull, **kw)
+    layer.set_transform(ax.transData)
+    layer.set_zorder(11)
+    ax.add_artist(layer)
+    return layer
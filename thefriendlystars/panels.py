@@ -8,7 +8,23 @@ and any number of catalogs plotted.
 from .imports import *
 from .images import *
 from .constellations import *
+from .instrumentation import timed
+from .field import resolve
+from . import overlays
 from illumination import imshowFrame
+from illumination.colors import cmap_norm_ticks
+import functools
+
+@functools.lru_cache()
+def unit_circle(N=1000):
+    '''
+    The (x, y) coordinates of N points around a circle of radius 1.
+    (These are calculated only once, and shared by every Panel.)
+    '''
+    theta = np.linspace(0, 2*np.pi, N)
+    x, y = np.cos(theta), np.sin(theta)
+    x.flags.writeable, y.flags.writeable = False, False
+    return x, y
 
 class Panel(Field, imshowFrame):
     '''
@@ -63,18 +79,18 @@ class Panel(Field, imshowFrame):
         '''
 
 
-        # the center of this field
-        self.center = center
+        # the center of this field (resolved once, for everything in it)
+        self.center = resolve(center)
         self.radius = radius
 
         # create the image (and the axes)
         self.image = create_image(image,
-                                  center,
+                                  self.center,
                                   radius=radius)
 
         # create the constellations to include
         self.constellations = [create_constellation(c,
-                                                    center,
+                                                    self.center,
                                                     radius=radius)
                                for c in constellations]
 
@@ -188,11 +204,8 @@ class Panel(Field, imshowFrame):
         linekw = dict(zorder=10, linewidth=2, linestyle='--', clip_on=False, alpha=alpha,
                         color='black')
 
-        N = 1000
-        theta = np.linspace(0, 2*np.pi, N)
-        r = circle_radius*np.ones_like(theta)
-
-        ruler['circleline'] = plt.plot(r*np.cos(theta), r*np.sin(theta), **linekw)
+        x, y = unit_circle()
+        ruler['circleline'] = plt.plot(circle_radius*x, circle_radius*y, **linekw)
 
         # add the label
         text_kw = dict(color='black',
@@ -302,6 +315,192 @@ class Panel(Field, imshowFrame):
         return ruler
 
 
+    def epoch_for(self, constellation):
+        '''
+        At what epoch should a constellation be shown in this panel?
+        (The epoch of the image, or otherwise the constellation's own.)
+        '''
+        return self.image.epoch or constellation.epoch
+
+    def stars_for(self, constellation):
+        '''
+        The stars of a constellation that could appear in this
+        panel (anywhere in its square, at the epoch shown), so
+        only those need to be propagated and plotted.
+        '''
+        return constellation.region(self.center,
+                                    self.radius*np.sqrt(2),
+                                    epochs=self.epoch_for(constellation))
+
+    def locate(self, constellation):
+        '''
+        The stars of a constellation, at the epoch of this panel,
+        and their local (xi, eta) coordinates.
+        '''
+        now = self.stars_for(constellation).at_epoch(self.epoch_for(constellation))
+        return now, self.celestial2local(now.ra, now.dec)
+
+    def draw_ellipses(self, nsigma=1, **kw):
+        '''
+        Draw the error ellipses of the positions of the stars
+        in this panel, at its epoch (one collection per constellation).
+
+        Parameters
+        ----------
+        nsigma : float
+            The semi-axes are this many sigma.
+        **kw : dict
+            Passed along to overlays.ellipses.
+        '''
+        drawn = []
+        for c in self.constellations:
+            now, xy = self.locate(c)
+            drawn.append(now.plot_ellipses(ax=self.ax, nsigma=nsigma, xy=xy,
+                                           **{'edgecolor':now.color, **kw}))
+        self.plotted.setdefault('overlays', []).extend(drawn)
+        return drawn
+
+    def draw_labels(self, limit=30, cull=True, **kw):
+        '''
+        Label the stars in this panel with their identifiers,
+        as one layer per constellation, showing only the
+        brightest ones that don't overlap each other.
+
+        Parameters
+        ----------
+        limit : int
+            The most labels to show for each constellation.
+        cull : bool
+            Should labels that would overlap be skipped?
+        **kw : dict
+            Passed along to overlays.labels.
+        '''
+        drawn = []
+        for c in self.constellations:
+            now, (xi, eta) = self.locate(c)
+            identifiers = now.standardized[now.identifier_keys[0] + '-id']
+            drawn.append(overlays.labels(self.ax, xi, eta, identifiers,
+                                         priority=-np.asarray(now.magnitude, dtype=float),
+                                         limit=limit, cull=cull,
+                                         **{'color':now.color, **kw}))
+        self.plotted.setdefault('overlays', []).extend(drawn)
+        return drawn
+
+    def draw_matches(self, this, reference, radius=1*u.arcsec, **kw):
+        '''
+        Draw a line from each star of one constellation (where
+        it was cataloged, at its own epoch) to the star it
+        matches in a reference constellation (at the epoch of
+        this panel), as one collection.
+
+        Parameters
+        ----------
+        this : Constellation
+            The stars to match (like 2MASS).
+        reference : Constellation
+            The stars to match them to (like Gaia).
+        radius : astropy.units.quantity.Quantity
+            How close do stars need to be to match? (see Constellation.crossMatchTo)
+        **kw : dict
+            Passed along to overlays.lines.
+        '''
+        ok, i_ref = this.crossMatchTo(reference, radius=radius)
+        then = this.subset(ok)
+        now = reference.at_epoch(self.epoch_for(reference)).subset(i_ref)
+        start = self.celestial2local(then.ra, then.dec)
+        end = self.celestial2local(now.ra, now.dec)
+        drawn = overlays.lines(self.ax, *start, *end, **{'color':this.color, **kw})
+        self.plotted.setdefault('overlays', []).append(drawn)
+        return drawn
+
+    def swap(self, other):
+        '''
+        Show the data of another Panel in this (already plotted) one.
+
+        The figure, axes, and decorations (compass, circle,
+        crosshair, labels) of this panel are kept as they are,
+        and only the image, its transform, the title, and the
+        positions of the stars are replaced. This is much faster
+        than plotting a new panel from scratch, when making many
+        panels with the same layout.
+
+        Parameters
+        ----------
+        other : Panel
+            A panel (not yet plotted) with the same radius
+            and number of constellations as this one.
+        '''
+
+        if (other.radius != self.radius) or (len(other.constellations) != len(self.constellations)):
+            raise ValueError(f"{other} doesn't have the same layout as {self}.")
+
+        # (overlays belong to the old data)
+        for overlay in self.plotted.pop('overlays', []):
+            overlay.remove()
+
+        # adopt the other panel's data
+        self.center = other.center
+        self._coordinate_center = other.coordinate_center
+        self.image = other.image
+        self.constellations = other.constellations
+        self.data = other.data
+        self.transform = other.transform
+        self.titlefordisplay = other.titlefordisplay
+
+        # replace the image (and its color normalization)
+        if 'image' in self.plotted:
+            image, actual_time = self._get_image()
+            cmap, norm, ticks = cmap_norm_ticks(sample(image, self.image.samples), **self.cmapkw)
+            self.plotted['image'].set_data(image)
+            self.plotted['image'].set_norm(norm)
+            self.plotted['image'].set_transform(self.transform + self.ax.transData)
+
+        if 'title' in self.plotted:
+            self.plotted['title'].set_text(self.titlefordisplay)
+
+        # move the stars
+        for scatter, c in zip(self.plotted['constellations'], self.constellations):
+            now, (xi, eta) = self.locate(c)
+            scatter.set_offsets(np.transpose([self.ax.xaxis.convert_units(xi),
+                                              self.ax.yaxis.convert_units(eta)]).reshape(-1, 2))
+            scatter.set_sizes(now.marker_sizes())
+            scatter.set_label('{} ({})'.format(now.name, now.epoch_label))
+
+    def match_resolution(self):
+        '''
+        Show the level of the image's pyramid that best matches
+        the resolution at which it will be drawn, so that no time
+        is spent drawing many image pixels into each pixel of the
+        output. This depends on the size and dpi of the figure,
+        so it's called each time the image is drawn (see `plot`).
+
+        Returns
+        -------
+        level : int
+            The level of the pyramid that is now shown
+            (0 means the full-resolution image).
+        '''
+        if 'image' not in self.plotted:
+            return 0
+
+        level = self.image.level_for(self.transform + self.ax.transData)
+        self.plotted['image'].set_data(self.image.pyramid[level])
+        self.plotted['image'].set_transform(self.image.transform_for(level) + self.ax.transData)
+        return level
+
+    def match_when_drawn(self, image):
+        '''
+        Make an image (an AxesImage) show the matching level of
+        the pyramid each time it's drawn, whether on the screen,
+        by savefig (at any dpi), or by rendering.
+        '''
+        draw = image.draw
+        def drawn(renderer, *args, **kwargs):
+            self.match_resolution()
+            return draw(renderer, *args, **kwargs)
+        image.draw = drawn
+
+    @timed('Panel.plot')
     def plot(self, *args, **kwargs):
         '''
         Plot this panel, including an image and/or
@@ -312,16 +511,19 @@ class Panel(Field, imshowFrame):
 
         # plot the image of this frame (using illumination)
         imshowFrame.plot(self, *args, **kwargs)
+        if 'image' in self.plotingredients:
+            self.plotted['image'] = self.ax.images[-1]
+            self.match_when_drawn(self.plotted['image'])
 
         # overplot all the constellations as stars
         plt.sca(self.ax)
+        self.plotted['constellations'] = []
         for c in self.constellations:
-            # try the epoch of the image; otherwise, the constellation's
-            epoch = self.image.epoch or c.epoch
-            # create a catalog of position at that epoch
-            now = c.at_epoch(epoch)
-            # plot the stellar positions into the frame
-            now.plot(ax=self.ax, facecolor='none', edgecolor='black')
+            # create a catalog of positions (of stars in view) at the epoch of this panel
+            now, xy = self.locate(c)
+            # plot the stellar positions into the frame, in local coordinates
+            scatter = now.plot(ax=self.ax, xy=xy, facecolor='none', edgecolor='black')
+            self.plotted['constellations'].append(scatter)
 
         if 'axes' in self.plotingredients:
             plt.xlabel(f'$\Delta$RA ({self.ax.xaxis.units})')
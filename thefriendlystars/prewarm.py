@@ -0,0 +1,133 @@
+'''
+Download everything a list of finder charts will need, before making them.
+
+Creating a Finder downloads its images and constellations as
+they're needed, so making many finders one after another spends
+most of its time waiting on the archives. `prewarm` fills the
+cache (`io.cache_directory`) first, sending queries to the
+different archives at the same time (but never more at once
+to one archive than its limit in `archives.backend.limits`),
+so that making the finders afterward needs only local files.
+
+    from thefriendlystars.prewarm import prewarm
+    report = prewarm(['GJ1132', 'LHS1140'], images=[DSS2r, TwoMassJ],
+                                            constellations=[Gaia])
+'''
+
+from .imports import *
+from . import archives
+from .images import DSS2r, TwoMassJ, TESS
+from .constellations import Gaia
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+
+def jobs_for(targets, images=[DSS2r, TwoMassJ, TESS],
+                      constellations=[Gaia],
+                      radius=5*u.arcmin):
+    '''
+    List the (Field class, center, radius) needed to make
+    a Finder for each target, using the same radii as Finder
+    (a radius for images, and sqrt(2) times that for the
+    constellations, so they reach into the corners).
+    '''
+    jobs = []
+    for target in targets:
+        for i in images:
+            jobs.append((i, target, radius))
+        for c in constellations:
+            jobs.append((c, target, radius*np.sqrt(2)))
+    return jobs
+
+def populate(field, center, radius):
+    '''
+    Create (and thereby download and cache) one Field.
+    '''
+    start = time.perf_counter()
+    field(center, radius=radius)
+    return time.perf_counter() - start
+
+def prewarm(targets, images=[DSS2r, TwoMassJ, TESS],
+                     constellations=[Gaia],
+                     radius=5*u.arcmin,
+                     workers=None,
+                     progress=True):
+    '''
+    Download (into the cache) everything needed
+    to make Finders for a list of targets.
+
+    Parameters
+    ----------
+    targets : list
+        The centers (names or SkyCoords) of the finders.
+    images : list
+        The Image classes (e.g. [DSS2r, TwoMassJ]) for each finder.
+    constellations : list
+        The Constellation classes (e.g. [Gaia]) for each finder.
+    radius : astropy.units.quantity.Quantity
+        The radius of the finders.
+    workers : dict
+        The number of simultaneous downloads from each archive
+        (defaulting to the limits of `archives.backend`).
+    progress : bool
+        Should a progress bar be shown?
+
+    Returns
+    -------
+    report : astropy.table.Table
+        One row per download, with its target, field, archive,
+        how long it took, and the error (if any). The failures
+        are `report[report['error'] != '']`.
+    '''
+
+    jobs = jobs_for(targets, images=images, constellations=constellations, radius=radius)
+
+    # one pool of threads for each archive
+    limits = dict(archives.backend.limits, **(workers or {}))
+    pools = {}
+    futures = {}
+    for job in jobs:
+        field, center, r = job
+        archive = field.archive
+        if archive not in pools:
+            pools[archive] = ThreadPoolExecutor(max_workers=limits.get(archive, 1),
+                                                thread_name_prefix=f'prewarm-{archive}')
+        futures[pools[archive].submit(populate, *job)] = job
+
+    # collect the results as they finish
+    rows = []
+    try:
+        for future in tqdm(as_completed(futures), total=len(futures), disable=not progress):
+            field, center, r = futures[future]
+            try:
+                seconds, error = future.result(), ''
+            except Exception as e:
+                seconds, error = np.nan, f'{e.__class__.__name__}: {e}'
+                print(f'failed to prewarm {field.__name__} for {center} ({error})')
+            rows.append((archives.describe(center), field.__name__, str(field.archive), r.to('arcsec').value, seconds, error))
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+    report = Table(rows=rows or None,
+                   names=['target', 'field', 'archive', 'radius', 'seconds', 'error'],
+                   dtype=[str, str, str, float, float, str])
+    report['radius'].unit = u.arcsec
+    failed = np.sum(report['error'] != '')
+    print(f'prewarmed {len(report) - failed} of {len(report)} fields for {len(targets)} targets')
+    return report
+
+if __name__ == '__main__':
+    import argparse
+    from . import images, constellations
+    parser = argparse.ArgumentParser(description='Download everything a list of finders will need.')
+    parser.add_argument('targets', nargs='+')
+    parser.add_argument('--images', nargs='*', default=['DSS2r', 'TwoMassJ', 'TESS'])
+    parser.add_argument('--constellations', nargs='*', default=['Gaia'])
+    parser.add_argument('--radius', type=float, default=5.0, help='(arcmin)')
+    args = parser.parse_args()
+
+    report = prewarm(args.targets,
+                     images=[getattr(images, i) for i in args.images],
+                     constellations=[getattr(constellations, c) for c in args.constellations],
+                     radius=args.radius*u.arcmin)
+    report[report['error'] != ''].pprint(max_lines=-1, max_width=-1)
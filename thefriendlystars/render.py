@@ -0,0 +1,105 @@
+'''
+Tools for rendering figures straight into raster images.
+
+Rather than saving vector files (where every star is its own
+marker and every image is embedded at full resolution), these
+draw a figure with matplotlib's Agg renderer into an RGBA array,
+which can be kept in memory (for example, to send from a web
+service) or written to PNG, JPEG, or WebP.
+'''
+
+from .imports import *
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# the raster formats we know how to write (and what PIL calls them)
+formats = dict(png='PNG', jpg='JPEG', jpeg='JPEG', webp='WEBP')
+
+def downsample(image, factor):
+    '''
+    Shrink an image by averaging blocks of factor x factor pixels
+    (trimming any leftover rows and columns from the edges).
+
+    Parameters
+    ----------
+    image : 2D array
+        The image to downsample.
+    factor : int
+        How many pixels (along each side) go into each new pixel?
+
+    Returns
+    -------
+    smaller : 2D array
+        The downsampled image.
+    '''
+    factor = int(factor)
+    if factor <= 1:
+        return image
+    rows, cols = np.shape(image)
+    rows, cols = rows//factor, cols//factor
+    trimmed = np.asarray(image)[:rows*factor, :cols*factor]
+    return trimmed.reshape(rows, factor, cols, factor).mean(axis=(1, 3), dtype=np.float32)
+
+def to_rgba(figure, dpi=None):
+    '''
+    Draw a figure into an array of RGBA pixels.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        The figure to draw.
+    dpi : float
+        The resolution (dots per inch), defaulting to the figure's own.
+
+    Returns
+    -------
+    rgba : array
+        An (height, width, 4) array of uint8 pixels.
+    '''
+    if dpi is not None:
+        figure.set_dpi(dpi)
+
+    # draw with Agg (without taking over the figure's own canvas)
+    original = figure.canvas
+    if isinstance(original, FigureCanvasAgg):
+        canvas = original
+    else:
+        canvas = FigureCanvasAgg(figure)
+    try:
+        canvas.draw()
+        # (copied, because the buffer is reused by the next draw)
+        return np.array(canvas.buffer_rgba())
+    finally:
+        figure.set_canvas(original)
+
+def write(rgba, filename, format=None, quality=90):
+    '''
+    Write an array of RGBA pixels to a PNG, JPEG, or WebP file.
+
+    Parameters
+    ----------
+    rgba : array
+        An (height, width, 4) array of uint8 pixels.
+    filename : str, or file-like object
+        Where should the image be written?
+    format : str
+        'png', 'jpeg', or 'webp' (guessed from the filename if None).
+    quality : int
+        The quality (for the lossy formats, from 1 to 100).
+    '''
+    from PIL import Image as PILImage
+
+    if format is None:
+        try:
+            format = os.path.splitext(filename)[-1].strip('.')
+        except TypeError:
+            format = 'png'
+    try:
+        pilformat = formats[format.lower()]
+    except KeyError:
+        raise ValueError(f'"{format}" is not one of the raster formats {list(formats)}.')
+
+    picture = PILImage.fromarray(rgba, mode='RGBA')
+    if pilformat == 'JPEG':
+        # JPEG has no transparency
+        picture = picture.convert('RGB')
+    picture.save(filename, format=pilformat, quality=quality)
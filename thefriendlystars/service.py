@@ -0,0 +1,277 @@
+'''
+A long-running local HTTP service that renders finder charts.
+
+Starting a new Python process for every chart spends most of its
+time importing packages, loading pickles, and fitting transforms.
+This service does all that once, and keeps the results in memory:
+the Finders it has made (with their images, constellations, and
+transforms) and the charts it has rendered are kept in LRU caches,
+and every chart with the same layout is swapped into one already
+plotted FinderTemplate, so a request usually costs only rendering.
+
+    tfs serve --port 8000
+
+    http://localhost:8000/finder?target=GJ1132&images=DSS2r,TwoMassJ&radius=3
+    http://localhost:8000/finder?ra=172.56&dec=-35.44&format=jpeg&dpi=72
+    http://localhost:8000/stats
+
+The /finder parameters are the same as the columns of a `tfs finder`
+job (see thefriendlystars.cli), with the format one of png, jpeg, webp.
+'''
+
+from .imports import *
+from . import render
+from .cli import defaults, as_list, center_of
+from .instrumentation import timer
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+from collections import OrderedDict
+import threading, json, time
+import io as bytesio
+
+# the content types of the formats we can serve
+content_types = dict(png='image/png', jpg='image/jpeg', jpeg='image/jpeg', webp='image/webp')
+
+def known(module, kind):
+    '''
+    The names of the classes of some kind (like Image,
+    or Constellation) that can be requested from a module.
+    '''
+    return {name for name, x in vars(module).items()
+            if isinstance(x, type) and issubclass(x, kind) and (x is not kind)}
+
+class LRU:
+    '''
+    A thread-safe dictionary that keeps only the
+    most recently used `limit` entries.
+    '''
+
+    def __init__(self, limit=64):
+        self.limit = limit
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits, self.misses = 0, 0
+
+    def get(self, key, create):
+        '''
+        Get the entry for a key, calling create() to make it if
+        it's missing. (create() is called outside the lock, so
+        slow entries don't hold up the others.)
+        '''
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        value = create()
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.limit:
+                self.entries.popitem(last=False)
+        return value
+
+    def __len__(self):
+        return len(self.entries)
+
+class Service(Talker):
+    '''
+    The Service makes finder charts on request,
+    keeping everything it can in memory.
+    '''
+
+    def __init__(self, finders=64, charts=256, workers=8):
+        '''
+        Parameters
+        ----------
+        finders : int
+            How many Finders (with their data) to keep in memory.
+        charts : int
+            How many rendered charts to keep in memory.
+        workers : int
+            How many requests can be worked on at once.
+        '''
+        Talker.__init__(self)
+        self.finders = LRU(finders)
+        self.charts = LRU(charts)
+        self.templates = {}
+        self.workers = threading.BoundedSemaphore(workers)
+
+        # matplotlib isn't thread-safe, so only one thread draws at a time
+        self.drawing = threading.Lock()
+        self.latencies = []
+
+    def template(self, layout):
+        '''
+        The FinderTemplate for a layout (made the first time it's needed).
+        '''
+        from .finders import FinderTemplate
+        from . import images, constellations
+        with self.drawing:
+            if layout not in self.templates:
+                radius, i, c = layout
+                self.templates[layout] = FinderTemplate(radius=radius*u.arcmin,
+                                                        images=[getattr(images, x) for x in i],
+                                                        constellations=[getattr(constellations, x) for x in c])
+            return self.templates[layout]
+
+    def finder(self, job, layout):
+        '''
+        The (unplotted) Finder for a job, with all its data loaded.
+        '''
+        from .finders import Finder
+        def create():
+            template = self.template(layout)
+            return Finder(center_of(job), radius=template.radius,
+                                          images=template.images,
+                                          constellations=template.constellations)
+        return self.finders.get((str(center_of(job)), layout), create)
+
+    def chart(self, **parameters):
+        '''
+        Render a finder chart.
+
+        Parameters
+        ----------
+        **parameters
+            The settings of the chart, as for a `tfs finder` job
+            (target, or ra and dec; radius; images; constellations;
+            format; dpi).
+
+        Returns
+        -------
+        chart : bytes
+            The encoded image.
+        '''
+        job = dict(defaults, **parameters)
+        if ('target' not in job) and not ('ra' in job and 'dec' in job):
+            raise ValueError('Please specify a target (or an ra and dec).')
+        format, dpi = str(job['format']).lower(), float(job['dpi'])
+        if format not in content_types:
+            raise ValueError(f'"{format}" is not one of the formats {list(content_types)}.')
+        layout = (float(job['radius']), tuple(as_list(job['images'])), tuple(as_list(job['constellations'])))
+        self.check(layout)
+
+        def create():
+            finder = self.finder(job, layout)
+            template = self.template(layout)
+            with self.drawing:
+                try:
+                    template.show(finder)
+                except Exception:
+                    # (a template swapped only partway would mix targets, so make a new one next time)
+                    if self.templates.get(layout) is template:
+                        del self.templates[layout]
+                    raise
+                rgba = template.finder.render(dpi=dpi)
+            buffer = bytesio.BytesIO()
+            render.write(rgba, buffer, format=format)
+            return buffer.getvalue()
+
+        start = time.perf_counter()
+        with self.workers, timer('Service.chart'):
+            chart = self.charts.get((str(center_of(job)), layout, format, dpi), create)
+        self.latencies = self.latencies[-999:] + [time.perf_counter() - start]
+        return chart
+
+    def check(self, layout):
+        '''
+        Make sure a layout asks only for images and
+        constellations that exist (raising a ValueError if not).
+        '''
+        from . import images, constellations
+        from .images import Image
+        from .constellations import Constellation
+        radius, i, c = layout
+        for names, allowed, kind in [(i, known(images, Image), 'images'),
+                                     (c, known(constellations, Constellation), 'constellations')]:
+            unknown = [x for x in names if x not in allowed]
+            if unknown:
+                raise ValueError(f'{unknown} are not {kind} we know about; try {sorted(allowed)}.')
+
+    def stats(self):
+        '''
+        A summary of what's in memory, and how fast requests have been.
+        '''
+        return dict(finders=len(self.finders),
+                    finder_hits=self.finders.hits,
+                    finder_misses=self.finders.misses,
+                    charts=len(self.charts),
+                    chart_hits=self.charts.hits,
+                    chart_misses=self.charts.misses,
+                    templates=len(self.templates),
+                    requests=len(self.latencies),
+                    median_seconds=float(np.median(self.latencies)) if self.latencies else None)
+
+class Handler(BaseHTTPRequestHandler):
+    '''
+    Respond to HTTP requests with the server's Service.
+    '''
+
+    def send(self, code, body, content_type='application/json'):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parameters = dict(parse_qsl(url.query))
+        service = self.server.service
+        try:
+            if url.path == '/finder':
+                chart = service.chart(**parameters)
+                format = parameters.get('format', defaults['format']).lower()
+                self.send(200, chart, content_types[format])
+            elif url.path == '/stats':
+                self.send(200, json.dumps(service.stats()).encode())
+            else:
+                self.send(404, json.dumps(dict(error=f'{url.path} not found')).encode())
+        except ValueError as e:
+            self.send(400, json.dumps(dict(error=str(e))).encode())
+        except Exception as e:
+            self.send(500, json.dumps(dict(error=f'{e.__class__.__name__}: {e}')).encode())
+
+    def log_message(self, format, *args):
+        # (quieter than the default, which writes every request to stderr)
+        pass
+
+def server(host='127.0.0.1', port=8000, **kw):
+    '''
+    Create (but don't start) a finder chart server.
+
+    Parameters
+    ----------
+    host : str
+        The address to listen on.
+    port : int
+        The port to listen on (0 = any free port).
+    **kw
+        Passed along to Service.
+
+    Returns
+    -------
+    server : http.server.ThreadingHTTPServer
+        The server, with its Service as .service.
+        Start it with .serve_forever().
+    '''
+    plt.switch_backend('Agg')
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    httpd.service = Service(**kw)
+    return httpd
+
+def serve(host='127.0.0.1', port=8000, **kw):
+    '''
+    Run a finder chart server (until interrupted).
+    '''
+    httpd = server(host=host, port=port, **kw)
+    print(f'serving finder charts at http://{host}:{httpd.server_address[1]}/finder')
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
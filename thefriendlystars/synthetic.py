@@ -0,0 +1,245 @@
+'''
+Synthetic catalogs and images, shaped like the
+responses that come back from the archives.
+
+These are handy for testing and benchmarking tfs
+without needing the internet, and for making
+catalogs of (almost) any size on demand.
+'''
+
+from .imports import *
+from astropy.table import MaskedColumn
+
+def random_positions(N, center=None, radius=None, seed=None):
+    '''
+    Draw random sky positions, uniformly distributed
+    either over the whole sky or within a cone.
+
+    Parameters
+    ----------
+    N : int
+        How many positions?
+    center : SkyCoord
+        The center of the cone (or None, for the whole sky).
+    radius : astropy.units.quantity.Quantity
+        The radius of the cone (or None, for the whole sky).
+    seed : int
+        A seed for the random number generator.
+
+    Returns
+    -------
+    ra, dec : arrays
+        The positions, in degrees.
+    '''
+
+    r = np.random.RandomState(seed)
+    if center is None:
+        ra = r.uniform(0, 360, N)
+        dec = np.degrees(np.arcsin(r.uniform(-1, 1, N)))
+        return ra, dec
+
+    # uniform in area, within a small patch around the center
+    rho = radius.to('deg').value*np.sqrt(r.uniform(0, 1, N))
+    theta = r.uniform(0, 2*np.pi, N)
+    dec = center.dec.deg + rho*np.sin(theta)
+    ra = center.ra.deg + rho*np.cos(theta)/np.cos(np.radians(dec))
+    return ra % 360, np.clip(dec, -90, 90)
+
+def gaia_table(N=1000, center=None, radius=None, seed=None):
+    '''
+    Create a fake table that looks like the response to
+    a Gaia DR2 query (with Gaia.basequery's columns,
+    including masked values where Gaia would have them).
+
+    Parameters
+    ----------
+    N : int
+        How many stars?
+    center, radius, seed
+        Passed along to `random_positions`.
+    '''
+
+    r = np.random.RandomState(seed)
+    ra, dec = random_positions(N, center=center, radius=radius, seed=seed)
+
+    # distances and proper motions, roughly like a field population
+    parallax = np.abs(r.lognormal(0, 1, N))
+    parallax_error = np.abs(r.normal(0.2, 0.05, N))
+    pmra, pmdec = r.normal(0, 10, (2, N))*(1 + parallax)
+    G = r.triangular(5, 20, 20, N)
+
+    # radial velocities exist only for bright stars
+    has_rv = G < 13
+    hasnt_astrometry = r.uniform(0, 1, N) < 0.1
+
+    columns = [MaskedColumn(np.arange(N, dtype=np.int64) + 10**18, name='source_id'),
+               MaskedColumn(ra, name='ra'),
+               MaskedColumn(r.uniform(0.01, 0.5, N), name='ra_error'),
+               MaskedColumn(dec, name='dec'),
+               MaskedColumn(r.uniform(0.01, 0.5, N), name='dec_error'),
+               MaskedColumn(pmra, name='pmra', mask=hasnt_astrometry),
+               MaskedColumn(r.uniform(0.02, 1, N), name='pmra_error', mask=hasnt_astrometry),
+               MaskedColumn(pmdec, name='pmdec', mask=hasnt_astrometry),
+               MaskedColumn(r.uniform(0.02, 1, N), name='pmdec_error', mask=hasnt_astrometry),
+               MaskedColumn(parallax, name='parallax', mask=hasnt_astrometry),
+               MaskedColumn(parallax_error, name='parallax_error', mask=hasnt_astrometry),
+               MaskedColumn(G, name='phot_g_mean_mag'),
+               MaskedColumn(G + r.uniform(0, 1, N), name='phot_bp_mean_mag'),
+               MaskedColumn(G - r.uniform(0, 1, N), name='phot_rp_mean_mag'),
+               MaskedColumn(r.normal(0, 30, N), name='radial_velocity', mask=~has_rv),
+               MaskedColumn(r.uniform(0.1, 5, N), name='radial_velocity_error', mask=~has_rv),
+               MaskedColumn(np.array(['NOT_AVAILABLE']*N), name='phot_variable_flag'),
+               MaskedColumn(r.uniform(3000, 7000, N), name='teff_val'),
+               MaskedColumn(r.uniform(0, 1, N), name='a_g_val')]
+
+    return Table(columns, masked=True)
+
+def lspm_table(N=1000, center=None, radius=None, seed=None):
+    '''
+    Create a fake table that looks like the response to
+    a Vizier query of the LSPM-North catalog.
+
+    Parameters
+    ----------
+    N : int
+        How many stars?
+    center, radius, seed
+        Passed along to `random_positions`.
+    '''
+
+    r = np.random.RandomState(seed)
+    ra, dec = random_positions(N, center=center, radius=radius, seed=seed)
+    V = r.uniform(8, 21, N)
+
+    columns = [MaskedColumn(np.array([f'J{i:07.0f}' for i in range(N)]), name='LSPM'),
+               MaskedColumn(np.array([f'{i:016.0f}' for i in range(N)]), name='2MASS'),
+               MaskedColumn(ra, name='_RAJ2000'),
+               MaskedColumn(dec, name='_DEJ2000'),
+               MaskedColumn(r.normal(0, 0.3, N), name='pmRA'),
+               MaskedColumn(r.normal(0, 0.3, N), name='pmDE')]
+    offsets = dict(B=0.8, V=0.0, BJ=0.6, RF=-0.5, IN=-1.0, J=-2.0, H=-2.5, K=-2.7, Ve=0.0)
+    for f, offset in offsets.items():
+        columns.append(MaskedColumn(V + offset, name=f'{f}mag'))
+    columns.append(MaskedColumn(np.full(N, 2.0), name='V-J'))
+
+    t = Table(columns, masked=True)
+    # Vizier would call this column "_2MASS"
+    t.rename_column('2MASS', '_2MASS')
+    return t
+
+def tic_table(N=1000, center=None, radius=None, seed=None):
+    '''
+    Create a fake table that looks like the response to
+    a MAST query of the TESS Input Catalog (with masked
+    values where stars have no parallax or proper motion).
+
+    Parameters
+    ----------
+    N : int
+        How many stars?
+    center, radius, seed
+        Passed along to `random_positions`.
+    '''
+
+    r = np.random.RandomState(seed)
+    ra, dec = random_positions(N, center=center, radius=radius, seed=seed)
+
+    # like Gaia, but with some stars (from 2MASS alone) lacking astrometry
+    plx = np.abs(r.lognormal(0, 1, N))
+    pmra, pmdec = r.normal(0, 10, (2, N))*(1 + plx)
+    T = r.triangular(5, 20, 20, N)
+    hasnt_astrometry = r.uniform(0, 1, N) < 0.1
+
+    columns = [MaskedColumn(np.array([f'{i}' for i in np.arange(N) + 10**8]), name='ID'),
+               MaskedColumn(ra, name='ra'),
+               MaskedColumn(dec, name='dec'),
+               MaskedColumn(pmra, name='pmRA', mask=hasnt_astrometry),
+               MaskedColumn(r.uniform(0.02, 1, N), name='e_pmRA', mask=hasnt_astrometry),
+               MaskedColumn(pmdec, name='pmDEC', mask=hasnt_astrometry),
+               MaskedColumn(r.uniform(0.02, 1, N), name='e_pmDEC', mask=hasnt_astrometry),
+               MaskedColumn(plx, name='plx', mask=hasnt_astrometry),
+               MaskedColumn(np.abs(r.normal(0.2, 0.05, N)), name='e_plx', mask=hasnt_astrometry),
+               MaskedColumn(T, name='Tmag'),
+               MaskedColumn(T + r.uniform(0, 0.5, N), name='GAIAmag', mask=hasnt_astrometry),
+               MaskedColumn(T + r.uniform(0.5, 1.5, N), name='Vmag'),
+               MaskedColumn(T - r.uniform(0.5, 1.0, N), name='Jmag'),
+               MaskedColumn(T - r.uniform(1.0, 1.5, N), name='Hmag'),
+               MaskedColumn(T - r.uniform(1.0, 1.7, N), name='Kmag')]
+
+    return Table(columns, masked=True)
+
+def tmass_table(N=1000, center=None, radius=None, seed=None):
+    '''
+    Create a fake table that looks like the response to a
+    query of the 2MASS point sources hosted by the Gaia archive
+    (gaiadr1.tmass_original_valid), with each star observed
+    on its own date (between 1997 and 2001).
+
+    Parameters
+    ----------
+    N : int
+        How many stars?
+    center, radius, seed
+        Passed along to `random_positions`.
+    '''
+
+    r = np.random.RandomState(seed)
+    ra, dec = random_positions(N, center=center, radius=radius, seed=seed)
+    J = r.triangular(5, 17, 17, N)
+
+    columns = [MaskedColumn(np.array([f'{i:016.0f}' for i in range(N)]), name='designation'),
+               MaskedColumn(ra, name='ra'),
+               MaskedColumn(dec, name='dec'),
+               MaskedColumn(J, name='j_m'),
+               MaskedColumn(J - r.uniform(0.1, 0.6, N), name='h_m'),
+               MaskedColumn(J - r.uniform(0.2, 0.9, N), name='ks_m'),
+               MaskedColumn(r.uniform(2450449.5, 2451910.5, N), name='j_date')]
+
+    return Table(columns, masked=True)
+
+def image_hdu(center, radius=3*u.arcmin, pixels=300, epoch=1995.0, N=50, seed=None):
+    '''
+    Create a fake image that looks like one downloaded
+    from SkyView, with a TAN WCS centered on `center`,
+    some stars, some noise, and an epoch in the comments.
+
+    Parameters
+    ----------
+    center : SkyCoord
+        The center of the image.
+    radius : astropy.units.quantity.Quantity
+        Half the width of the image.
+    pixels : int
+        The number of pixels along each side.
+    epoch : float
+        The decimal year stored in the header comments.
+    N : int
+        How many stars to sprinkle into the image?
+    seed : int
+        A seed for the random number generator.
+    '''
+
+    r = np.random.RandomState(seed)
+
+    # a simple tangent-plane WCS, with north up and east left
+    scale = (2*radius/pixels).to('deg').value
+    w = WCS(naxis=2)
+    w.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+    w.wcs.crval = [center.ra.deg, center.dec.deg]
+    w.wcs.crpix = [(pixels + 1)/2.0, (pixels + 1)/2.0]
+    w.wcs.cdelt = [-scale, scale]
+
+    # a noisy background with some gaussian stars
+    data = r.normal(1000, 10, (pixels, pixels))
+    for xc, yc, flux in zip(*r.uniform(0, pixels, (2, N)), r.lognormal(8, 1, N)):
+        # (only bother with the pixels near each star)
+        x0, y0 = max(int(xc) - 8, 0), max(int(yc) - 8, 0)
+        y, x = np.mgrid[y0:min(int(yc) + 9, pixels), x0:min(int(xc) + 9, pixels)]
+        data[y, x] += flux*np.exp(-0.5*((x - xc)**2 + (y - yc)**2)/1.5**2)
+
+    header = w.to_header()
+    header['COMMENT'] = 'Synthetic image created by thefriendlystars'
+    header['COMMENT'] = f'Epoch: {epoch}'
+
+    # skyview sends big-endian 32-bit floats
+    return fits.PrimaryHDU(data=data.astype('>f4'), header=header)